@@ -1,10 +1,13 @@
 """Command line interface for sierra"""
 
-from hyfi import hyfi_main
-
 
 def main() -> None:
     """Main function for the CLI"""
+    from hyfi import hyfi_main
+
+    from sierra import initialize
+
+    initialize()
     hyfi_main()
 
 
@@ -1,23 +1,50 @@
-"""Implements the package initialization logic"""
+"""Implements the package initialization logic
 
-import os
+HyFI, and the logger it sets up, are initialized on first use: when
+`sierra.HyFI` is accessed, when `initialize` is called, or when a module that
+depends on the global HyFI config is imported. `import sierra` itself only
+reads the version, so scripts that need a light module do not pay for them.
+"""
 
-from hyfi import HyFI
+import os
+from typing import TYPE_CHECKING, Any
 
 from ._version import __version__
 
+if TYPE_CHECKING:
+    from hyfi import HyFI
+
 # Read the package path from the current directory
 __package_path__ = os.path.dirname(__file__)
 
-# Initialize the global HyFI object
-HyFI.initialize_global_hyfi(
-    package_path=__package_path__,
-    version=__version__,
-    plugins=[],
-)
+_initialized = False
+
+
+def initialize() -> None:
+    """Initialize the global HyFI object and the logger, once."""
+    global _initialized
+    if _initialized:
+        return
+    from hyfi import HyFI
+
+    # Initialize the global HyFI object
+    HyFI.initialize_global_hyfi(
+        package_path=__package_path__,
+        version=__version__,
+        plugins=[],
+    )
+    # Initialize the logger
+    HyFI.setLogger()
+    _initialized = True
+
+
+def __getattr__(name: str) -> Any:
+    if name == "HyFI":
+        initialize()
+        from hyfi import HyFI
 
-# Initialize the logger
-HyFI.setLogger()
+        return HyFI
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def get_version() -> str:
@@ -25,4 +52,4 @@ def get_version() -> str:
     return __version__
 
 
-__all__ = ["HyFI", "get_version"]
+__all__ = ["HyFI", "get_version", "initialize"]
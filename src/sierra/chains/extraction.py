@@ -1,14 +1,27 @@
 # This file is used to extract data from the content using the langchain library
+from typing import Any
+
 from langchain.chains import create_extraction_chain_pydantic
-from langchain.chat_models import ChatOpenAI
 
-llm = ChatOpenAI(temperature=0, model="gpt-3.5-turbo")
+from sierra.llms.registry import chat_openai
+
+
+def get_llm():
+    """The shared engine of the extraction chain, built on first use."""
+    return chat_openai(model="gpt-3.5-turbo", temperature=0)
+
+
+def __getattr__(name: str) -> Any:
+    # `llm` used to be built at import time, which needed an API key
+    if name == "llm":
+        return get_llm()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def extract(content: str, **kwargs):
 
     if schema := kwargs.get("schema", None):
         response = create_extraction_chain_pydantic(
-            pydantic_schema=schema, llm=llm
+            pydantic_schema=schema, llm=get_llm()
         ).run(content)
         return [item.dict() for item in response]
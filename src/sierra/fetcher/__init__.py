@@ -1,5 +1,20 @@
 """Fetcher module for Sierra Club website."""
 
-from .sierra import SierraClubFetcher
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .sierra import SierraClubFetcher
+
+_LAZY_ATTRIBUTES = {"SierraClubFetcher": ".sierra"}
+
+
+def __getattr__(name: str) -> Any:
+    # The fetcher imports HyFI; the cache and HTTP helpers stay light
+    if name in _LAZY_ATTRIBUTES:
+        module = importlib.import_module(_LAZY_ATTRIBUTES[name], __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = ["SierraClubFetcher"]
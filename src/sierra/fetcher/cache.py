@@ -0,0 +1,167 @@
+"""
+On-disk HTTP cache with conditional-request validators.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class HttpCache:
+    """
+    Stores response bodies with their `ETag`/`Last-Modified` validators.
+
+    Entries live in a directory sharded by the first two hex digits of the
+    URL hash: `<hash>.html` holds the body and `<hash>.json` the validators and
+    an optional parsed result. The total body size is bounded by `max_bytes`;
+    the least recently used entries are evicted first.
+
+    Args:
+        cache_dir (str): The cache directory.
+        max_bytes (int, optional): The size limit of the cached bodies.
+            Defaults to 512 MiB.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 512 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+        self._total_bytes = sum(
+            path.stat().st_size for path in self.cache_dir.glob("*/*.html")
+        )
+
+    def _paths(self, url: str):
+        digest = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        shard = self.cache_dir / digest[:2]
+        return shard / f"{digest}.json", shard / f"{digest}.html"
+
+    def _load_meta(self, url: str) -> Optional[Dict]:
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return meta if meta.get("url") == url and body_path.exists() else None
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """Return the validators to send for `url`, if it is cached."""
+        meta = self._load_meta(url)
+        if meta is None:
+            return {}
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def not_modified(self, url: str) -> Optional[str]:
+        """
+        Record a 304 response and return the cached body.
+
+        Returns:
+            Optional[str]: The cached body, or None if the entry vanished.
+        """
+        _, body_path = self._paths(url)
+        try:
+            body = body_path.read_text(encoding="utf-8")
+        except OSError:
+            return None
+        os.utime(body_path)
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += len(body.encode("utf-8"))
+        return body
+
+    def store(self, url: str, body: str, headers) -> None:
+        """
+        Cache a 200 response that carries validators.
+
+        Args:
+            url (str): The requested URL.
+            body (str): The response text.
+            headers: The response headers.
+        """
+        with self._lock:
+            self.misses += 1
+        etag, last_modified = headers.get("ETag"), headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+        meta_path, body_path = self._paths(url)
+        meta_path.parent.mkdir(parents=True, exist_ok=True)
+        data = body.encode("utf-8")
+        old_size = body_path.stat().st_size if body_path.exists() else 0
+        body_path.write_bytes(data)
+        meta = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "stored_at": time.time(),
+        }
+        meta_path.write_text(json.dumps(meta), encoding="utf-8")
+        with self._lock:
+            self._total_bytes += len(data) - old_size
+            over_limit = self._total_bytes > self.max_bytes
+        if over_limit:
+            self.evict()
+
+    def get_parsed(self, url: str, parser_key: str) -> Optional[Dict]:
+        """Return the parsed result stored for `url` by the same parser."""
+        meta = self._load_meta(url)
+        if meta is None or meta.get("parser_key") != parser_key:
+            return None
+        return meta.get("parsed")
+
+    def set_parsed(self, url: str, parser_key: str, parsed: Dict) -> None:
+        """Store the parsed result of a cached body."""
+        meta = self._load_meta(url)
+        if meta is None:
+            return
+        meta.update(parser_key=parser_key, parsed=parsed)
+        meta_path, _ = self._paths(url)
+        meta_path.write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+
+    def evict(self) -> int:
+        """
+        Remove least recently used entries until the cache is 10% below
+        `max_bytes`, so that eviction does not run on every store.
+
+        Returns:
+            int: The number of evicted entries.
+        """
+        target = self.max_bytes * 0.9
+        with self._lock:
+            bodies = sorted(
+                self.cache_dir.glob("*/*.html"), key=lambda path: path.stat().st_mtime
+            )
+            evicted = 0
+            for body_path in bodies:
+                if self._total_bytes <= target:
+                    break
+                self._total_bytes -= body_path.stat().st_size
+                body_path.unlink(missing_ok=True)
+                body_path.with_suffix(".json").unlink(missing_ok=True)
+                evicted += 1
+        if evicted:
+            logger.info("Evicted %s entries from the HTTP cache", evicted)
+        return evicted
+
+    def log_stats(self) -> None:
+        logger.info(
+            "HTTP cache: %s hits, %s misses, %s bytes saved",
+            self.hits,
+            self.misses,
+            self.bytes_saved,
+        )
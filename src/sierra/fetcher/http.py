@@ -0,0 +1,120 @@
+"""
+HTTP helpers for concurrent fetching.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    Tokens are refilled continuously at `rate` per second up to `burst`.
+    Reservations always succeed and may leave the bucket in debt; the caller
+    waits until the debt is paid off, so reservations larger than the bucket
+    are paced at the rate instead of waiting forever, and concurrent callers
+    are served in turn. `acquire` takes one token and sleeps.
+
+    Args:
+        rate (float): Tokens added per second.
+        burst (float, optional): Bucket capacity. Defaults to 1.
+        clock (Callable[[], float], optional): The clock. Defaults to
+            `time.monotonic`.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate
+        self.capacity = max(float(burst), 1.0)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def reserve(self, amount: float = 1) -> float:
+        """Take `amount` tokens and return the seconds to wait before using them."""
+        with self._lock:
+            self._refill()
+            self._tokens -= amount
+            return max(-self._tokens / self.rate, 0.0)
+
+    def refund(self, amount: float) -> None:
+        """Give back tokens reserved in excess; a negative amount takes more."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+    def acquire(self) -> float:
+        """
+        Take one token, sleeping until it is available.
+
+        Returns:
+            float: The time spent waiting, in seconds.
+        """
+        wait = self.reserve(1)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+class HostRateLimiter:
+    """
+    One token bucket per host, so a slow host does not throttle the others.
+
+    Args:
+        rate (Optional[float]): Requests per second per host. No limit if None or 0.
+        burst (int, optional): Requests allowed back to back. Defaults to 1.
+    """
+
+    def __init__(self, rate: Optional[float], burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, url: str) -> float:
+        if not self.rate:
+            return 0.0
+        host = urlsplit(url).netloc
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.rate, self.burst)
+        return bucket.acquire()
+
+
+def create_session(pool_size: int = 10, headers: Optional[dict] = None):
+    """
+    Create a keep-alive session whose connection pool fits `pool_size` threads.
+
+    Args:
+        pool_size (int, optional): Connections kept per host. Defaults to 10.
+        headers (Optional[dict], optional): Default request headers.
+
+    Returns:
+        requests.Session: The session.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if headers:
+        session.headers.update(headers)
+    return session
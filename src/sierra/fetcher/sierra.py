@@ -2,13 +2,49 @@
 Fetcher for Sierra Club website.
 """
 
+import json
 import logging
-from typing import List, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Set
 
+from bs4 import BeautifulSoup, SoupStrainer
 from hyfetcher.fetcher import BaseFetcher
+from hyfetcher.fetcher.base import Response
+
+from sierra import HyFI
+from sierra.pipes.jsonl import iter_jsonl
+from sierra.pipes.parquet import (
+    PARQUET_SUFFIX,
+    iter_parquet,
+    read_columns,
+    write_parquet,
+)
+
+from .cache import HttpCache
+from .http import HostRateLimiter, create_session
 
 logger = logging.getLogger(__name__)
 
+# Guards the lazy creation of the objects the worker threads share
+_init_lock = threading.Lock()
+
+
+def default_html_parser() -> str:
+    """Return "lxml" if it is installed, else the bundled "html.parser"."""
+    try:
+        import lxml  # noqa: F401
+    except ImportError:
+        return "html.parser"
+    return "lxml"
+
+
+class FetchResponse(Response):
+    """A response that also tells whether it was served from the HTTP cache."""
+
+    not_modified: bool = False
+
 
 class SierraClubFetcher(BaseFetcher):
     """
@@ -30,6 +66,33 @@ class SierraClubFetcher(BaseFetcher):
         link_find_all_attrs (dict): The attributes for finding links.
         lint_article_name (str): The HTML tag name for finding article titles.
         lint_article_attrs (dict): The attributes for finding article titles.
+        article_title_name (str): The HTML tag name of an article's title.
+        article_title_attrs (dict): The attributes of an article's title.
+        article_content_name (str): The HTML tag name of an article's body.
+        article_content_attrs (dict): The attributes of an article's body.
+        html_parser (Optional[str]): The BeautifulSoup tree builder. Defaults to
+            "lxml" if installed, else "html.parser". Listing and article pages
+            are parsed with a `SoupStrainer`, so only the elements named by the
+            selectors above are turned into a tree.
+
+        requests_per_second (Optional[float]): Per-host request rate enforced by a
+            token bucket. Defaults to `1 / delay_between_requests` if None.
+        burst (int): Requests allowed back to back before the rate applies.
+        request_timeout (float): Timeout in seconds for each HTTP request.
+        use_http_cache (bool): Revalidate pages with `If-None-Match` and
+            `If-Modified-Since` against an on-disk cache under `output_dir`; a
+            304 reply skips both the download and the reparse of an article.
+        http_cache_max_bytes (int): Size limit of the HTTP cache.
+        incremental (bool): Stop paginating at the first listing page whose links
+            are all known. Listings are newest-first, so a daily refresh costs
+            one or two requests. `max_num_pages` still caps the crawl.
+        storage_format (str): "jsonl", or "parquet" to store the links and
+            articles as Parquet files (`links.parquet`, `articles.parquet`)
+            written in row groups of `row_group_size`; requires pyarrow.
+        row_group_size (int): Records per Parquet row group.
+
+    Listing pages and articles are fetched by a pool of `num_workers` threads
+    sharing one keep-alive connection pool.
     """
 
     _config_name_: str = "sierraclub"
@@ -46,6 +109,347 @@ class SierraClubFetcher(BaseFetcher):
     lint_article_name: str = "h3"
     lint_article_attrs: dict = {"class": "post-title"}
 
+    requests_per_second: Optional[float] = None
+    burst: int = 1
+    request_timeout: float = 30.0
+    incremental: bool = False
+    use_http_cache: bool = False
+    http_cache_max_bytes: int = 512 * 1024 * 1024
+
+    article_title_name: str = "h1"
+    article_title_attrs: dict = {"class": "page-header"}
+    article_content_name: str = "article"
+    article_content_attrs: dict = {"class": "press-release"}
+    html_parser: Optional[str] = None
+    storage_format: str = "jsonl"
+    row_group_size: int = 1024
+
+    _session_: Optional[object] = None
+    _limiter_: Optional[HostRateLimiter] = None
+    _http_cache_: Optional[HttpCache] = None
+
+    @property
+    def session(self):
+        with _init_lock:
+            if self._session_ is None:
+                self._session_ = create_session(
+                    pool_size=max(self.num_workers, 1), headers=self._headers
+                )
+        return self._session_
+
+    @property
+    def limiter(self) -> HostRateLimiter:
+        with _init_lock:
+            if self._limiter_ is None:
+                rate = self.requests_per_second
+                if rate is None and self.delay_between_requests > 0:
+                    rate = 1 / self.delay_between_requests
+                self._limiter_ = HostRateLimiter(rate, burst=self.burst)
+        return self._limiter_
+
+    @property
+    def http_cache(self) -> Optional[HttpCache]:
+        with _init_lock:
+            if self.use_http_cache and self._http_cache_ is None:
+                self._http_cache_ = HttpCache(
+                    str(Path(self.output_dir) / "http_cache"),
+                    max_bytes=self.http_cache_max_bytes,
+                )
+        return self._http_cache_
+
+    @property
+    def use_parquet(self) -> bool:
+        if self.storage_format not in ("jsonl", "parquet"):
+            raise ValueError(f"Unknown storage format: {self.storage_format}")
+        return self.storage_format == "parquet"
+
+    def _storage_path(self, filepath: str) -> str:
+        return (
+            str(Path(filepath).with_suffix(PARQUET_SUFFIX))
+            if self.use_parquet
+            else filepath
+        )
+
+    @property
+    def link_filepath(self) -> str:
+        return self._storage_path(super().link_filepath)
+
+    @property
+    def article_filepath(self) -> str:
+        return self._storage_path(super().article_filepath)
+
+    def _load_records(self, filepath: str) -> List[dict]:
+        if self.use_parquet:
+            return list(iter_parquet(filepath))
+        return HyFI.load_jsonl(filepath)
+
+    def _save_records(self, records: List[dict], filepath: str, kind: str) -> None:
+        if self.use_parquet:
+            write_parquet(records, filepath, row_group_size=self.row_group_size)
+        else:
+            HyFI.save_jsonl(records, filepath)
+        logger.info("Saved %s %s to %s", len(records), kind, filepath)
+
+    def _load_links(self) -> List[dict]:
+        if Path(self.link_filepath).exists():
+            self._links = self._load_records(self.link_filepath)
+        return self._links
+
+    def _load_articles(self) -> List[dict]:
+        if Path(self.article_filepath).exists():
+            self._articles = self._load_records(self.article_filepath)
+        return self._articles
+
+    def _dedupe(self, records: List[dict], kind: str) -> List[dict]:
+        original_len = len(records)
+        records = HyFI.remove_duplicates_from_list_of_dicts(records, key=self.key_field)
+        logger.info(
+            "Removed %s duplicate %s from %s %s",
+            original_len - len(records),
+            kind,
+            original_len,
+            kind,
+        )
+        return records
+
+    def save_links(self, links: List[dict]):
+        """
+        Save the fetched links, with the known ones, in the storage format.
+
+        Args:
+            links (List[dict]): The new links.
+        """
+        self._links = self._dedupe(self._links + links, "links")
+        self._save_records(self._links, self.link_filepath, "links")
+
+    def save_articles(self, articles: List[dict]):
+        """
+        Save the fetched articles, with the known ones, in the storage format.
+
+        Args:
+            articles (List[dict]): The new articles.
+        """
+        self._articles = self._dedupe(self._articles + articles, "articles")
+        self._save_records(self._articles, self.article_filepath, "articles")
+
+    @property
+    def article_parser_key(self) -> str:
+        """Identifies the article selectors, so cached parses follow config edits."""
+        return json.dumps(
+            [
+                self.article_title_name,
+                self.article_title_attrs,
+                self.article_content_name,
+                self.article_content_attrs,
+            ],
+            sort_keys=True,
+        )
+
+    def request(
+        self,
+        url: str,
+        use_playwright: bool = False,
+        timeout: Optional[float] = None,
+        params: Optional[dict] = None,
+        **kwargs,
+    ) -> Response:
+        """
+        Send a rate-limited GET request over the shared session.
+
+        Args:
+            url (str): URL for the request.
+            use_playwright (bool, optional): Delegate to Playwright. Defaults to False.
+            timeout (Optional[float], optional): Defaults to `request_timeout`.
+            params (Optional[dict], optional): Query string parameters.
+
+        Returns:
+            Response: Response object containing response text and status code.
+        """
+        self.limiter.acquire(url)
+        if use_playwright:
+            return super().request(url, use_playwright=True, timeout=timeout, **kwargs)
+        http_cache = self.http_cache if params is None else None
+        headers = http_cache.conditional_headers(url) if http_cache else {}
+        res = self.session.get(
+            url,
+            params=params,
+            headers=headers,
+            timeout=timeout or self.request_timeout,
+            **kwargs,
+        )
+        if http_cache and res.status_code == 304:
+            if (text := http_cache.not_modified(url)) is not None:
+                return FetchResponse(text=text, status_code=200, not_modified=True)
+            # The cached body vanished; fetch it again without validators
+            res = self.session.get(url, timeout=timeout or self.request_timeout)
+        if http_cache and res.status_code == 200:
+            http_cache.store(url, res.text, res.headers)
+        return FetchResponse(text=res.text, status_code=res.status_code)
+
+    def get_page(self, url: str) -> Optional[FetchResponse]:
+        """
+        Fetch a page, returning None if it does not exist or the request fails.
+
+        Args:
+            url (str): The URL of the page.
+
+        Returns:
+            Optional[FetchResponse]: The response.
+        """
+        try:
+            response = self.request(url, use_playwright=self.use_playwright)
+        except Exception as e:
+            logger.error("Error while fetching the page url: %s", url)
+            logger.error("Error: %s", e)
+            return None
+        if response.status_code == 404:
+            logger.info("Page [%s] does not exist, stopping...", url)
+            return None
+        return response
+
+    @property
+    def parser(self) -> str:
+        return self.html_parser or default_html_parser()
+
+    def make_soup(self, markup: str, parse_only: Optional[SoupStrainer] = None):
+        return BeautifulSoup(markup, self.parser, parse_only=parse_only)
+
+    def get_soup(self, url: str, parse_only: Optional[SoupStrainer] = None):
+        if (response := self.get_page(url)) is None:
+            return None
+        return self.make_soup(response.text, parse_only=parse_only)
+
+    def _imap(self, func: Callable, items: List) -> Iterator:
+        """Apply `func` to `items` on the worker threads, yielding in order."""
+        if self.num_workers <= 1 or len(items) <= 1:
+            yield from map(func, items)
+            return
+        with ThreadPoolExecutor(max_workers=self.num_workers) as executor:
+            yield from executor.map(func, items)
+
+    @property
+    def known_urls(self) -> Set[str]:
+        """URLs already stored in the link and article files."""
+        urls = {link["url"] for link in self.links}
+        if Path(self.article_filepath).exists():
+            if self.use_parquet:
+                urls.update(read_columns(self.article_filepath, ["url"])["url"])
+            else:
+                urls.update(
+                    article["url"] for article in iter_jsonl(self.article_filepath)
+                )
+        return urls
+
+    def _fetch_links(self, parse_page_func: Callable, next_page_func: Callable):
+        if self.incremental:
+            link_urls = self.known_urls
+            logger.info("Incremental crawl with %s known urls", len(link_urls))
+        else:
+            link_urls = {link["url"] for link in self.links}
+        links = []
+        for start_url in self.start_urls_encoded:
+            logger.info("Fetching links for url: %s", start_url)
+            page = self.start_page or 1
+            last_page = page + self.max_num_pages - 1 if self.max_num_pages else None
+            page_url = None
+            done = False
+            while not done:
+                # Fetch one window of listing pages concurrently; an incremental
+                # crawl usually stops on the first page, so go one at a time
+                window = 1 if self.incremental else max(self.num_workers, 1)
+                if last_page is not None:
+                    window = min(window, last_page - page + 1)
+                if window < 1:
+                    break
+                page_urls = []
+                for _ in range(window):
+                    page_url = next_page_func(
+                        start_url, page_url, page + len(page_urls)
+                    )
+                    page_urls.append(page_url)
+                for offset, page_links in enumerate(
+                    self._imap(parse_page_func, page_urls)
+                ):
+                    if not page_links:
+                        logger.info("No more links found, stopping...")
+                        done = True
+                        break
+                    num_new = 0
+                    for link in page_links:
+                        if link["url"] in link_urls:
+                            logger.info(
+                                "Link %s already exists, skipping...", link["url"]
+                            )
+                            continue
+                        link["page_url"] = page_urls[offset]
+                        link["page"] = page + offset
+                        links.append(link)
+                        link_urls.add(link["url"])
+                        num_new += 1
+                        HyFI.append_to_jsonl(link, self.link_filepath_tmp)
+                    if self.incremental and num_new == 0:
+                        logger.info(
+                            "All links on page %s are known, stopping...",
+                            page + offset,
+                        )
+                        done = True
+                        break
+                page += window
+            logger.info("Finished fetching links for url: %s", start_url)
+        logger.info("Total links fetched: %s", len(links))
+        if self.http_cache:
+            self.http_cache.log_stats()
+        if links:
+            self.save_links(links)
+        else:
+            logger.info("No more links found")
+
+    def _fetch_articles(self, parse_article_func: Callable):
+        article_urls = {article["url"] for article in self.articles}
+        links = [
+            link
+            for link in self.links
+            if self.overwrite_existing or link["url"] not in article_urls
+        ]
+        if self.max_num_articles is not None:
+            links = links[: self.max_num_articles]
+
+        def _fetch_article(link: dict) -> Optional[dict]:
+            try:
+                _article = parse_article_func(link["url"])
+            except Exception as e:
+                logger.error("Error while parsing the article: %s", link["url"])
+                logger.error("Error: %s", e)
+                return None
+            if _article is None:
+                logger.info(
+                    "Article [%s](%s) does not exist, skipping...",
+                    link["title"],
+                    link["url"],
+                )
+                return None
+            article = link.copy()
+            article.update(_article)
+            return article
+
+        articles = []
+        for article in self._imap(_fetch_article, links):
+            if article is None:
+                continue
+            articles.append(article)
+            HyFI.append_to_jsonl(article, self.article_filepath_tmp)
+            if self.verbose and len(articles) % self.print_every == 0:
+                logger.info(
+                    "Article [%s](%s) scraped", article["title"], article["url"]
+                )
+        logger.info("Total articles scraped: %s", len(articles))
+        if self.http_cache:
+            self.http_cache.log_stats()
+        if articles:
+            self.save_articles(articles)
+        else:
+            logger.info("No more articles found")
+
     def parse_page_links(
         self,
         page_url: str,
@@ -66,7 +470,14 @@ class SierraClubFetcher(BaseFetcher):
                 Returns None if parsing fails.
         """
         links = []
-        soup = self.get_soup(page_url)
+        soup = self.get_soup(
+            page_url,
+            parse_only=SoupStrainer(
+                self.link_find_all_name, attrs=self.link_find_all_attrs
+            ),
+        )
+        if soup is None:
+            return None
 
         # Find all articles
         articles = soup.find_all(
@@ -88,9 +499,9 @@ class SierraClubFetcher(BaseFetcher):
                 logger.info("No link found for article %s", article_no)
                 continue
 
-            date_ = article.find("div", class_="views-field-field-published-date").find(
-                "div", class_="field-content"
-            )
+            date_ = article.find("div", class_="views-field-field-published-date")
+            if date_ is not None:
+                date_ = date_.find("div", class_="field-content")
             item_date = date_.text.strip() if date_ else ""
 
             if verbose and article_no % print_every == 0:
@@ -115,13 +526,27 @@ class SierraClubFetcher(BaseFetcher):
             Optional[dict]: A dictionary containing the parsed article title and content.
                 Returns None if parsing fails.
         """
-        soup = self.get_soup(url)
-        if soup is None:
+        response = self.get_page(url)
+        if response is None:
             return None
+        http_cache = self.http_cache
+        if http_cache and response.not_modified:
+            if article := http_cache.get_parsed(url, self.article_parser_key):
+                return article
 
-        title = soup.find("h1", class_="page-header").text.strip()
-        content = soup.find("article", class_="press-release").text.strip()
-        return {
-            "title": title,
-            "content": content,
+        # Only the title and body elements are built into the tree
+        soup = self.make_soup(
+            response.text,
+            parse_only=SoupStrainer(
+                [self.article_title_name, self.article_content_name]
+            ),
+        )
+        title = soup.find(self.article_title_name, attrs=self.article_title_attrs)
+        content = soup.find(self.article_content_name, attrs=self.article_content_attrs)
+        article = {
+            "title": title.text.strip(),
+            "content": content.text.strip(),
         }
+        if http_cache:
+            http_cache.set_parsed(url, self.article_parser_key, article)
+        return article
@@ -1,4 +1,32 @@
-from .ollama import ChatOllamaModel
-from .openai import ChatOpenAIModel
+"""
+Chat model backends.
+
+The models import langchain, so they are loaded on first access; importing
+`sierra.llms.tokens` or `sierra.llms.ratelimit` does not pull them in.
+"""
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .ollama import ChatOllamaModel
+    from .openai import ChatOpenAIModel
+
+_LAZY_ATTRIBUTES = {
+    "ChatOpenAIModel": ".openai",
+    "ChatOllamaModel": ".ollama",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_ATTRIBUTES:
+        from sierra import initialize
+
+        # Their configs are generated under the package's config root
+        initialize()
+        module = importlib.import_module(_LAZY_ATTRIBUTES[name], __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = ["ChatOpenAIModel", "ChatOllamaModel"]
@@ -1,16 +1,48 @@
 import logging
-from typing import Optional
+from typing import Any, Dict, Optional, Type
 
 from hyfi.composer import BaseModel, Field
 from hyfi.env import Env
-from langchain_community.chat_models import ChatOllama
+from langchain_core.runnables import Runnable
+
+from sierra.llms.ratelimit import RateLimitConfig, rate_limited
+from sierra.llms.registry import chat_ollama
 
 logger = logging.getLogger(__name__)
 
 
 class ChatConfig(BaseModel):
+    """
+    Settings of the chat model.
+
+    Attributes:
+        model (str): The model name.
+        temperature (float): The sampling temperature.
+        num_ctx (Optional[int]): The context window Ollama allocates, which
+            defaults to 2048 tokens on the server; None keeps that default.
+        max_input_tokens (Optional[int]): Token budget of the text sent in one
+            prompt; longer texts are split into overlapping chunks that are
+            extracted concurrently and merged. None disables chunking.
+        chunk_overlap_tokens (int): Tokens shared by consecutive chunks.
+        max_chunk_concurrency (int): Maximum number of chunks of one text in
+            flight at a time.
+        max_output_tokens (Optional[int]): Token budget of one reply. A batch
+            holds no more texts than their expected replies fit in; None
+            leaves the batch size to `max_input_tokens` alone.
+        output_tokens_per_text (int): Expected reply tokens of one text of a
+            batch.
+    """
+
     model: str = "llama3"
     temperature: float = 0.0
+    num_ctx: Optional[int] = 8192
+    # Leaves room in llama3's 8k window for the prompt and the reply
+    max_input_tokens: Optional[int] = 6_000
+    chunk_overlap_tokens: int = 200
+    max_chunk_concurrency: int = 4
+    # What the window has left after the input budget and the instructions
+    max_output_tokens: Optional[int] = 1_536
+    output_tokens_per_text: int = 250
 
 
 class ChatEnv(Env):
@@ -25,10 +57,11 @@ class ChatOllamaModel(BaseModel):
 
     api_key: Optional[str] = None
     model_config: ChatConfig = ChatConfig()
+    rate_limit: RateLimitConfig = RateLimitConfig()
     seed: Optional[int] = None
     env: ChatEnv = ChatEnv()
 
-    _engine_: Optional[ChatOllama] = None
+    _engine_: Optional[Runnable] = None
 
     @property
     def engine(self):
@@ -40,10 +73,27 @@ class ChatOllamaModel(BaseModel):
         if isinstance(self.model_config, dict):
             self.model_config = ChatConfig(**self.model_config)
             logger.info("ChatConfig is set successfully. %s", self.model_config)
-        self._engine_ = ChatOllama(
-            base_url=self.env.OLLAMA_BASE_URL,
+        if isinstance(self.rate_limit, dict):
+            self.rate_limit = RateLimitConfig(**self.rate_limit)
+        engine = chat_ollama(
             model=self.model_config.model,
             temperature=self.model_config.temperature,
-            model_kwargs={"seed": self.seed},
+            seed=self.seed,
+            base_url=self.env.OLLAMA_BASE_URL,
+            num_ctx=self.model_config.num_ctx,
+        )
+        self._engine_ = rate_limited(
+            engine,
+            f"ollama:{self.env.OLLAMA_BASE_URL}:{self.model_config.model}",
+            self.rate_limit,
         )
         logger.info("ChatOllama is initialized.")
+
+    @property
+    def schema_in_prompt(self) -> bool:
+        # JSON mode constrains the syntax only, so the prompt carries the shape
+        return True
+
+    def structured_output(self, schema: Type[Any]) -> Dict[str, Any]:
+        """Call arguments making the engine reply with JSON."""
+        return {"format": "json"}
@@ -1,20 +1,50 @@
 import logging
-from typing import Optional
+from typing import Any, Dict, Optional, Type
 
 from hyfi.composer import BaseModel, Field, SecretStr
 from hyfi.env import Env
-from langchain_openai import ChatOpenAI
+from langchain_core.runnables import Runnable
+
+from sierra.llms.ratelimit import RateLimitConfig, rate_limited
+from sierra.llms.registry import chat_openai, secret_digest
 
 logger = logging.getLogger(__name__)
 
 
 class ChatConfig(BaseModel):
+    """
+    Settings of the chat model.
+
+    Attributes:
+        model (str): The model name.
+        temperature (float): The sampling temperature.
+        max_input_tokens (Optional[int]): Token budget of the text sent in one
+            prompt; longer texts are split into overlapping chunks that are
+            extracted concurrently and merged. None disables chunking.
+        chunk_overlap_tokens (int): Tokens shared by consecutive chunks.
+        max_chunk_concurrency (int): Maximum number of chunks of one text in
+            flight at a time.
+        max_output_tokens (Optional[int]): Token budget of one reply. A batch
+            holds no more texts than their expected replies fit in; None
+            leaves the batch size to `max_input_tokens` alone.
+        output_tokens_per_text (int): Expected reply tokens of one text of a
+            batch.
+    """
+
     model: str = "gpt-4-turbo"
     temperature: float = 0.0
+    # Leaves room in gpt-4-turbo's 128k window for the prompt and the reply
+    max_input_tokens: Optional[int] = 100_000
+    chunk_overlap_tokens: int = 200
+    max_chunk_concurrency: int = 4
+    # gpt-4-turbo replies with at most 4,096 tokens
+    max_output_tokens: Optional[int] = 4_096
+    output_tokens_per_text: int = 250
 
 
 class ChatEnv(Env):
     OPENAI_API_KEY: Optional[SecretStr] = Field(exclude=True, default="")
+    OPENAI_BASE_URL: Optional[str] = Field(exclude=True, default=None)
 
 
 class ChatOpenAIModel(BaseModel):
@@ -23,10 +53,11 @@ class ChatOpenAIModel(BaseModel):
 
     api_key: Optional[str] = None
     model_config: ChatConfig = ChatConfig()
+    rate_limit: RateLimitConfig = RateLimitConfig()
     seed: Optional[int] = None
     env: ChatEnv = ChatEnv()
 
-    _engine_: Optional[ChatOpenAI] = None
+    _engine_: Optional[Runnable] = None
 
     @property
     def engine(self):
@@ -44,11 +75,47 @@ class ChatOpenAIModel(BaseModel):
         if isinstance(self.model_config, dict):
             self.model_config = ChatConfig(**self.model_config)
             logger.info("ChatConfig is set successfully. %s", self.model_config)
+        if isinstance(self.rate_limit, dict):
+            self.rate_limit = RateLimitConfig(**self.rate_limit)
         logger.info("OpenAI API Key is set successfully.")
-        self._engine_ = ChatOpenAI(
-            api_key=api_key,
+        engine = chat_openai(
             model=self.model_config.model,
             temperature=self.model_config.temperature,
-            model_kwargs={"seed": self.seed},
+            seed=self.seed,
+            base_url=self.env.OPENAI_BASE_URL,
+            api_key=api_key,
+            # The rate limiter retries, and must see the 429s to back off
+            max_retries=0 if self.rate_limit.enabled else 2,
+        )
+        # Deployments and accounts have their own quotas
+        key = ":".join(
+            [
+                "openai",
+                self.env.OPENAI_BASE_URL or "",
+                secret_digest(api_key) or "",
+                self.model_config.model,
+            ]
         )
+        self._engine_ = rate_limited(engine, key, self.rate_limit)
         logger.info("ChatOpenAI is initialized.")
+
+    @property
+    def schema_in_prompt(self) -> bool:
+        # The tool definition carries the schema, so the prompt need not
+        return False
+
+    def structured_output(self, schema: Type[Any]) -> Dict[str, Any]:
+        """
+        Call arguments forcing the engine to reply with a `schema` object.
+
+        The schema is sent as the only tool and the model must call it, so
+        the reply is the tool call's JSON arguments.
+        """
+        from langchain_core.utils.function_calling import convert_to_openai_tool
+
+        tool = convert_to_openai_tool(schema)
+        name = tool["function"]["name"]
+        return {
+            "tools": [tool],
+            "tool_choice": {"type": "function", "function": {"name": name}},
+        }
@@ -0,0 +1,474 @@
+"""
+Client-side rate limiting and retries of LLM calls.
+
+A `RateLimiter` paces calls with requests-per-minute and tokens-per-minute
+token buckets, retries transient failures with jittered exponential backoff
+that honors `Retry-After`, and adapts the number of calls in flight with
+additive-increase/multiplicative-decrease (AIMD) from the errors and the
+latency it observes. `RateLimitedRunnable` puts an engine behind a limiter,
+and `get_rate_limiter` shares one limiter between the engines of a quota.
+"""
+
+import asyncio
+import email.utils
+import logging
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from hyfi.composer import BaseModel
+from langchain_core.prompt_values import PromptValue
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from sierra.fetcher.http import TokenBucket
+from sierra.llms.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Statuses worth retrying; the first ones also mean the server is overloaded
+THROTTLE_STATUS_CODES = {429, 503, 529}
+RETRY_STATUS_CODES = THROTTLE_STATUS_CODES | {408, 409, 500, 502, 504}
+
+# ChatOllama reports HTTP errors as a ValueError with the status in the message
+_STATUS_IN_MESSAGE_RE = re.compile(r"status code (\d{3})")
+
+
+class RateLimitConfig(BaseModel):
+    """
+    Settings of the client-side rate limiter.
+
+    Attributes:
+        enabled (bool): Put the engine behind a rate limiter. Its own retries
+            are then turned off, so that the limiter sees every failure.
+        requests_per_minute (Optional[int]): Request quota; None for no limit.
+        tokens_per_minute (Optional[int]): Token quota, counting the prompt
+            and `expected_output_tokens`; None for no limit.
+        expected_output_tokens (int): Tokens reserved for a reply until its
+            usage is reported.
+        burst_seconds (float): Seconds of quota that can be spent at once.
+        max_retries (int): Retries of a call that failed with a transient
+            error (429, 5xx, timeouts and connection errors).
+        initial_backoff (float): Seconds before the first retry; doubled
+            after every failure.
+        max_backoff (float): Upper bound of the backoff, unless the server
+            asks for more with `Retry-After`.
+        initial_concurrency (int): Calls in flight at the start.
+        min_concurrency (int): Lower bound of the calls in flight.
+        max_concurrency (int): Upper bound of the calls in flight.
+        latency_target (Optional[float]): Seconds; slower replies decrease
+            the concurrency like throttling errors do. None ignores latency.
+        decrease_factor (float): Factor applied to the concurrency on
+            throttling.
+    """
+
+    enabled: bool = True
+    requests_per_minute: Optional[int] = None
+    tokens_per_minute: Optional[int] = None
+    expected_output_tokens: int = 500
+    burst_seconds: float = 1.0
+    max_retries: int = 6
+    initial_backoff: float = 1.0
+    max_backoff: float = 60.0
+    initial_concurrency: int = 4
+    min_concurrency: int = 1
+    max_concurrency: int = 32
+    latency_target: Optional[float] = None
+    decrease_factor: float = 0.5
+
+
+def _bucket(
+    per_minute: Optional[int], burst_seconds: float, clock: Callable[[], float]
+) -> Optional[TokenBucket]:
+    """A bucket holding `burst_seconds` of a per-minute quota; None if no quota."""
+    if not per_minute:
+        return None
+    return TokenBucket(per_minute / 60, per_minute / 60 * burst_seconds, clock)
+
+
+def status_code(error: BaseException) -> Optional[int]:
+    """The HTTP status of a failed call, if the error tells it."""
+    for source in (error, getattr(error, "response", None)):
+        status = getattr(source, "status_code", None) or getattr(source, "status", None)
+        if isinstance(status, int):
+            return status
+    if match := _STATUS_IN_MESSAGE_RE.search(str(error)):
+        return int(match.group(1))
+    return None
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """
+    The seconds the server asked to wait with `Retry-After` (or OpenAI's
+    `retry-after-ms`), if any.
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        if (value := headers.get("retry-after-ms")) is not None:
+            return max(float(value) / 1000, 0.0)
+        if (value := headers.get("retry-after")) is None:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            date = email.utils.parsedate_to_datetime(value)
+            return max((date - datetime.now(timezone.utc)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _transient_errors() -> tuple:
+    errors = [ConnectionError, TimeoutError, asyncio.TimeoutError]
+    try:
+        import httpx
+
+        errors.append(httpx.TransportError)
+    except ImportError:
+        pass
+    try:
+        import requests
+
+        errors.extend([requests.ConnectionError, requests.Timeout])
+    except ImportError:
+        pass
+    try:
+        import aiohttp
+
+        errors.append(aiohttp.ClientConnectionError)
+    except ImportError:
+        pass
+    try:
+        import openai
+
+        errors.append(openai.APIConnectionError)
+    except ImportError:
+        pass
+    return tuple(errors)
+
+
+def is_transient(error: BaseException) -> bool:
+    """Whether a failed call is worth retrying."""
+    if (status := status_code(error)) is not None:
+        return status in RETRY_STATUS_CODES
+    return isinstance(error, _transient_errors())
+
+
+def _token_usage(result: Any) -> Optional[int]:
+    """The tokens a chat reply reports to have used, if it does."""
+    metadata = getattr(result, "response_metadata", None) or {}
+    usage = metadata.get("token_usage") or {}
+    if usage.get("total_tokens") is not None:
+        return int(usage["total_tokens"])
+    if "prompt_eval_count" in metadata or "eval_count" in metadata:
+        return int(metadata.get("prompt_eval_count") or 0) + int(
+            metadata.get("eval_count") or 0
+        )
+    return None
+
+
+def _input_text(input: Any) -> str:
+    if isinstance(input, str):
+        return input
+    if isinstance(input, PromptValue):
+        return input.to_string()
+    if isinstance(input, (list, tuple)):
+        return "\n".join(str(getattr(message, "content", message)) for message in input)
+    return str(input)
+
+
+class RateLimiter:
+    """
+    Pace, retry and bound the concurrency of calls sharing a quota.
+
+    Before a call, a request and the call's estimated tokens are reserved
+    from the buckets, and the caller waits until they are available, until a
+    `Retry-After` pause is over, and for a free slot. The number of slots
+    grows by one every `concurrency` successful calls and is multiplied by
+    `decrease_factor` on throttling, at most once per round of calls in
+    flight. Failed calls are retried if they are transient.
+
+    Args:
+        config (RateLimitConfig, optional): The settings.
+        clock (Callable[[], float], optional): The clock. Defaults to
+            `time.monotonic`.
+    """
+
+    def __init__(
+        self,
+        config: Optional[RateLimitConfig] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.config = config = config or RateLimitConfig()
+        self._clock = clock
+        self._requests = _bucket(
+            config.requests_per_minute, config.burst_seconds, clock
+        )
+        self._tokens = _bucket(config.tokens_per_minute, config.burst_seconds, clock)
+        self._limit = float(
+            min(
+                max(config.initial_concurrency, config.min_concurrency),
+                config.max_concurrency,
+            )
+        )
+        self._in_flight = 0
+        self._resume_at = 0.0
+        self._decreased_at = float("-inf")
+        self._condition = threading.Condition()
+        # Events of the async callers waiting for a slot, with their loops
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+
+    @property
+    def concurrency(self) -> int:
+        """The current number of slots."""
+        return max(int(self._limit), 1)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def estimate_tokens(self, input: Any) -> int:
+        """Tokens a call with this input is expected to use."""
+        if self._tokens is None:
+            return 0
+        return count_tokens(_input_text(input)) + self.config.expected_output_tokens
+
+    def _reserve(self, tokens: int) -> float:
+        wait = self._resume_at - self._clock()
+        if self._requests is not None:
+            wait = max(wait, self._requests.reserve(1))
+        if self._tokens is not None and tokens:
+            wait = max(wait, self._tokens.reserve(tokens))
+        return max(wait, 0.0)
+
+    async def _aacquire(self) -> float:
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._condition:
+                if self._in_flight < self.concurrency:
+                    self._in_flight += 1
+                    return self._clock()
+                waiter = (loop, asyncio.Event())
+                self._async_waiters.append(waiter)
+            try:
+                await waiter[1].wait()
+            finally:
+                with self._condition:
+                    if waiter in self._async_waiters:
+                        self._async_waiters.remove(waiter)
+
+    def _wake_async_waiters(self) -> None:
+        # Called with the condition held; the waiters may be on other loops
+        for loop, event in self._async_waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # The loop is closed; its waiter is gone
+                pass
+        self._async_waiters.clear()
+
+    def _acquire(self) -> float:
+        with self._condition:
+            while self._in_flight >= self.concurrency:
+                self._condition.wait()
+            self._in_flight += 1
+            return self._clock()
+
+    def _release(self, started: float, throttled: bool, succeeded: bool) -> None:
+        config = self.config
+        with self._condition:
+            self._in_flight -= 1
+            latency = self._clock() - started
+            if config.latency_target is not None and latency > config.latency_target:
+                throttled = True
+            if throttled:
+                # Calls started before the last decrease saw the old limit
+                if started >= self._decreased_at:
+                    self._limit = max(
+                        config.min_concurrency, self._limit * config.decrease_factor
+                    )
+                    self._decreased_at = self._clock()
+                    logger.info(
+                        "Decreased the LLM call concurrency to %s", self.concurrency
+                    )
+            elif succeeded:
+                self._limit = min(config.max_concurrency, self._limit + 1 / self._limit)
+            self._condition.notify_all()
+            self._wake_async_waiters()
+
+    def _succeeded(self, started: float, result: Any, tokens: int) -> None:
+        if self._tokens is not None and (used := _token_usage(result)) is not None:
+            self._tokens.refund(tokens - used)
+        self._release(started, throttled=False, succeeded=True)
+
+    def backoff(self, attempt: int, wait: Optional[float] = None) -> float:
+        """
+        Seconds to wait before retry number `attempt` (from 0): `wait`, as
+        asked by the server, or else an exponential backoff, with jitter.
+        """
+        config = self.config
+        if wait is not None:
+            return wait + random.uniform(0, config.initial_backoff)
+        cap = min(config.max_backoff, config.initial_backoff * 2**attempt)
+        return cap / 2 + random.uniform(0, cap / 2)
+
+    def _failed(
+        self, error: BaseException, started: float, attempt: int, tokens: int = 0
+    ) -> Optional[float]:
+        """
+        Release the slot of a failed call and return its retry delay, if any.
+
+        The call's tokens are refunded if it was throttled, as the server
+        rejected it without using them, or if it is retried, as the retry
+        reserves them again.
+        """
+        if not isinstance(error, Exception):
+            self._release(started, throttled=False, succeeded=False)
+            return None
+        throttled = status_code(error) in THROTTLE_STATUS_CODES
+        retried = is_transient(error) and attempt < self.config.max_retries
+        if self._tokens is not None and tokens and (throttled or retried):
+            self._tokens.refund(tokens)
+        self._release(started, throttled=throttled, succeeded=False)
+        if not retried:
+            return None
+        wait = retry_after(error)
+        if wait is not None:
+            # Hold back the other callers too
+            with self._condition:
+                self._resume_at = max(self._resume_at, self._clock() + wait)
+        delay = self.backoff(attempt, wait)
+        logger.warning(
+            "LLM call failed (%s); retry %s of %s in %.1fs",
+            error,
+            attempt + 1,
+            self.config.max_retries,
+            delay,
+        )
+        return delay
+
+    def call(self, fn: Callable[[], T], tokens: int = 0) -> T:
+        """
+        Call `fn` under the limits, retrying transient failures.
+
+        Args:
+            fn (Callable[[], T]): The call.
+            tokens (int, optional): Its estimated tokens. Defaults to 0.
+
+        Returns:
+            T: What `fn` returns.
+        """
+        attempt = 0
+        while True:
+            time.sleep(self._reserve(tokens))
+            started = self._acquire()
+            try:
+                result = fn()
+            except BaseException as e:
+                if (delay := self._failed(e, started, attempt, tokens)) is None:
+                    raise
+            else:
+                self._succeeded(started, result, tokens)
+                return result
+            time.sleep(delay)
+            attempt += 1
+
+    async def acall(self, fn: Callable[[], Awaitable[T]], tokens: int = 0) -> T:
+        """Asynchronous version of `call`."""
+        attempt = 0
+        while True:
+            await asyncio.sleep(self._reserve(tokens))
+            started = await self._aacquire()
+            try:
+                result = await fn()
+            except BaseException as e:
+                if (delay := self._failed(e, started, attempt, tokens)) is None:
+                    raise
+            else:
+                self._succeeded(started, result, tokens)
+                return result
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+class RateLimitedRunnable(Runnable):
+    """
+    A runnable, usually a chat model, whose calls go through a `RateLimiter`.
+
+    `invoke` and `ainvoke` are limited; `batch` and `abatch` call them, so
+    every input of a batch is limited on its own.
+
+    Args:
+        bound (Runnable): The wrapped runnable.
+        limiter (RateLimiter): The limiter.
+    """
+
+    def __init__(self, bound: Runnable, limiter: RateLimiter):
+        self.bound = bound
+        self.limiter = limiter
+
+    @property
+    def InputType(self) -> Any:
+        return self.bound.InputType
+
+    @property
+    def OutputType(self) -> Any:
+        return self.bound.OutputType
+
+    def invoke(
+        self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any
+    ) -> Any:
+        return self.limiter.call(
+            lambda: self.bound.invoke(input, config, **kwargs),
+            self.limiter.estimate_tokens(input),
+        )
+
+    async def ainvoke(
+        self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any
+    ) -> Any:
+        return await self.limiter.acall(
+            lambda: self.bound.ainvoke(input, config, **kwargs),
+            self.limiter.estimate_tokens(input),
+        )
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(key: str, config: Optional[RateLimitConfig] = None) -> RateLimiter:
+    """
+    Return the limiter of a quota, creating it with `config` the first time.
+
+    Engines of the same provider, account and model share a quota, so they
+    should share a limiter; the key identifies it. A different `config` for
+    an existing key is ignored with a warning.
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = RateLimiter(config)
+        elif config is not None and config != limiter.config:
+            logger.warning(
+                "The rate limiter of %s already exists; ignoring its new settings "
+                "%s in favor of %s",
+                key,
+                config,
+                limiter.config,
+            )
+        return limiter
+
+
+def rate_limited(
+    engine: Runnable, key: str, config: Optional[RateLimitConfig] = None
+) -> Runnable:
+    """Put an engine behind the shared limiter of `key`, unless disabled."""
+    config = config or RateLimitConfig()
+    if not config.enabled:
+        return engine
+    return RateLimitedRunnable(engine, get_rate_limiter(key, config))
@@ -0,0 +1,271 @@
+"""
+Process-wide registry of chat engines and their pooled HTTP clients.
+
+Extractors that use the same provider, model and settings get the same
+engine, and engines that talk to the same server share one keep-alive
+connection pool, so running several extractors over a corpus reuses warm
+connections instead of opening new ones per client.
+"""
+
+import asyncio
+import atexit
+import hashlib
+import logging
+import threading
+import weakref
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Connections stay open between the batches of a run (httpx closes idle ones
+# after 5 seconds by default)
+DEFAULT_LIMITS = httpx.Limits(
+    max_connections=100, max_keepalive_connections=32, keepalive_expiry=120.0
+)
+DEFAULT_TIMEOUT = httpx.Timeout(600.0, connect=10.0)
+# Seconds to wait for another thread's loop to close its connection pool
+CLOSE_TIMEOUT = 10.0
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class LoopLocalTransport(httpx.AsyncBaseTransport):
+    """
+    Async transport keeping a connection pool per event loop.
+
+    Pooled connections belong to the loop that opened them, and the
+    extraction pipeline runs every call on a private loop, so a single pool
+    shared across loops would hand out dead connections.
+
+    Args:
+        **kwargs: Arguments of each loop's `httpx.AsyncHTTPTransport`.
+    """
+
+    def __init__(self, **kwargs: Any):
+        self._kwargs = kwargs
+        self._transports: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _transport(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if (transport := self._transports.get(loop)) is None:
+                # The pools of closed loops can no longer be used or closed
+                closed = [other for other in self._transports if other.is_closed()]
+                for other in closed:
+                    del self._transports[other]
+                transport = httpx.AsyncHTTPTransport(**self._kwargs)
+                self._transports[loop] = transport
+            return transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._transport().handle_async_request(request)
+
+    async def aclose(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            transport = self._transports.pop(loop, None)
+        if transport is not None:
+            await transport.aclose()
+
+    def close(self) -> None:
+        """
+        Close the pools of every loop from synchronous code.
+
+        Each pool is closed on its own loop: right away if the loop is idle,
+        or scheduled on it if it is running, waiting up to `CLOSE_TIMEOUT`
+        seconds unless it is the caller's loop. The pools of closed loops
+        are dropped.
+        """
+        with self._lock:
+            transports = list(self._transports.items())
+            self._transports.clear()
+        for loop, transport in transports:
+            if loop.is_closed():
+                continue
+            if loop.is_running():
+                future = asyncio.run_coroutine_threadsafe(transport.aclose(), loop)
+                if loop is not _running_loop():
+                    try:
+                        future.result(timeout=CLOSE_TIMEOUT)
+                    except Exception as e:
+                        logger.warning("Could not close a connection pool: %s", e)
+                continue
+            try:
+                loop.run_until_complete(transport.aclose())
+            except RuntimeError:
+                # Another loop runs in this thread; the pool goes with its loop
+                logger.debug("Could not close an idle loop's connection pool")
+
+
+_engines: Dict[Hashable, Any] = {}
+_clients: Dict[str, Tuple[httpx.Client, httpx.AsyncClient]] = {}
+_async_transports: Dict[str, LoopLocalTransport] = {}
+_lock = threading.RLock()
+
+
+def http_clients(
+    base_url: Optional[str] = None,
+) -> Tuple[httpx.Client, httpx.AsyncClient]:
+    """
+    Return the shared sync and async HTTP clients of a server.
+
+    Both are thread-safe and keep connections alive for `DEFAULT_LIMITS`.
+
+    Args:
+        base_url (Optional[str], optional): The server; None for the
+            provider's default. Defaults to None.
+
+    Returns:
+        Tuple[httpx.Client, httpx.AsyncClient]: The clients.
+    """
+    key = base_url or ""
+    with _lock:
+        if key not in _clients:
+            transport = _async_transports[key] = LoopLocalTransport(
+                limits=DEFAULT_LIMITS
+            )
+            _clients[key] = (
+                httpx.Client(limits=DEFAULT_LIMITS, timeout=DEFAULT_TIMEOUT),
+                httpx.AsyncClient(transport=transport, timeout=DEFAULT_TIMEOUT),
+            )
+            logger.info("Created a pooled HTTP client for %s", base_url or "default")
+        return _clients[key]
+
+
+def get_engine(key: Hashable, factory: Callable[[], T]) -> T:
+    """Return the engine registered under `key`, building it once with `factory`."""
+    with _lock:
+        if key not in _engines:
+            _engines[key] = factory()
+        return _engines[key]
+
+
+def secret_digest(secret: Optional[str]) -> Optional[str]:
+    """
+    A short digest of an API key, so that engines and limiters of different
+    keys are kept apart without the key itself being kept in their keys.
+    """
+    if not secret:
+        return None
+    return hashlib.sha256(secret.encode("utf-8")).hexdigest()[:16]
+
+
+def chat_openai(
+    model: str,
+    temperature: float = 0.0,
+    seed: Optional[int] = None,
+    base_url: Optional[str] = None,
+    api_key: Optional[str] = None,
+    max_retries: int = 2,
+):
+    """
+    Return the shared `ChatOpenAI` engine of these settings.
+
+    Args:
+        model (str): The model name.
+        temperature (float, optional): The sampling temperature. Defaults to 0.0.
+        seed (Optional[int], optional): The sampling seed. Defaults to None.
+        base_url (Optional[str], optional): The API base URL. Defaults to
+            OpenAI's.
+        api_key (Optional[str], optional): The API key. Defaults to the
+            `OPENAI_API_KEY` environment variable.
+        max_retries (int, optional): Retries of the OpenAI client. Defaults to 2.
+
+    Returns:
+        ChatOpenAI: The engine.
+    """
+    from langchain_openai import ChatOpenAI
+
+    def _build() -> ChatOpenAI:
+        http_client, http_async_client = http_clients(base_url)
+        return ChatOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            model=model,
+            temperature=temperature,
+            model_kwargs={"seed": seed},
+            max_retries=max_retries,
+            http_client=http_client,
+            http_async_client=http_async_client,
+        )
+
+    key = (
+        "openai",
+        model,
+        temperature,
+        seed,
+        base_url,
+        secret_digest(api_key),
+        max_retries,
+    )
+    return get_engine(key, _build)
+
+
+def chat_ollama(
+    model: str,
+    temperature: float = 0.0,
+    seed: Optional[int] = None,
+    base_url: str = "http://localhost:11434",
+    num_ctx: Optional[int] = None,
+):
+    """
+    Return the shared `ChatOllama` engine of these settings.
+
+    ChatOllama opens its own connection per request, so only the engine is
+    shared.
+
+    Args:
+        model (str): The model name.
+        temperature (float, optional): The sampling temperature. Defaults to 0.0.
+        seed (Optional[int], optional): The sampling seed. Defaults to None.
+        base_url (str, optional): The Ollama server. Defaults to
+            "http://localhost:11434".
+        num_ctx (Optional[int], optional): The context window. Defaults to
+            the server's.
+
+    Returns:
+        ChatOllama: The engine.
+    """
+    from langchain_community.chat_models import ChatOllama
+
+    def _build() -> ChatOllama:
+        return ChatOllama(
+            base_url=base_url,
+            model=model,
+            temperature=temperature,
+            num_ctx=num_ctx,
+            model_kwargs={"seed": seed},
+        )
+
+    key = ("ollama", model, temperature, seed, base_url, num_ctx)
+    return get_engine(key, _build)
+
+
+def close_all() -> None:
+    """
+    Forget the engines and close the HTTP clients.
+
+    The async clients' pools are closed on the loops that own them (see
+    `LoopLocalTransport.close`).
+    """
+    with _lock:
+        for http_client, _ in _clients.values():
+            http_client.close()
+        for transport in _async_transports.values():
+            transport.close()
+        _clients.clear()
+        _async_transports.clear()
+        _engines.clear()
+
+
+atexit.register(close_all)
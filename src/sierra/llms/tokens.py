@@ -0,0 +1,51 @@
+"""
+Token counting for LLM inputs.
+"""
+
+import logging
+import re
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\w+|[^\w\s]")
+
+
+@lru_cache(maxsize=None)
+def get_encoding(encoding_name: str = "cl100k_base"):
+    """
+    Load a tiktoken encoding, or return None if tiktoken or its BPE file is
+    unavailable (tiktoken downloads the file on first use).
+    """
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(encoding_name)
+    except Exception as e:
+        logger.warning(
+            "tiktoken encoding %s is unavailable, approximating token counts: %s",
+            encoding_name,
+            e,
+        )
+        return None
+
+
+def count_tokens(text: str, encoding_name: str = "cl100k_base") -> int:
+    """
+    Count the tokens of `text`.
+
+    Falls back to counting words and punctuation marks, which is close to the
+    BPE count for English prose, when no tiktoken encoding is available.
+
+    Args:
+        text (str): The text.
+        encoding_name (str, optional): The tiktoken encoding. Defaults to "cl100k_base".
+
+    Returns:
+        int: The number of tokens.
+    """
+    if not text:
+        return 0
+    if (encoding := get_encoding(encoding_name)) is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(_WORD_RE.findall(text))
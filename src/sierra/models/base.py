@@ -0,0 +1,403 @@
+import logging
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from hyfi.composer import BaseModel
+from langchain.output_parsers import PydanticOutputParser
+from langchain.prompts import ChatPromptTemplate
+from langchain_core.messages import SystemMessage
+from langchain_core.pydantic_v1 import BaseModel as BaseModelV1
+from langchain_core.pydantic_v1 import Field as FieldV1
+
+from sierra.llms.tokens import count_tokens
+
+from .chunking import merge_details, split_text
+from .structured import StructuredOutputParser, structured_chain
+
+logger = logging.getLogger(__name__)
+
+# The instructions are constants, not templates, so that every extractor and
+# provider sends the same bytes ahead of the text. SYSTEM_PROMPT leads both
+# the single and the batch prompts.
+SYSTEM_PROMPT = "Your goal is to extract the details of a lawsuit from the given text."
+BATCH_PROMPT = (
+    "Several texts are given, each in a <text> element with an id. Give exactly "
+    "one result per text, with the id of its text."
+)
+
+
+class LawsuitDetails(BaseModelV1):
+    has_lawsuit: bool = FieldV1(description="Indicates if the text mentions a lawsuit")
+    claimant: List[str] = FieldV1(description="The claimant in the lawsuit")
+    defendant: List[str] = FieldV1(description="The defendant in the lawsuit")
+    case_summary: str = FieldV1(description="A brief summary of the case")
+    case_date: str = FieldV1(description="The date of the lawsuit")
+    other_details: Optional[str] = FieldV1(
+        description="Any other relevant details about the lawsuit"
+    )
+
+
+class IdentifiedLawsuitDetails(LawsuitDetails):
+    id: str = FieldV1(description="The id of the text the details are extracted from")
+
+
+class LawsuitDetailsBatch(BaseModelV1):
+    results: List[IdentifiedLawsuitDetails] = FieldV1(
+        description="The lawsuit details of each text, one per text id"
+    )
+
+
+class BaseExtractor(BaseModel):
+    """
+    Shared implementation of the extractors: engine, prompt, parser, chain
+    and chunking.
+
+    The prompt is a system message with the static instructions, starting
+    with `preamble` and ending with the format instructions of the reply,
+    followed by the text in its own message. Subclasses give the reply's
+    `output_schema`; `result_model` is what `extract` returns.
+
+    Texts longer than the `max_input_tokens` of the model's `ChatConfig` are
+    split into overlapping chunks, extracted as one batch and combined with
+    `merge_results`.
+
+    With `structured_output`, the provider's native structured output is used
+    instead of format instructions in the prompt, and malformed replies are
+    repaired (see `sierra.models.structured`).
+
+    Attributes:
+        llm_model: The chat model.
+        structured_output (bool): Use the provider's native structured output.
+    """
+
+    llm_model: Any = None
+    structured_output: bool = False
+
+    _engine_: Optional[Any] = None
+    _output_parser_: Optional[PydanticOutputParser] = None
+    _prompt_: Optional[ChatPromptTemplate] = None
+
+    def initialize(self):
+        self._engine_ = self.llm_model.engine
+        self._output_parser_ = self._create_output_parser()
+        self._prompt_ = self._create_prompt()
+
+    @property
+    def engine(self):
+        if self._engine_ is None:
+            self.initialize()
+        return self._engine_
+
+    @property
+    def output_schema(self) -> Type[BaseModelV1]:
+        """The model of the LLM's reply."""
+        return LawsuitDetails
+
+    @property
+    def result_model(self) -> Type[BaseModelV1]:
+        """The model of the results of `extract`."""
+        return self.output_schema
+
+    @property
+    def preamble(self) -> str:
+        """The instructions leading the system prompt."""
+        return SYSTEM_PROMPT
+
+    @property
+    def output_parser(self) -> PydanticOutputParser:
+        if self._output_parser_ is None:
+            self._output_parser_ = self._create_output_parser()
+        return self._output_parser_
+
+    @property
+    def prompt(self) -> ChatPromptTemplate:
+        if self._prompt_ is None:
+            self._prompt_ = self._create_prompt()
+        return self._prompt_
+
+    @property
+    def chain(self):
+        if self.structured_output:
+            return self._structured_chain(self.prompt, self.output_parser)
+        return self.prompt | self.engine | self.output_parser
+
+    @property
+    def chat_config(self) -> Dict[str, Any]:
+        config = self.llm_model.model_config
+        if not isinstance(config, dict):
+            config = config.model_dump()
+        return config
+
+    @property
+    def llm_params(self) -> Dict[str, Any]:
+        """The LLM settings that determine the extraction result."""
+        config = self.chat_config
+        return {
+            "provider": type(self.llm_model).__name__,
+            "model": config.get("model"),
+            "temperature": config.get("temperature"),
+            "seed": self.llm_model.seed,
+        }
+
+    @property
+    def prompt_template(self) -> str:
+        """The prompt with every static part rendered and an empty text."""
+        return self.prompt.format(text="")
+
+    def split_input(self, input_text: str) -> List[str]:
+        """Split a text into chunks that fit the model's input token budget."""
+        config = self.chat_config
+        chunks = split_text(
+            input_text,
+            max_tokens=config.get("max_input_tokens") or 0,
+            overlap_tokens=config.get("chunk_overlap_tokens") or 0,
+        )
+        if len(chunks) > 1:
+            logger.info("Split a long text into %s chunks", len(chunks))
+        return chunks
+
+    def _chunk_config(self) -> Dict[str, Any]:
+        return {"max_concurrency": self.chat_config.get("max_chunk_concurrency")}
+
+    def merge_results(self, results: List[Any]) -> Any:
+        """Merge the results of the chunks of one text, in text order."""
+        return merge_details(results)
+
+    def extract(self, input_text: str):
+        chunks = self.split_input(input_text)
+        if len(chunks) == 1:
+            return self.chain.invoke({"text": input_text})
+        inputs = [{"text": chunk} for chunk in chunks]
+        return self.merge_results(self.chain.batch(inputs, config=self._chunk_config()))
+
+    async def aextract(self, input_text: str):
+        chunks = self.split_input(input_text)
+        if len(chunks) == 1:
+            return await self.chain.ainvoke({"text": input_text})
+        inputs = [{"text": chunk} for chunk in chunks]
+        return self.merge_results(
+            await self.chain.abatch(inputs, config=self._chunk_config())
+        )
+
+    def _parser(self, schema: Type[BaseModelV1]):
+        if self.structured_output:
+            return StructuredOutputParser(pydantic_object=schema)
+        return PydanticOutputParser(pydantic_object=schema)
+
+    def _structured_chain(self, prompt: ChatPromptTemplate, parser):
+        schema = parser.pydantic_object
+        engine = self.engine.bind(**self.llm_model.structured_output(schema))
+        return structured_chain(prompt, engine, parser)
+
+    def _format_instructions(self, parser) -> str:
+        # Native structured output needs at most the shape of the reply
+        if self.structured_output and not self.llm_model.schema_in_prompt:
+            return ""
+        return parser.get_format_instructions()
+
+    def _create_output_parser(self) -> PydanticOutputParser:
+        return self._parser(self.output_schema)
+
+    def _join_system_prompt(self, parts: List[str], parser) -> str:
+        if format_instructions := self._format_instructions(parser):
+            parts = [*parts, format_instructions]
+        return "\n\n".join(parts)
+
+    def system_prompt(self) -> str:
+        """
+        The static instructions leading the prompt.
+
+        The text comes last, in its own message, so consecutive prompts share
+        this prefix byte for byte and the provider's prompt cache (or Ollama's
+        KV cache) can reuse it.
+        """
+        return self._join_system_prompt([self.preamble], self.output_parser)
+
+    def _create_prompt(self):
+        # A message object is not a template, so the braces of the schema
+        # are sent as they are
+        return ChatPromptTemplate.from_messages(
+            [SystemMessage(content=self.system_prompt()), ("human", "{text}")]
+        )
+
+
+class BaseLawsuitExtractor(BaseExtractor):
+    """
+    Shared implementation of the lawsuit extractors.
+
+    Subclasses only bind the `llm_model` used to build the engine; the prompt,
+    the output parser and the chain are identical across providers (see
+    `BaseExtractor`).
+
+    `extract_batch` packs several short texts into one prompt, so the request
+    and the format instructions are paid once per batch instead of per text.
+
+    Attributes:
+        llm_model: The chat model.
+        structured_output (bool): Use the provider's native structured output.
+    """
+
+    _config_group_: str = "/model"
+    _config_name_: str = "LawsuitExtractor"
+
+    _batch_output_parser_: Optional[PydanticOutputParser] = None
+    _batch_prompt_: Optional[ChatPromptTemplate] = None
+
+    @property
+    def batch_output_parser(self) -> PydanticOutputParser:
+        if self._batch_output_parser_ is None:
+            self._batch_output_parser_ = self._parser(LawsuitDetailsBatch)
+        return self._batch_output_parser_
+
+    @property
+    def batch_prompt(self) -> ChatPromptTemplate:
+        if self._batch_prompt_ is None:
+            self._batch_prompt_ = self._create_batch_prompt()
+        return self._batch_prompt_
+
+    @property
+    def batch_chain(self):
+        if self.structured_output:
+            return self._structured_chain(self.batch_prompt, self.batch_output_parser)
+        return self.batch_prompt | self.engine | self.batch_output_parser
+
+    @property
+    def batch_prompt_template(self) -> str:
+        """The batch prompt with every static part rendered and no texts."""
+        return self.batch_prompt.format(texts="")
+
+    @property
+    def max_batch_size(self) -> Optional[int]:
+        """The most texts whose expected replies fit `max_output_tokens`."""
+        config = self.chat_config
+        budget = config.get("max_output_tokens")
+        per_text = config.get("output_tokens_per_text")
+        if not budget or not per_text:
+            return None
+        return max(budget // per_text, 1)
+
+    def pack_batches(self, texts: Dict[str, str]) -> List[List[str]]:
+        """
+        Group keys so that the texts of a group fit `max_input_tokens`
+        together, and their replies `max_output_tokens`; a reply cut short
+        would lose the results of the last texts.
+
+        A text over the budget on its own is a group of one and is chunked.
+        """
+        budget = self.chat_config.get("max_input_tokens") or 0
+        max_size = self.max_batch_size
+        batches: List[List[str]] = []
+        batch_tokens = 0
+        for key, text in texts.items():
+            tokens = count_tokens(text)
+            if (
+                not batches
+                or (budget and batch_tokens + tokens > budget)
+                or (max_size and len(batches[-1]) >= max_size)
+            ):
+                batches.append([])
+                batch_tokens = 0
+            batches[-1].append(key)
+            batch_tokens += tokens
+        return batches
+
+    @staticmethod
+    def _batch_inputs(
+        texts: Dict[str, str], keys: List[str]
+    ) -> Tuple[Dict[str, str], Dict[str, str]]:
+        # Short ids instead of the keys keep the prompt and the reply small
+        ids = {str(i): key for i, key in enumerate(keys, 1)}
+        rendered = "\n\n".join(
+            f'<text id="{text_id}">\n{texts[key]}\n</text>'
+            for text_id, key in ids.items()
+        )
+        return ids, {"texts": rendered}
+
+    @staticmethod
+    def _batch_results(
+        ids: Dict[str, str], batch: LawsuitDetailsBatch
+    ) -> Dict[str, LawsuitDetails]:
+        results = {}
+        for details in batch.results:
+            key = ids.get(details.id.strip())
+            if key is not None and key not in results:
+                results[key] = LawsuitDetails(**details.dict(exclude={"id"}))
+        return results
+
+    def extract_batch(self, texts: Dict[str, str]) -> Dict[str, LawsuitDetails]:
+        """
+        Extract lawsuit details from several texts with as few requests as
+        possible.
+
+        Texts are packed into prompts of up to `max_input_tokens` (see
+        `pack_batches`). Texts missing from a reply, or from a reply that
+        fails to parse, are extracted one by one with `extract`.
+
+        Args:
+            texts (Dict[str, str]): The texts by key, e.g. by UUID.
+
+        Returns:
+            Dict[str, LawsuitDetails]: The details by key. Texts whose
+                extraction failed are logged and left out.
+        """
+        results: Dict[str, LawsuitDetails] = {}
+        for keys in self.pack_batches(texts):
+            if len(keys) == 1:
+                continue
+            ids, inputs = self._batch_inputs(texts, keys)
+            try:
+                results.update(
+                    self._batch_results(ids, self.batch_chain.invoke(inputs))
+                )
+            except Exception as e:
+                logger.warning("Batch of %s texts failed: %s", len(keys), e)
+        for key, text in texts.items():
+            if key in results:
+                continue
+            try:
+                results[key] = self.extract(text)
+            except Exception as e:
+                logger.error("Error extracting lawsuit details for %s: %s", key, e)
+        return results
+
+    async def aextract_batch(self, texts: Dict[str, str]) -> Dict[str, LawsuitDetails]:
+        """Asynchronous version of `extract_batch`."""
+        results: Dict[str, LawsuitDetails] = {}
+        for keys in self.pack_batches(texts):
+            if len(keys) == 1:
+                continue
+            ids, inputs = self._batch_inputs(texts, keys)
+            try:
+                results.update(
+                    self._batch_results(ids, await self.batch_chain.ainvoke(inputs))
+                )
+            except Exception as e:
+                logger.warning("Batch of %s texts failed: %s", len(keys), e)
+        for key, text in texts.items():
+            if key in results:
+                continue
+            try:
+                results[key] = await self.aextract(text)
+            except Exception as e:
+                logger.error("Error extracting lawsuit details for %s: %s", key, e)
+        return results
+
+    def system_prompt(self, batch: bool = False) -> str:
+        """
+        The static instructions leading the single or the batch prompt.
+
+        Both prompts start with the `preamble` and then give the schema of
+        their own reply (see `BaseExtractor.system_prompt`).
+        """
+        if not batch:
+            return super().system_prompt()
+        return self._join_system_prompt(
+            [self.preamble, BATCH_PROMPT], self.batch_output_parser
+        )
+
+    def _create_batch_prompt(self):
+        return ChatPromptTemplate.from_messages(
+            [
+                SystemMessage(content=self.system_prompt(batch=True)),
+                ("human", "{texts}"),
+            ]
+        )
@@ -0,0 +1,152 @@
+"""
+Token-budgeted chunking of long texts and merging of the per-chunk results.
+"""
+
+import re
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sierra.llms.tokens import count_tokens
+from sierra.pipes.names import normalize_name
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_SENTENCE_RE = re.compile(r"(?<=[.!?”\"])\s+|(?<=[.!?])(?=[A-Z“\"])")
+
+# A piece of text and the index of its paragraph
+Unit = Tuple[str, int]
+
+
+def _units(text: str, max_tokens: int, encoding_name: str) -> List[Unit]:
+    """Split text into sentences, and sentences over `max_tokens` into words."""
+    units = []
+    for paragraph_no, paragraph in enumerate(_PARAGRAPH_RE.split(text)):
+        for sentence in _SENTENCE_RE.split(paragraph.strip()):
+            if not sentence:
+                continue
+            if count_tokens(sentence, encoding_name) <= max_tokens:
+                units.append((sentence, paragraph_no))
+                continue
+            words = sentence.split()
+            # Tokens per word vary; halve the piece until it fits
+            step = max(len(words) // 2, 1)
+            while (
+                step > 1
+                and count_tokens(" ".join(words[:step]), encoding_name) > max_tokens
+            ):
+                step //= 2
+            units.extend(
+                (" ".join(words[i : i + step]), paragraph_no)
+                for i in range(0, len(words), step)
+            )
+    return units
+
+
+def _join(units: Sequence[Unit]) -> str:
+    pieces = []
+    for i, (piece, paragraph_no) in enumerate(units):
+        if i:
+            pieces.append("\n\n" if paragraph_no != units[i - 1][1] else " ")
+        pieces.append(piece)
+    return "".join(pieces)
+
+
+def split_text(
+    text: str,
+    max_tokens: int,
+    overlap_tokens: int = 0,
+    encoding_name: str = "cl100k_base",
+) -> List[str]:
+    """
+    Split a text into overlapping windows of at most `max_tokens` tokens.
+
+    Windows are packed from whole sentences (words, for a sentence over the
+    budget) and keep the paragraph breaks. Each window after the first starts
+    with the last sentences of the previous one, up to `overlap_tokens`, so
+    that context cut at a boundary is seen on both sides.
+
+    Args:
+        text (str): The text.
+        max_tokens (int): The token budget of a window.
+        overlap_tokens (int, optional): Tokens repeated from the previous
+            window. Defaults to 0.
+        encoding_name (str, optional): The tiktoken encoding. Defaults to
+            "cl100k_base".
+
+    Returns:
+        List[str]: The windows; `[text]` if it fits the budget.
+    """
+    if max_tokens <= 0 or count_tokens(text, encoding_name) <= max_tokens:
+        return [text]
+    overlap_tokens = min(max(overlap_tokens, 0), max_tokens // 2)
+
+    windows: List[str] = []
+    window: List[Unit] = []
+    sizes: List[int] = []
+    for unit in _units(text, max_tokens, encoding_name):
+        # The separator costs about a token
+        size = count_tokens(unit[0], encoding_name) + 1
+        if window and sum(sizes) + size > max_tokens:
+            windows.append(_join(window))
+            # Start the next window with the tail of this one
+            start, carried = len(window), 0
+            while (
+                carried + sizes[start - 1] <= overlap_tokens
+                and carried + sizes[start - 1] + size <= max_tokens
+            ):
+                start -= 1
+                carried += sizes[start]
+            window, sizes = window[start:], sizes[start:]
+        window.append(unit)
+        sizes.append(size)
+    if window:
+        windows.append(_join(window))
+    return windows
+
+
+def _unique_names(names: Sequence[str]) -> List[str]:
+    """Drop names equal to an earlier one once normalized, keeping the order."""
+    seen = set()
+    unique = []
+    for name in names:
+        key = normalize_name(name) or name.strip().lower()
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(name)
+    return unique
+
+
+def merge_details(details: Sequence[Any]) -> Optional[Any]:
+    """
+    Merge the lawsuit details extracted from the chunks of one text.
+
+    Claimants and defendants are the union over the chunks that report a
+    lawsuit, deduplicated by their normalized name. The summary and the date
+    come from the first such chunk that has them, and the other details of
+    all of them are joined.
+
+    Args:
+        details (Sequence[LawsuitDetails]): The per-chunk details, in text
+            order.
+
+    Returns:
+        Optional[LawsuitDetails]: The merged details, of the same class as
+            the inputs, or None if there are none.
+    """
+    if not details:
+        return None
+    if len(details) == 1:
+        return details[0]
+    found = [detail for detail in details if detail.has_lawsuit]
+    if not found:
+        return details[0]
+    other_details = []
+    for detail in found:
+        if detail.other_details and detail.other_details not in other_details:
+            other_details.append(detail.other_details)
+    return type(found[0])(
+        has_lawsuit=True,
+        claimant=_unique_names([name for d in found for name in d.claimant]),
+        defendant=_unique_names([name for d in found for name in d.defendant]),
+        case_summary=next((d.case_summary for d in found if d.case_summary), ""),
+        case_date=next((d.case_date for d in found if d.case_date), ""),
+        other_details="\n".join(other_details) or None,
+    )
@@ -1,40 +1,19 @@
-from typing import List, Optional
+from typing import Optional
 
-from hyfi.composer import BaseModel
-from langchain.output_parsers import PydanticOutputParser
-from langchain.prompts import ChatPromptTemplate
 from langchain_community.chat_models import ChatOpenAI
-from langchain_core.pydantic_v1 import BaseModel as BaseModelV1
-from langchain_core.pydantic_v1 import Field as FieldV1
 
 from sierra.llms import ChatOpenAIModel
 
+from .base import BaseLawsuitExtractor, LawsuitDetails
 
-class LawsuitDetails(BaseModelV1):
-    has_lawsuit: bool = FieldV1(description="Indicates if the text mentions a lawsuit")
-    claimant: List[str] = FieldV1(description="The claimant in the lawsuit")
-    defendant: List[str] = FieldV1(description="The defendant in the lawsuit")
-    case_summary: str = FieldV1(description="A brief summary of the case")
-    case_date: str = FieldV1(description="The date of the lawsuit")
-    other_details: Optional[str] = FieldV1(
-        description="Any other relevant details about the lawsuit"
-    )
 
-
-class LawsuitExtractor(BaseModel):
+class LawsuitExtractor(BaseLawsuitExtractor):
     _config_group_: str = "/model"
     _config_name_: str = "LawsuitExtractor"
 
     llm_model: ChatOpenAIModel = ChatOpenAIModel()
 
     _engine_: Optional[ChatOpenAI] = None
-    _output_parser_: Optional[PydanticOutputParser] = None
-    _prompt_: Optional[ChatPromptTemplate] = None
-
-    def initialize(self):
-        self._engine_ = self.llm_model.engine
-        self._output_parser_ = self._create_output_parser()
-        self._prompt_ = self._create_prompt()
 
     @property
     def engine(self) -> ChatOpenAI:
@@ -42,42 +21,6 @@ class LawsuitExtractor(BaseModel):
             self.initialize()
         return self._engine_
 
-    @property
-    def output_parser(self) -> PydanticOutputParser:
-        if self._output_parser_ is None:
-            self.initialize()
-        return self._output_parser_
-
-    @property
-    def prompt(self) -> ChatPromptTemplate:
-        if self._prompt_ is None:
-            self.initialize()
-        return self._prompt_
-
-    @property
-    def chain(self):
-        return self.prompt | self.engine | self.output_parser
-
-    def extract(self, input_text: str) -> LawsuitDetails:
-        return self.chain.invoke({"text": input_text})
-
-    def _create_output_parser(self) -> PydanticOutputParser:
-        return PydanticOutputParser(pydantic_object=LawsuitDetails)
-
-    def _create_prompt(self):
-        lawsuit_template = """
-        Your goal is to extract the details of a lawsuit from the given text.
-
-        {format_instructions}
-
-        text: {text}
-        """
-        format_instructions = self.output_parser.get_format_instructions()
-        return ChatPromptTemplate.from_template(
-            template=lawsuit_template,
-            partial_variables={"format_instructions": format_instructions},
-        )
-
 
 def main():
     extractor = LawsuitExtractor()
@@ -1,40 +1,22 @@
-from typing import List, Optional
+from typing import Optional
 
-from hyfi.composer import BaseModel
-from langchain.prompts import ChatPromptTemplate
 from langchain_community.chat_models import ChatOpenAI
-from langchain_community.output_parsers.rail_parser import GuardrailsOutputParser
-from pydantic import BaseModel as BaseModelV2
-from pydantic import Field
 
 from sierra.llms import ChatOpenAIModel
 
+from .base import BaseLawsuitExtractor, LawsuitDetails
 
-class LawsuitDetails(BaseModelV2):
-    has_lawsuit: bool = Field(description="Indicates if the text mentions a lawsuit")
-    claimant: List[str] = Field(description="The claimant in the lawsuit")
-    defendant: List[str] = Field(description="The defendant in the lawsuit")
-    case_summary: str = Field(description="A brief summary of the case")
-    case_date: str = Field(description="The date of the lawsuit")
-    other_details: Optional[str] = Field(
-        description="Any other relevant details about the lawsuit"
-    )
 
+class LawsuitExtractor(BaseLawsuitExtractor):
+    """The OpenAI lawsuit extractor with native structured output."""
 
-class LawsuitExtractor(BaseModel):
-    _config_group_: str = "/llm"
-    _config_name_: str = "openai"
+    _config_group_: str = "/model"
+    _config_name_: str = "LawsuitExtractorV2"
 
     llm_model: ChatOpenAIModel = ChatOpenAIModel()
+    structured_output: bool = True
 
     _engine_: Optional[ChatOpenAI] = None
-    _output_parser_: Optional[GuardrailsOutputParser] = None
-    _prompt_: Optional[ChatPromptTemplate] = None
-
-    def initialize(self):
-        self._engine_ = self.llm_model.engine
-        self._output_parser_ = self._create_output_parser()
-        self._prompt_ = self._create_prompt()
 
     @property
     def engine(self) -> ChatOpenAI:
@@ -42,42 +24,6 @@ class LawsuitExtractor(BaseModel):
             self.initialize()
         return self._engine_
 
-    @property
-    def output_parser(self) -> GuardrailsOutputParser:
-        if self._output_parser_ is None:
-            self.initialize()
-        return self._output_parser_
-
-    @property
-    def prompt(self) -> ChatPromptTemplate:
-        if self._prompt_ is None:
-            self.initialize()
-        return self._prompt_
-
-    @property
-    def chain(self):
-        return self.prompt | self.engine
-
-    def extract(self, input_text: str) -> LawsuitDetails:
-        return self.chain.invoke({"text": input_text})
-
-    def _create_output_parser(self) -> GuardrailsOutputParser:
-        return GuardrailsOutputParser.from_pydantic(LawsuitDetails)
-
-    def _create_prompt(self):
-        lawsuit_template = """
-        Your goal is to extract the details of a lawsuit from the given text.
-
-        {format_instructions}
-
-        text: {text}
-        """
-        format_instructions = self.output_parser.get_format_instructions()
-        return ChatPromptTemplate.from_template(
-            template=lawsuit_template,
-            partial_variables={"format_instructions": format_instructions},
-        )
-
 
 def main():
     extractor = LawsuitExtractor()
@@ -102,7 +48,7 @@ Ian Brickey
 """
     print(input_text)
     result = extractor.extract(input_text)
-    print(result.content)
+    print(result)
 
 
 if __name__ == "__main__":
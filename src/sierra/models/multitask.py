@@ -0,0 +1,131 @@
+import logging
+from typing import List, Optional, Sequence, Type
+
+from langchain_core.pydantic_v1 import BaseModel as BaseModelV1
+from langchain_core.pydantic_v1 import Field as FieldV1
+from langchain_core.pydantic_v1 import create_model
+
+from sierra.llms import ChatOpenAIModel
+
+from .base import SYSTEM_PROMPT, BaseExtractor, LawsuitDetails
+from .chunking import merge_details
+from .ner import EventEntity
+
+logger = logging.getLogger(__name__)
+
+# The tasks of the combined response: field name, model and description
+TASKS = {
+    "lawsuit": (LawsuitDetails, "The details of the lawsuit in the text"),
+    "events_entities": (EventEntity, "The events and entities in the text"),
+}
+
+
+EVENTS_ENTITIES_GOAL = "the events and entities"
+
+
+class MultiTaskDetails(BaseModelV1):
+    """The results of a multi-task extraction; tasks that were off are None."""
+
+    lawsuit: Optional[LawsuitDetails] = None
+    events_entities: Optional[EventEntity] = None
+
+
+def task_schema(tasks: Sequence[str]) -> Type[BaseModelV1]:
+    """The response model asking for the results of `tasks` only."""
+    fields = {
+        name: (TASKS[name][0], FieldV1(description=TASKS[name][1])) for name in tasks
+    }
+    return create_model("MultiTaskResponse", **fields)
+
+
+def _unique(values: Sequence[str]) -> List[str]:
+    seen = set()
+    unique = []
+    for value in values:
+        key = value.strip().casefold()
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(value)
+    return unique
+
+
+def merge_results(results: Sequence[MultiTaskDetails]) -> MultiTaskDetails:
+    """Merge the results of the chunks of one text, in text order."""
+    if len(results) == 1:
+        return results[0]
+    lawsuits = [result.lawsuit for result in results if result.lawsuit]
+    events_entities = [r.events_entities for r in results if r.events_entities]
+    merged = MultiTaskDetails(lawsuit=merge_details(lawsuits))
+    if events_entities:
+        merged.events_entities = EventEntity(
+            events=_unique([e for ee in events_entities for e in ee.events]),
+            entities=_unique([e for ee in events_entities for e in ee.entities]),
+        )
+    return merged
+
+
+class MultiTaskExtractor(BaseExtractor):
+    """
+    Extract lawsuit details and events/entities from a text in one call.
+
+    Running `LawsuitExtractor` and `EventEntityExtractor` over the same texts
+    sends every text twice. This extractor asks for both results in one
+    structured response, so the text, the largest part of the prompt, and
+    the round trip are paid once. Tasks can be turned off with their flags;
+    their results are then None and their instructions are left out.
+
+    The prompt, chunking and structured output work as in the lawsuit
+    extractors (see `BaseExtractor`).
+
+    Attributes:
+        llm_model (ChatOpenAIModel): The chat model.
+        structured_output (bool): Use the provider's native structured output.
+        lawsuit (bool): Extract the lawsuit details.
+        events_entities (bool): Extract the events and entities.
+    """
+
+    _config_group_: str = "/model"
+    _config_name_: str = "MultiTaskExtractor"
+
+    llm_model: ChatOpenAIModel = ChatOpenAIModel()
+    lawsuit: bool = True
+    events_entities: bool = True
+
+    @property
+    def tasks(self) -> List[str]:
+        tasks = [name for name in TASKS if getattr(self, name)]
+        if not tasks:
+            raise ValueError("At least one extraction task must be enabled.")
+        return tasks
+
+    @property
+    def output_schema(self) -> Type[BaseModelV1]:
+        return task_schema(self.tasks)
+
+    @property
+    def result_model(self) -> Type[BaseModelV1]:
+        return MultiTaskDetails
+
+    @property
+    def preamble(self) -> str:
+        # With the lawsuit task, the prompt starts like the lawsuit extractors'
+        if not self.lawsuit:
+            return (
+                f"Your goal is to extract {EVENTS_ENTITIES_GOAL} from the given text."
+            )
+        if not self.events_entities:
+            return SYSTEM_PROMPT
+        return f"{SYSTEM_PROMPT} Also extract {EVENTS_ENTITIES_GOAL}."
+
+    @property
+    def chain(self):
+        return super().chain | self._to_details
+
+    @staticmethod
+    def _to_details(response: BaseModelV1) -> MultiTaskDetails:
+        return MultiTaskDetails(
+            **{name: getattr(response, name, None) for name in TASKS}
+        )
+
+    def merge_results(self, results: List[MultiTaskDetails]) -> MultiTaskDetails:
+        return merge_results(results)
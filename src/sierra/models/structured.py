@@ -0,0 +1,250 @@
+"""
+Provider-native structured output and repair of malformed replies.
+
+With native structured output the schema travels as a tool definition
+(OpenAI) or the reply is constrained to JSON (Ollama `format=json`), so the
+prompt carries at most a one-line shape hint instead of the long format
+instructions of `PydanticOutputParser`. Replies that still fail to parse are
+fixed locally when the damage is syntactic (code fences, trailing commas,
+Python literals, truncation) and otherwise with a short repair call that
+sends the reply and the error, not the text.
+"""
+
+import json
+import logging
+import re
+from typing import Any, Dict, Generic, List, Optional, Type, TypeVar
+
+from langchain.prompts import ChatPromptTemplate
+from langchain_core.exceptions import OutputParserException
+from langchain_core.messages import BaseMessage
+from langchain_core.output_parsers import BaseOutputParser
+from langchain_core.pydantic_v1 import BaseModel as BaseModelV1
+from langchain_core.pydantic_v1 import ValidationError
+from langchain_core.runnables import Runnable, RunnableLambda
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T", bound=BaseModelV1)
+
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)(?:```|$)", re.DOTALL)
+_WORD_RE = re.compile(r"[A-Za-z_]+")
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_JSON_TYPES = {
+    "string": "str",
+    "boolean": "bool",
+    "integer": "int",
+    "number": "float",
+}
+
+REPAIR_TEMPLATE = """
+Fix this reply so that it is a JSON object of the shape {schema}
+
+error: {error}
+
+reply: {reply}
+"""
+
+
+def _hint(schema: Dict[str, Any], definitions: Dict[str, Any]) -> str:
+    if "$ref" in schema:
+        return _hint(definitions[schema["$ref"].rsplit("/", 1)[-1]], definitions)
+    if "allOf" in schema and len(schema["allOf"]) == 1:
+        return _hint(schema["allOf"][0], definitions)
+    if "anyOf" in schema:
+        return "|".join(_hint(option, definitions) for option in schema["anyOf"])
+    kind = schema.get("type")
+    if kind == "array":
+        return f"[{_hint(schema.get('items', {}), definitions)}]"
+    if kind == "object" or "properties" in schema:
+        required = set(schema.get("required", ()))
+        fields = ", ".join(
+            f'"{name}": {_hint(field, definitions)}'
+            + ("" if name in required else "|null")
+            for name, field in schema.get("properties", {}).items()
+        )
+        return f"{{{fields}}}"
+    return _JSON_TYPES.get(kind, "any")
+
+
+def schema_hint(model: Type[BaseModelV1]) -> str:
+    """
+    Render the shape of a model on one line, e.g. `{"claimant": [str]}`.
+
+    Optional fields are marked `|null`; descriptions are left out.
+    """
+    schema = model.schema()
+    return _hint(schema, schema.get("definitions", {}))
+
+
+def _drop_trailing(out: List[str], chars: str) -> None:
+    while out and out[-1].isspace():
+        out.pop()
+    if out and out[-1] in chars:
+        out.pop()
+
+
+def repair_json(text: str) -> str:
+    """
+    Fix the syntax of a JSON object or array written by a language model.
+
+    The first value is taken out of code fences and surrounding prose,
+    single quotes become double quotes, Python literals become JSON ones,
+    trailing commas are dropped and a truncated value is closed. Valid JSON
+    is returned unchanged, apart from text around it.
+
+    Args:
+        text (str): The reply.
+
+    Returns:
+        str: The repaired JSON, or the stripped text if it has no object or
+            array.
+    """
+    if (match := _FENCE_RE.search(text)) is not None:
+        text = match.group(1)
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    if not starts:
+        return text.strip()
+
+    out: List[str] = []
+    closers: List[str] = []
+    quote: Optional[str] = None
+    i = min(starts)
+    while i < len(text):
+        char = text[i]
+        if quote:
+            if char == "\\" and i + 1 < len(text):
+                escaped = text[i + 1]
+                out.append(escaped if escaped == "'" else text[i : i + 2])
+                i += 2
+                continue
+            if char == quote:
+                out.append('"')
+                quote = None
+            elif char == '"':
+                out.append('\\"')
+            elif char == "\n":
+                out.append("\\n")
+            else:
+                out.append(char)
+        elif char in "\"'":
+            quote = char
+            out.append('"')
+        elif char in "{[":
+            closers.append("}" if char == "{" else "]")
+            out.append(char)
+        elif char in "}]":
+            _drop_trailing(out, ",")
+            if closers:
+                out.append(closers.pop())
+            if not closers:
+                break
+        elif (word := _WORD_RE.match(text, i)) is not None:
+            out.append(_LITERALS.get(word.group(), word.group()))
+            i = word.end()
+            continue
+        else:
+            out.append(char)
+        i += 1
+
+    # A truncated reply: close the string, the pending value and the brackets
+    if quote:
+        out.append('"')
+    _drop_trailing(out, ",")
+    if out and out[-1] == ":":
+        out.append("null")
+    out.extend(reversed(closers))
+    return "".join(out)
+
+
+def reply_text(message: Any) -> str:
+    """The arguments of a reply's first tool call, or else its content."""
+    if not isinstance(message, BaseMessage):
+        return str(message)
+    for tool_call in message.additional_kwargs.get("tool_calls") or ():
+        arguments = (tool_call.get("function") or {}).get("arguments")
+        if arguments:
+            return arguments
+    return message.content if isinstance(message.content, str) else ""
+
+
+class StructuredOutputParser(BaseOutputParser[T], Generic[T]):
+    """
+    Parse a JSON reply into a model, repairing its syntax first.
+
+    Attributes:
+        pydantic_object (Type[BaseModelV1]): The model of the reply.
+    """
+
+    pydantic_object: Type[T]
+
+    def parse(self, text: str) -> T:
+        try:
+            return self.pydantic_object.parse_obj(json.loads(text))
+        except (json.JSONDecodeError, ValidationError):
+            pass
+        try:
+            return self.pydantic_object.parse_obj(json.loads(repair_json(text)))
+        except (json.JSONDecodeError, ValidationError) as e:
+            raise OutputParserException(
+                f"Failed to parse {self.pydantic_object.__name__}: {e}",
+                llm_output=text,
+            ) from e
+
+    def get_format_instructions(self) -> str:
+        return (
+            f"Reply with a JSON object of the shape {schema_hint(self.pydantic_object)}"
+        )
+
+    @property
+    def _type(self) -> str:
+        return "structured_output"
+
+
+def structured_chain(
+    prompt: Runnable,
+    engine: Runnable,
+    parser: StructuredOutputParser,
+) -> Runnable:
+    """
+    Build `prompt | engine | parser`, falling back to one repair call.
+
+    `engine` should already be bound to the provider's structured output
+    arguments. A reply the parser rejects is sent back with the error and
+    the schema hint, without the original prompt, and the fixed reply is
+    parsed once more; an error from it propagates.
+
+    Args:
+        prompt (Runnable): The extraction prompt.
+        engine (Runnable): The bound chat engine.
+        parser (StructuredOutputParser): The parser of the reply.
+
+    Returns:
+        Runnable: The chain.
+    """
+    repair_prompt = ChatPromptTemplate.from_template(
+        template=REPAIR_TEMPLATE,
+        partial_variables={"schema": schema_hint(parser.pydantic_object)},
+    )
+    repair = repair_prompt | engine
+
+    def _repair_inputs(text: str, error: Exception) -> Dict[str, str]:
+        logger.warning("Repairing a malformed reply: %s", error)
+        return {"reply": text, "error": str(error).splitlines()[0]}
+
+    def _parse(message: Any) -> Any:
+        text = reply_text(message)
+        try:
+            return parser.parse(text)
+        except OutputParserException as e:
+            return parser.parse(reply_text(repair.invoke(_repair_inputs(text, e))))
+
+    async def _aparse(message: Any) -> Any:
+        text = reply_text(message)
+        try:
+            return parser.parse(text)
+        except OutputParserException as e:
+            fixed = await repair.ainvoke(_repair_inputs(text, e))
+            return parser.parse(reply_text(fixed))
+
+    return prompt | engine | RunnableLambda(_parse, afunc=_aparse)
@@ -0,0 +1,161 @@
+"""
+Learn and strip boilerplate shared by many press releases.
+"""
+
+import hashlib
+import logging
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set
+
+from hyfi.composer import BaseModel
+
+from sierra.llms.tokens import count_tokens
+from sierra.pipes.cache import normalize_content
+from sierra.pipes.jsonl import JsonlWriter, iter_jsonl
+
+logger = logging.getLogger(__name__)
+
+_BLANK_LINES_RE = re.compile(r"\n\s*\n\s*(?:\n\s*)+")
+
+
+def _line_hash(line: str) -> Optional[str]:
+    line = normalize_content(line)
+    if not line:
+        return None
+    return hashlib.sha1(line.encode("utf-8")).hexdigest()
+
+
+class BoilerplateStripper(BaseModel):
+    """
+    Removes lines that recur across the corpus.
+
+    `fit` counts, for every distinct non-blank line (after whitespace
+    normalization), the number of documents containing it. Lines found in at
+    least `min_doc_freq` of the documents, and in at least `min_docs` of them,
+    are boilerplate: the "About the Sierra Club" paragraph, the "Contact"
+    heading and similar. Article-specific lines are left untouched.
+
+    Attributes:
+        min_doc_freq (float): Minimum fraction of documents a line must appear in.
+        min_docs (int): Minimum number of documents a line must appear in, so
+            that small corpora are left alone.
+        text_field (str): The field holding the text.
+    """
+
+    _config_name_: str = "boilerplate"
+    _config_group_: str = "/pipe"
+
+    min_doc_freq: float = 0.2
+    min_docs: int = 5
+    text_field: str = "content"
+
+    _doc_freq_: Optional[Counter] = None
+    _num_docs_: int = 0
+    _boilerplate_: Optional[Set[str]] = None
+
+    @property
+    def num_docs(self) -> int:
+        return self._num_docs_
+
+    @property
+    def boilerplate(self) -> Set[str]:
+        """The hashes of the boilerplate lines."""
+        if self._boilerplate_ is None:
+            threshold = max(self.min_docs, self.min_doc_freq * self._num_docs_)
+            self._boilerplate_ = {
+                key for key, df in (self._doc_freq_ or {}).items() if df >= threshold
+            }
+        return self._boilerplate_
+
+    def partial_fit(self, text: str) -> None:
+        """Count the lines of one more document."""
+        if self._doc_freq_ is None:
+            self._doc_freq_ = Counter()
+        keys = {key for line in text.splitlines() if (key := _line_hash(line))}
+        self._doc_freq_.update(keys)
+        self._num_docs_ += 1
+        self._boilerplate_ = None
+
+    def fit(self, texts: Iterable[str]) -> "BoilerplateStripper":
+        for text in texts:
+            self.partial_fit(text)
+        logger.info(
+            "Found %s boilerplate lines in %s documents",
+            len(self.boilerplate),
+            self._num_docs_,
+        )
+        return self
+
+    def strip(self, text: str) -> str:
+        """Remove the boilerplate lines of `text`."""
+        boilerplate = self.boilerplate
+        if not boilerplate:
+            return text
+        lines = [
+            line for line in text.splitlines() if _line_hash(line) not in boilerplate
+        ]
+        return _BLANK_LINES_RE.sub("\n\n", "\n".join(lines)).strip()
+
+    def strip_item(self, item: Dict) -> Dict:
+        """
+        Return a copy of `item` with its text stripped and the number of
+        tokens saved recorded in `tokens_saved`.
+        """
+        text = item.get(self.text_field) or ""
+        stripped = self.strip(text)
+        item = dict(item)
+        item[self.text_field] = stripped
+        item["tokens_saved"] = count_tokens(text) - count_tokens(stripped)
+        logger.debug("Stripped %s tokens of boilerplate", item["tokens_saved"])
+        return item
+
+
+def strip_boilerplate(
+    scraped_data_file: str,
+    stripped_data_file: str,
+    stripper: Optional[BoilerplateStripper] = None,
+) -> Dict[str, int]:
+    """
+    Write a copy of the scraped press releases with boilerplate removed.
+
+    The input is read twice: once to learn the boilerplate lines and once to
+    strip them. Each output record carries the `tokens_saved` for that record.
+
+    Args:
+        scraped_data_file (str): The scraped press releases (jsonl).
+        stripped_data_file (str): The output jsonl file, overwritten.
+        stripper (Optional[BoilerplateStripper], optional): A stripper, fitted
+            on `scraped_data_file` unless it has already been fitted.
+
+    Returns:
+        Dict[str, int]: The number of documents and the tokens before and after.
+    """
+    stripper = stripper or BoilerplateStripper()
+    if not stripper.num_docs:
+        stripper.fit(
+            item.get(stripper.text_field) or ""
+            for item in iter_jsonl(scraped_data_file)
+        )
+
+    Path(stripped_data_file).unlink(missing_ok=True)
+    stats = {"documents": 0, "tokens_before": 0, "tokens_after": 0}
+    with JsonlWriter(stripped_data_file) as writer:
+        for item in iter_jsonl(scraped_data_file):
+            text = item.get(stripper.text_field) or ""
+            stripped = stripper.strip(text)
+            tokens_before, tokens_after = count_tokens(text), count_tokens(stripped)
+            item[stripper.text_field] = stripped
+            item["tokens_saved"] = tokens_before - tokens_after
+            writer.write(item)
+            stats["documents"] += 1
+            stats["tokens_before"] += tokens_before
+            stats["tokens_after"] += tokens_after
+    logger.info(
+        "Stripped boilerplate from %s documents: %s -> %s tokens",
+        stats["documents"],
+        stats["tokens_before"],
+        stats["tokens_after"],
+    )
+    return stats
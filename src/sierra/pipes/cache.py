@@ -0,0 +1,185 @@
+"""
+Persistent cache for LLM extraction results.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Any, Optional
+
+from hyfi.composer import BaseModel
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_content(text: str) -> str:
+    """Normalize unicode and collapse whitespace so cosmetic edits still hit."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class ExtractionCache(BaseModel):
+    """
+    SQLite-backed cache of extraction results.
+
+    Entries are keyed by a SHA-256 hash of the normalized content, the rendered
+    prompt template and the LLM settings (provider, model, temperature and
+    seed), so changing any of them invalidates the cached result. Results
+    extracted in a batch are keyed by the batch prompt template: the model
+    saw other instructions and texts, so they are kept apart from the
+    results of single prompts.
+
+    Attributes:
+        cache_file (str): The SQLite database file.
+        max_entries (Optional[int]): Evict the least recently used entries
+            beyond this count. No limit if None.
+        max_age_days (Optional[float]): Evict entries that were stored more
+            than this many days ago. No limit if None.
+    """
+
+    _config_name_: str = "extraction"
+    _config_group_: str = "/cache"
+
+    cache_file: str = "workspace/cache/extraction_cache.sqlite"
+    max_entries: Optional[int] = 100_000
+    max_age_days: Optional[float] = None
+
+    _conn_: Optional[sqlite3.Connection] = None
+    _lock_: Optional[Any] = None
+    _hits_: int = 0
+    _misses_: int = 0
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn_ is None:
+            self.initialize()
+        return self._conn_
+
+    @property
+    def hits(self) -> int:
+        return self._hits_
+
+    @property
+    def misses(self) -> int:
+        return self._misses_
+
+    def initialize(self):
+        Path(self.cache_file).parent.mkdir(parents=True, exist_ok=True)
+        self._lock_ = threading.RLock()
+        self._conn_ = sqlite3.connect(self.cache_file, check_same_thread=False)
+        self._conn_.execute("""
+            CREATE TABLE IF NOT EXISTS extractions (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """)
+        self._conn_.execute(
+            "CREATE INDEX IF NOT EXISTS idx_accessed_at ON extractions (accessed_at)"
+        )
+        self._conn_.commit()
+        self.evict()
+
+    @staticmethod
+    def make_key(text: str, extractor, batch: bool = False) -> str:
+        """
+        Build the cache key for a text and an extractor.
+
+        Args:
+            text (str): The text sent to the extractor.
+            extractor: An extractor exposing `prompt_template` and `llm_params`.
+            batch (bool, optional): The text is extracted in a batch, with the
+                extractor's `batch_prompt_template`. Defaults to False.
+
+        Returns:
+            str: The hex digest of the cache key.
+        """
+        prompt = extractor.batch_prompt_template if batch else extractor.prompt_template
+        payload = json.dumps(
+            {
+                "content": normalize_content(text),
+                "prompt": prompt,
+                "llm": extractor.llm_params,
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, text: str, extractor, batch: bool = False):
+        """
+        Return the cached result for the text, or None on a miss.
+
+        The result is rebuilt with the extractor's `result_model`.
+        """
+        key = self.make_key(text, extractor, batch)
+        conn = self.conn
+        with self._lock_:
+            row = conn.execute(
+                "SELECT value FROM extractions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._misses_ += 1
+                return None
+            conn.execute(
+                "UPDATE extractions SET accessed_at = ? WHERE key = ?",
+                (time.time(), key),
+            )
+            conn.commit()
+            self._hits_ += 1
+        return extractor.result_model(**json.loads(row[0]))
+
+    def set(self, text: str, extractor, details, batch: bool = False) -> None:
+        """Store the extraction result for the text."""
+        key = self.make_key(text, extractor, batch)
+        now = time.time()
+        conn = self.conn
+        with self._lock_:
+            conn.execute(
+                "INSERT OR REPLACE INTO extractions VALUES (?, ?, ?, ?)",
+                (key, json.dumps(details.dict(), ensure_ascii=False), now, now),
+            )
+            conn.commit()
+
+    def evict(self) -> int:
+        """
+        Apply the age and size limits.
+
+        Returns:
+            int: The number of evicted entries.
+        """
+        evicted = 0
+        conn = self.conn
+        with self._lock_:
+            if self.max_age_days is not None:
+                cutoff = time.time() - self.max_age_days * 86400
+                evicted += conn.execute(
+                    "DELETE FROM extractions WHERE created_at < ?", (cutoff,)
+                ).rowcount
+            if self.max_entries is not None:
+                evicted += conn.execute(
+                    """
+                    DELETE FROM extractions WHERE key IN (
+                        SELECT key FROM extractions
+                        ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                    )
+                    """,
+                    (self.max_entries,),
+                ).rowcount
+            conn.commit()
+        if evicted:
+            logger.info("Evicted %s entries from %s", evicted, self.cache_file)
+        return evicted
+
+    def close(self):
+        if self._conn_ is None:
+            return
+        self.evict()
+        logger.info("Extraction cache: %s hits, %s misses", self._hits_, self._misses_)
+        self._conn_.close()
+        self._conn_ = None
@@ -0,0 +1,221 @@
+"""
+Near-duplicate detection of press releases with MinHash and LSH.
+"""
+
+import logging
+import re
+import zlib
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from hyfi.composer import BaseModel
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\w+")
+# Largest prime below 2**32, so a * x + b fits in uint64 for 32-bit hashes x
+_PRIME = np.uint64(4294967291)
+
+
+def shingles(text: str, size: int = 5) -> set:
+    """
+    Return the word `size`-grams of a text, lowercased.
+
+    Texts shorter than `size` words are a single shingle.
+    """
+    words = _WORD_RE.findall((text or "").lower())
+    if not words:
+        return set()
+    return {" ".join(words[i : i + size]) for i in range(max(len(words) - size + 1, 1))}
+
+
+def optimal_bands(
+    threshold: float, num_perm: int, false_positive_weight: float = 0.1
+) -> Tuple[int, int]:
+    """
+    Choose the LSH bands and rows per band for a Jaccard threshold.
+
+    Two signatures become candidates when all rows of any band agree, which
+    happens with probability `1 - (1 - s**rows)**bands` at similarity `s`.
+    The split minimizing the weighted sum of the false positive area below
+    the threshold and the false negative area above it is returned.
+    Candidates are verified against the threshold, so a false positive only
+    costs a signature comparison and is weighted less by default.
+
+    Args:
+        threshold (float): The Jaccard similarity threshold.
+        num_perm (int): The signature length.
+        false_positive_weight (float, optional): The weight of false
+            positives; false negatives weigh the rest. Defaults to 0.1.
+
+    Returns:
+        Tuple[int, int]: The number of bands and of rows per band.
+    """
+    similarity = np.linspace(0, 1, 201)
+    below = similarity < threshold
+    best, best_error = (1, num_perm), np.inf
+    for bands in range(1, num_perm + 1):
+        rows = num_perm // bands
+        probability = 1 - (1 - similarity**rows) ** bands
+        error = (
+            false_positive_weight * probability[below].sum()
+            + (1 - false_positive_weight) * (1 - probability[~below]).sum()
+        )
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+class NearDuplicateDetector(BaseModel):
+    """
+    Streaming MinHash/LSH detector of near-duplicate press releases.
+
+    Each text is reduced to a MinHash signature of its word shingles and
+    looked up in an LSH index, so adding a document costs the same however
+    many came before it and a corpus is processed in linear time. Candidates
+    whose estimated Jaccard similarity reaches `threshold` are merged with a
+    union-find; every cluster is represented by its first document.
+
+    Attributes:
+        threshold (float): Minimum estimated Jaccard similarity of duplicates.
+        num_perm (int): Number of hash permutations in a signature.
+        shingle_size (int): Words per shingle.
+        seed (int): Seed of the hash permutations.
+        text_field (str): The field holding the text.
+    """
+
+    _config_name_: str = "dedup"
+    _config_group_: str = "/pipe"
+
+    threshold: float = 0.8
+    num_perm: int = 128
+    shingle_size: int = 5
+    seed: int = 0
+    text_field: str = "content"
+
+    _permutations_: Optional[Tuple[np.ndarray, np.ndarray]] = None
+    _bands_: Optional[Tuple[int, int]] = None
+    _buckets_: Optional[List[Dict[bytes, List[str]]]] = None
+    _signatures_: Optional[Dict[str, np.ndarray]] = None
+    _parent_: Optional[Dict[str, str]] = None
+    _order_: Optional[Dict[str, int]] = None
+    _num_duplicates_: int = 0
+
+    @property
+    def num_duplicates(self) -> int:
+        """Near-duplicates that reused the result of their representative."""
+        return self._num_duplicates_
+
+    def record_copy(self) -> None:
+        """Count a near-duplicate whose representative's result was copied."""
+        self._num_duplicates_ += 1
+
+    @property
+    def permutations(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self._permutations_ is None:
+            rng = np.random.default_rng(self.seed)
+            prime = int(_PRIME)
+            self._permutations_ = (
+                rng.integers(1, prime, size=self.num_perm, dtype=np.uint64),
+                rng.integers(0, prime, size=self.num_perm, dtype=np.uint64),
+            )
+        return self._permutations_
+
+    @property
+    def bands(self) -> Tuple[int, int]:
+        if self._bands_ is None:
+            self._bands_ = optimal_bands(self.threshold, self.num_perm)
+        return self._bands_
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """Return the MinHash signature of a text, or None if it has no words."""
+        if not (grams := shingles(text, self.shingle_size)):
+            return None
+        hashes = np.fromiter(
+            (zlib.crc32(gram.encode("utf-8")) for gram in grams),
+            dtype=np.uint64,
+            count=len(grams),
+        )
+        a, b = self.permutations
+        hashed = (a[:, None] * hashes[None, :] + b[:, None]) % _PRIME
+        return hashed.min(axis=1).astype(np.uint32)
+
+    def _find(self, key: str) -> str:
+        parent = self._parent_
+        root = key
+        while parent[root] != root:
+            root = parent[root]
+        while parent[key] != root:
+            parent[key], key = root, parent[key]
+        return root
+
+    def reset(self) -> None:
+        self._buckets_ = [{} for _ in range(self.bands[0])]
+        self._signatures_ = {}
+        self._parent_ = {}
+        self._order_ = {}
+        self._num_duplicates_ = 0
+
+    def add(self, key: str, text: str) -> Optional[str]:
+        """
+        Index a document and return the representative it duplicates.
+
+        Args:
+            key (str): The document key, usually its UUID.
+            text (str): The document text.
+
+        Returns:
+            Optional[str]: The key of the cluster's first document, or None if
+                the document starts a new cluster.
+        """
+        if self._buckets_ is None:
+            self.reset()
+        if key in self._parent_:
+            root = self._find(key)
+            return None if root == key else root
+        if (signature := self.signature(text)) is None:
+            return None
+        num_bands, rows = self.bands
+        band_keys = [
+            signature[i * rows : (i + 1) * rows].tobytes() for i in range(num_bands)
+        ]
+        candidates = set()
+        for buckets, band_key in zip(self._buckets_, band_keys):
+            candidates.update(buckets.get(band_key, ()))
+
+        self._parent_[key] = key
+        self._order_[key] = len(self._order_)
+        self._signatures_[key] = signature
+        for candidate in candidates:
+            similarity = np.mean(self._signatures_[candidate] == signature)
+            if similarity >= self.threshold:
+                root, other = self._find(key), self._find(candidate)
+                if root != other:
+                    # Keep the earlier document as the representative
+                    if self._order_[root] < self._order_[other]:
+                        root, other = other, root
+                    self._parent_[root] = other
+        for buckets, band_key in zip(self._buckets_, band_keys):
+            buckets.setdefault(band_key, []).append(key)
+
+        root = self._find(key)
+        return None if root == key else root
+
+    def annotate(self, data: Iterable[Dict]) -> Iterator[Dict]:
+        """
+        Yield copies of items, in order, with `duplicate_of` set to the UUID
+        of the earlier item they duplicate, or None.
+        """
+        for item in data:
+            item = dict(item)
+            item["duplicate_of"] = self.add(
+                item["uuid"], item.get(self.text_field) or ""
+            )
+            yield item
+
+    def clusters(self) -> Dict[str, List[str]]:
+        """Return the members of every cluster with more than one document."""
+        members: Dict[str, List[str]] = {}
+        for key in self._parent_ or {}:
+            members.setdefault(self._find(key), []).append(key)
+        return {root: keys for root, keys in members.items() if len(keys) > 1}
@@ -1,88 +1,825 @@
+import asyncio
+import hashlib
+import itertools
 import logging
+import threading
 import uuid
-from typing import Dict, List
+from collections import deque
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Coroutine,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
-from hyfi import HyFI
 from tqdm import tqdm
 
-from sierra.models.lawsuit import LawsuitExtractor
+from sierra.pipes.boilerplate import BoilerplateStripper
+from sierra.pipes.cache import ExtractionCache, normalize_content
+from sierra.pipes.dedup import NearDuplicateDetector
+from sierra.pipes.jsonl import Checkpoint, JsonlWriter, iter_jsonl
+from sierra.pipes.parquet import is_parquet, make_schema, read_columns, write_parquet
+
+if TYPE_CHECKING:
+    # The extractors import langchain and the filter sklearn; both are loaded
+    # only when a run needs them
+    from sierra.models import lawsuit, lawsuit_ollama
+    from sierra.pipes.relevance import RelevanceFilter
 
 logger = logging.getLogger(__name__)
 
+Extractor = Union["lawsuit.LawsuitExtractor", "lawsuit_ollama.LawsuitExtractor"]
+# (succeeded, extracted item or None when the item has no lawsuit)
+ItemResult = Tuple[bool, Optional[Dict]]
+T = TypeVar("T")
+
+
+def make_uuid(item: Dict, key_field: str = "url") -> str:
+    """
+    Derive a deterministic UUID for a press release.
+
+    The UUID is a UUID5 of the item's `key_field` (the fetcher's dedup key,
+    the article URL by default), or of a hash of the normalized content when
+    the key is missing, so the same article gets the same UUID on every run.
 
-def assign_uuids(data: List[Dict]) -> List[Dict]:
+    Args:
+        item (Dict): The press release.
+        key_field (str, optional): The field identifying the item. Defaults to "url".
+
+    Returns:
+        str: The UUID.
+    """
+    if key := item.get(key_field):
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, key))
+    digest = hashlib.sha256(
+        normalize_content(item.get("content", "")).encode("utf-8")
+    ).hexdigest()
+    return str(uuid.uuid5(uuid.NAMESPACE_OID, digest))
+
+
+def assign_uuids(data: List[Dict], key_field: str = "url") -> List[Dict]:
     for item in data:
         if "uuid" not in item:
-            item["uuid"] = str(uuid.uuid4())
+            item["uuid"] = make_uuid(item, key_field)
     return data
 
 
-def extract_lawsuit_details(
-    data: List[Dict], extractor: LawsuitExtractor
-) -> List[Dict]:
-    extracted_data = []
-    for item in tqdm(data):
-        try:
-            text = item["content"]
-            if "lawsuit" not in text.lower():
-                logger.info(
-                    "No lawsuit-related content found in item with UUID: %s",
-                    item["uuid"],
-                )
-                continue
+def iter_scraped_data(scraped_data_file: str, key_field: str = "url") -> Iterator[Dict]:
+    """
+    Stream scraped press releases, assigning UUIDs on the fly.
+
+    The file is read one line at a time and never rewritten; items without a
+    `uuid` get the deterministic one from `make_uuid`.
+    """
+    for item in iter_jsonl(scraped_data_file):
+        if "uuid" not in item:
+            item["uuid"] = make_uuid(item, key_field)
+        yield item
+
+
+def iter_model_inputs(
+    scraped_data_file: str,
+    key_field: str = "url",
+    stripper: Optional[BoilerplateStripper] = None,
+) -> Iterator[Dict]:
+    """
+    Stream scraped press releases as the relevance filter and the LLM see them.
+
+    Items get their UUIDs from `key_field` and, with a `stripper`, lose their
+    boilerplate lines; an unfitted stripper is first fitted on the file.
+    Training data built from these items matches what `extract` scores.
+    """
+    if stripper is not None and not stripper.num_docs:
+        stripper.fit(
+            item.get(stripper.text_field) or ""
+            for item in iter_jsonl(scraped_data_file)
+        )
+    for item in iter_scraped_data(scraped_data_file, key_field=key_field):
+        if stripper is not None:
+            item = stripper.strip_item(item)
+        yield item
+
+
+def passes_gate(item: Dict) -> bool:
+    """
+    Whether an item is sent to the LLM: its `relevant` flag if a
+    `RelevanceFilter` scored it, else whether it mentions "lawsuit".
+    """
+    if "relevant" in item:
+        return bool(item["relevant"])
+    return "lawsuit" in item["content"].lower()
+
+
+def _has_lawsuit_keyword(item: Dict) -> bool:
+    if passes_gate(item):
+        return True
+    if "relevant" in item:
+        # Scored by a RelevanceFilter, which replaces the keyword gate
+        logger.info(
+            "Item with UUID %s scored %.3f, below the relevance threshold",
+            item["uuid"],
+            item["relevance_score"],
+        )
+    else:
+        logger.info(
+            "No lawsuit-related content found in item with UUID: %s",
+            item["uuid"],
+        )
+    return False
+
+
+def _to_extracted_item(item: Dict, lawsuit_details) -> Optional[Dict]:
+    if not lawsuit_details.has_lawsuit:
+        logger.info("No lawsuit found in item with UUID: %s", item["uuid"])
+        return None
+    logger.info("Lawsuit found in item with UUID: %s", item["uuid"])
+    extracted_item = {
+        "uuid": item["uuid"],
+        "has_lawsuit": lawsuit_details.has_lawsuit,
+        "claimant": lawsuit_details.claimant,
+        "defendant": lawsuit_details.defendant,
+        "case_summary": lawsuit_details.case_summary,
+        "case_date": lawsuit_details.case_date,
+        "other_details": lawsuit_details.other_details,
+    }
+    if "duplicate_of" in item:
+        extracted_item["duplicate_of"] = item["duplicate_of"]
+    return extracted_item
+
+
+def _copy_result(item: Dict, extracted_item: Optional[Dict]) -> Optional[Dict]:
+    """Propagate the result of a cluster representative to a near-duplicate."""
+    logger.info(
+        "Item with UUID %s duplicates %s, reusing its result",
+        item["uuid"],
+        item["duplicate_of"],
+    )
+    if extracted_item is None:
+        return None
+    return {
+        **extracted_item,
+        "uuid": item["uuid"],
+        "duplicate_of": item["duplicate_of"],
+    }
+
+
+def _log_error(item: Dict, error: Exception) -> None:
+    logger.error("Error extracting lawsuit details for UUID: %s", item["uuid"])
+    logger.error("Error: %s", error)
+
+
+def _process_item(
+    item: Dict, extractor: Extractor, cache: Optional[ExtractionCache]
+) -> ItemResult:
+    try:
+        if not _has_lawsuit_keyword(item):
+            return True, None
+        text = item["content"]
+        if cache is not None and (lawsuit_details := cache.get(text, extractor)):
+            logger.info("Cache hit for item with UUID: %s", item["uuid"])
+        else:
             logger.info(
                 "Extracting lawsuit details from item with UUID: %s", item["uuid"]
             )
             lawsuit_details = extractor.extract(text)
-            if not lawsuit_details.has_lawsuit:
-                logger.info("No lawsuit found in item with UUID: %s", item["uuid"])
-                continue
-            logger.info("Lawsuit found in item with UUID: %s", item["uuid"])
-            extracted_item = {
-                "uuid": item["uuid"],
-                "has_lawsuit": lawsuit_details.has_lawsuit,
-                "claimant": lawsuit_details.claimant,
-                "defendant": lawsuit_details.defendant,
-                "case_summary": lawsuit_details.case_summary,
-                "case_date": lawsuit_details.case_date,
-                "other_details": lawsuit_details.other_details,
-            }
-            extracted_data.append(extracted_item)
+            if cache is not None:
+                cache.set(text, extractor, lawsuit_details)
+        return True, _to_extracted_item(item, lawsuit_details)
+    except Exception as e:
+        _log_error(item, e)
+        return False, None
+
+
+async def _aprocess_item(
+    item: Dict,
+    extractor: Extractor,
+    cache: Optional[ExtractionCache],
+    semaphore: asyncio.Semaphore,
+) -> ItemResult:
+    try:
+        if not _has_lawsuit_keyword(item):
+            return True, None
+        text = item["content"]
+        if cache is not None and (lawsuit_details := cache.get(text, extractor)):
+            logger.info("Cache hit for item with UUID: %s", item["uuid"])
+        else:
+            async with semaphore:
+                logger.info(
+                    "Extracting lawsuit details from item with UUID: %s", item["uuid"]
+                )
+                lawsuit_details = await extractor.aextract(text)
+            if cache is not None:
+                cache.set(text, extractor, lawsuit_details)
+        return True, _to_extracted_item(item, lawsuit_details)
+    except Exception as e:
+        _log_error(item, e)
+        return False, None
+
+
+def _prepare_batch(
+    items: List[Dict], extractor: Extractor, cache: Optional[ExtractionCache]
+) -> Tuple[List[Optional[ItemResult]], Dict[str, str]]:
+    """Resolve the items that need no LLM call and collect the texts of the rest."""
+    outcomes: List[Optional[ItemResult]] = []
+    texts: Dict[str, str] = {}
+    for item in items:
+        outcome = None
+        try:
+            if not _has_lawsuit_keyword(item):
+                outcome = True, None
+            elif cache is not None and (
+                lawsuit_details := cache.get(item["content"], extractor, batch=True)
+            ):
+                logger.info("Cache hit for item with UUID: %s", item["uuid"])
+                outcome = True, _to_extracted_item(item, lawsuit_details)
+            else:
+                texts[item["uuid"]] = item["content"]
         except Exception as e:
-            logger.error("Error extracting lawsuit details for UUID: %s", item["uuid"])
-            logger.error("Error: %s", e)
-    return extracted_data
+            _log_error(item, e)
+            outcome = False, None
+        outcomes.append(outcome)
+    return outcomes, texts
+
+
+def _finish_batch(
+    items: List[Dict],
+    outcomes: List[Optional[ItemResult]],
+    extracted: Dict,
+    extractor: Extractor,
+    cache: Optional[ExtractionCache],
+) -> List[ItemResult]:
+    for i, item in enumerate(items):
+        if outcomes[i] is not None:
+            continue
+        if (lawsuit_details := extracted.get(item["uuid"])) is None:
+            _log_error(item, ValueError("No lawsuit details were extracted"))
+            outcomes[i] = False, None
+            continue
+        if cache is not None:
+            # Also the texts extract_batch fell back to single prompts for:
+            # which prompt a result came from is not known here
+            cache.set(item["content"], extractor, lawsuit_details, batch=True)
+        outcomes[i] = True, _to_extracted_item(item, lawsuit_details)
+    return outcomes
+
+
+def _process_batch(
+    items: List[Dict], extractor: Extractor, cache: Optional[ExtractionCache]
+) -> List[ItemResult]:
+    if len(items) <= 1:
+        return [_process_item(item, extractor, cache) for item in items]
+    outcomes, texts = _prepare_batch(items, extractor, cache)
+    extracted = {}
+    if texts:
+        logger.info("Extracting lawsuit details from a batch of %s items", len(texts))
+        try:
+            extracted = extractor.extract_batch(texts)
+        except Exception as e:
+            logger.error("Error extracting a batch of %s items: %s", len(texts), e)
+    return _finish_batch(items, outcomes, extracted, extractor, cache)
+
+
+async def _aprocess_batch(
+    items: List[Dict],
+    extractor: Extractor,
+    cache: Optional[ExtractionCache],
+    semaphore: asyncio.Semaphore,
+) -> List[ItemResult]:
+    if len(items) <= 1:
+        return [
+            await _aprocess_item(item, extractor, cache, semaphore) for item in items
+        ]
+    outcomes, texts = _prepare_batch(items, extractor, cache)
+    extracted = {}
+    if texts:
+        async with semaphore:
+            logger.info(
+                "Extracting lawsuit details from a batch of %s items", len(texts)
+            )
+            try:
+                extracted = await extractor.aextract_batch(texts)
+            except Exception as e:
+                logger.error("Error extracting a batch of %s items: %s", len(texts), e)
+    return _finish_batch(items, outcomes, extracted, extractor, cache)
+
+
+async def _new_semaphore(value: int) -> asyncio.Semaphore:
+    # Created inside the loop so it binds to it on every Python version
+    return asyncio.Semaphore(value)
+
+
+async def _cancel_tasks(tasks: List[asyncio.Task]) -> None:
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class _PrivateLoop:
+    """
+    A private event loop driven from synchronous code.
+
+    `run_until_complete` fails when the calling thread already runs a loop,
+    as in Jupyter; the private loop then runs on a worker thread and the
+    caller blocks on its results instead.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread: Optional[threading.Thread] = None
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+
+    def run(self, awaitable: Awaitable[T]) -> T:
+        """Wait for a coroutine or a task of the loop and return its result."""
+        if self._thread is None:
+            return self.loop.run_until_complete(awaitable)
+        return asyncio.run_coroutine_threadsafe(_awaited(awaitable), self.loop).result()
+
+    def create_task(self, coro: Coroutine[Any, Any, T]) -> "asyncio.Task[T]":
+        if self._thread is None:
+            return self.loop.create_task(coro)
+        return self.run(_ensure_future(coro))
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join()
+        self.loop.close()
+
+
+async def _awaited(awaitable: Awaitable[T]) -> T:
+    return await awaitable
+
+
+async def _ensure_future(coro: Coroutine[Any, Any, T]) -> "asyncio.Task[T]":
+    return asyncio.ensure_future(coro)
+
+
+def iter_lawsuit_details(
+    data: Iterable[Dict],
+    extractor: Extractor,
+    max_concurrency: int = 1,
+    cache: Optional[ExtractionCache] = None,
+    relevance_filter: Optional["RelevanceFilter"] = None,
+    deduplicator: Optional[NearDuplicateDetector] = None,
+    batch_size: int = 1,
+) -> Iterator[Tuple[Dict, Optional[Dict]]]:
+    """
+    Lazily extract lawsuit details, yielding each item as soon as it is done.
+
+    Items are yielded in input order. Items that fail are logged and not
+    yielded, so callers can treat every yielded item as completed. With
+    `max_concurrency` greater than 1, a bounded window of items is extracted
+    concurrently on a private event loop, run on a worker thread if the
+    caller's thread already runs one (as in Jupyter). Async callers should
+    rather await `aextract_lawsuit_details`.
+
+    With a `deduplicator`, only the first item of each cluster of
+    near-duplicates is extracted. The others get a copy of its result with
+    `duplicate_of` pointing to it, or are extracted themselves if it failed.
+
+    With `batch_size` greater than 1, consecutive items are grouped and the
+    ones that need the LLM are sent together with `extractor.extract_batch`.
+
+    Args:
+        data (Iterable[Dict]): Press releases with `uuid` and `content` fields.
+        extractor (Extractor): The OpenAI or Ollama backed lawsuit extractor.
+        max_concurrency (int, optional): Maximum number of in-flight LLM calls.
+            Defaults to 1.
+        cache (Optional[ExtractionCache], optional): Cache consulted before
+            calling the LLM and updated after each call. Defaults to None.
+        relevance_filter (Optional[RelevanceFilter], optional): Classifier
+            that decides which items are sent to the LLM, in place of the
+            "lawsuit" keyword check. Defaults to None.
+        deduplicator (Optional[NearDuplicateDetector], optional): Detector of
+            near-duplicate items, which are not sent to the LLM. Defaults to None.
+        batch_size (int, optional): Items per LLM request. Defaults to 1.
+
+    Yields:
+        Tuple[Dict, Optional[Dict]]: The input item and its extracted lawsuit
+            details, or None if it has no lawsuit.
+    """
+    if deduplicator is not None:
+        data = deduplicator.annotate(data)
+    if relevance_filter is not None:
+        data = relevance_filter.annotate(data)
+    # Results of the items that are not near-duplicates, by UUID
+    results: Dict[str, Optional[Dict]] = {}
+
+    def _done(
+        item: Dict, extracted_item: Optional[Dict]
+    ) -> Tuple[Dict, Optional[Dict]]:
+        if deduplicator is not None and not item.get("duplicate_of"):
+            results[item["uuid"]] = extracted_item
+        return item, extracted_item
+
+    def _resolve(
+        group: List[Dict],
+        outcomes: List[ItemResult],
+        process_item: Callable[[Dict], ItemResult],
+    ) -> Iterator[Tuple[Dict, Optional[Dict]]]:
+        """Yield a group in order, near-duplicates from their representative."""
+        outcomes = iter(outcomes)
+        for item in group:
+            if not item.get("duplicate_of"):
+                succeeded, extracted_item = next(outcomes)
+            elif item["duplicate_of"] in results:
+                deduplicator.record_copy()
+                yield item, _copy_result(item, results[item["duplicate_of"]])
+                continue
+            else:
+                # The representative failed, so the item stands for itself
+                logger.info("Extracting item with UUID %s on its own", item["uuid"])
+                item = {**item, "duplicate_of": None}
+                succeeded, extracted_item = process_item(item)
+            if succeeded:
+                yield _done(item, extracted_item)
+
+    def _originals(group: List[Dict]) -> List[Dict]:
+        return [item for item in group if not item.get("duplicate_of")]
+
+    items = iter(data)
+    groups = iter(lambda: list(itertools.islice(items, max(batch_size, 1))), [])
+    if max_concurrency <= 1:
+        for group in groups:
+            yield from _resolve(
+                group,
+                _process_batch(_originals(group), extractor, cache),
+                lambda item: _process_item(item, extractor, cache),
+            )
+        return
+
+    loop = _PrivateLoop()
+    semaphore = loop.run(_new_semaphore(max_concurrency))
+    window = max_concurrency * 4
+    pending: deque = deque()
+
+    def _process_own(item: Dict) -> ItemResult:
+        return loop.run(_aprocess_item(item, extractor, cache, semaphore))
+
+    try:
+        while True:
+            while len(pending) < window and (group := next(groups, None)):
+                # Near-duplicates wait for their representative, which is ahead
+                task = None
+                if originals := _originals(group):
+                    task = loop.create_task(
+                        _aprocess_batch(originals, extractor, cache, semaphore)
+                    )
+                pending.append((group, task))
+            if not pending:
+                break
+            group, task = pending.popleft()
+            outcomes = loop.run(task) if task is not None else []
+            yield from _resolve(group, outcomes, _process_own)
+    finally:
+        loop.run(_cancel_tasks([task for _, task in pending if task is not None]))
+        loop.close()
+
+
+def extract_lawsuit_details(
+    data: List[Dict],
+    extractor: Extractor,
+    max_concurrency: int = 1,
+    cache: Optional[ExtractionCache] = None,
+    relevance_filter: Optional["RelevanceFilter"] = None,
+    deduplicator: Optional[NearDuplicateDetector] = None,
+    batch_size: int = 1,
+) -> List[Dict]:
+    """
+    Extract lawsuit details from press releases.
+
+    Args:
+        data (List[Dict]): Press releases with `uuid` and `content` fields.
+        extractor (Extractor): The OpenAI or Ollama backed lawsuit extractor.
+        max_concurrency (int, optional): Number of concurrent LLM calls. Values
+            greater than 1 switch to the asyncio engine. Defaults to 1.
+        cache (Optional[ExtractionCache], optional): Cache consulted before
+            calling the LLM and updated after each call. Defaults to None.
+        relevance_filter (Optional[RelevanceFilter], optional): Classifier
+            that decides which items are sent to the LLM, in place of the
+            "lawsuit" keyword check. Defaults to None.
+        deduplicator (Optional[NearDuplicateDetector], optional): Extract only
+            one item of each cluster of near-duplicates. Defaults to None.
+        batch_size (int, optional): Items per LLM request. Defaults to 1.
+
+    Returns:
+        List[Dict]: The extracted lawsuit details, in input order.
+    """
+    results = iter_lawsuit_details(
+        data,
+        extractor,
+        max_concurrency=max_concurrency,
+        cache=cache,
+        relevance_filter=relevance_filter,
+        deduplicator=deduplicator,
+        batch_size=batch_size,
+    )
+    return [
+        extracted_item
+        for _, extracted_item in tqdm(results, total=len(data))
+        if extracted_item
+    ]
+
+
+async def aextract_lawsuit_details(
+    data: List[Dict],
+    extractor: Extractor,
+    max_concurrency: int = 8,
+    cache: Optional[ExtractionCache] = None,
+    relevance_filter: Optional["RelevanceFilter"] = None,
+    deduplicator: Optional[NearDuplicateDetector] = None,
+) -> List[Dict]:
+    """
+    Extract lawsuit details from press releases with concurrent LLM calls.
+
+    At most `max_concurrency` requests are in flight at any time. Results are
+    returned in input order regardless of completion order.
+
+    Args:
+        data (List[Dict]): Press releases with `uuid` and `content` fields.
+        extractor (Extractor): The OpenAI or Ollama backed lawsuit extractor.
+        max_concurrency (int, optional): Maximum number of in-flight LLM calls.
+            Defaults to 8.
+        cache (Optional[ExtractionCache], optional): Cache consulted before
+            calling the LLM and updated after each call. Defaults to None.
+        relevance_filter (Optional[RelevanceFilter], optional): Classifier
+            that decides which items are sent to the LLM, in place of the
+            "lawsuit" keyword check. Defaults to None.
+        deduplicator (Optional[NearDuplicateDetector], optional): Extract only
+            one item of each cluster of near-duplicates. Defaults to None.
+
+    Returns:
+        List[Dict]: The extracted lawsuit details, in input order.
+    """
+    if deduplicator is not None:
+        data = list(deduplicator.annotate(data))
+    if relevance_filter is not None:
+        data = list(relevance_filter.annotate(data))
+    semaphore = asyncio.Semaphore(max(max_concurrency, 1))
+    unique = [item for item in data if not item.get("duplicate_of")]
+    results = await asyncio.gather(
+        *[_aprocess_item(item, extractor, cache, semaphore) for item in unique]
+    )
+    done = {item["uuid"]: result for item, result in zip(unique, results)}
+
+    extracted_items = []
+    for item in data:
+        if not item.get("duplicate_of"):
+            extracted_item = done[item["uuid"]][1]
+        elif (result := done.get(item["duplicate_of"])) and result[0]:
+            deduplicator.record_copy()
+            extracted_item = _copy_result(item, result[1])
+        else:
+            _, extracted_item = await _aprocess_item(
+                {**item, "duplicate_of": None}, extractor, cache, semaphore
+            )
+        if extracted_item:
+            extracted_items.append(extracted_item)
+    return extracted_items
+
+
+def extracted_schema():
+    """
+    The Parquet schema of `extract()` results: the item's UUID, the fields of
+    `LawsuitDetails` and, for near-duplicates, the UUID of their representative.
+
+    Inferring the schema from the first row group would type a column that is
+    null there, such as `other_details`, as strings, and drop `duplicate_of`
+    when the first results have no duplicates.
+    """
+    from sierra.models.base import LawsuitDetails
+
+    fields = [
+        (name, field.outer_type_) for name, field in LawsuitDetails.__fields__.items()
+    ]
+    return make_schema([("uuid", str), *fields, ("duplicate_of", str)])
+
+
+def _merge_into_parquet(staging_file: str, parquet_file: str) -> None:
+    """Append the staged jsonl results to the Parquet output and remove them."""
+    if not Path(staging_file).exists():
+        return
+    done = set()
+    if Path(parquet_file).exists():
+        done.update(read_columns(parquet_file, ["uuid"])["uuid"])
+    num_rows = write_parquet(
+        (record for record in iter_jsonl(staging_file) if record["uuid"] not in done),
+        parquet_file,
+        append=True,
+        schema=extracted_schema(),
+    )
+    Path(staging_file).unlink()
+    logger.info("Appended %s records to %s", num_rows, parquet_file)
 
 
 def extract(
     scraped_data_file: str = "scraped_data.json",
     extracted_data_file: str = "extracted_lawsuit_data.json",
+    max_concurrency: int = 1,
+    extractor: Optional[Extractor] = None,
+    cache_file: Optional[str] = None,
+    cache_max_entries: Optional[int] = 100_000,
+    cache_max_age_days: Optional[float] = None,
+    checkpoint_file: Optional[str] = None,
+    evaluated_file: Optional[str] = None,
+    resume: bool = True,
+    flush_every: int = 1,
+    fsync: bool = False,
+    key_field: str = "url",
+    stripper: Optional[BoilerplateStripper] = None,
+    relevance_filter: Optional["RelevanceFilter"] = None,
+    deduplicator: Optional[NearDuplicateDetector] = None,
+    batch_size: int = 1,
 ):
+    """
+    Extract lawsuit details from scraped press releases into a jsonl file.
 
-    extractor = LawsuitExtractor()
+    Each result is appended to `extracted_data_file` as soon as its item is
+    done, and the item's UUID is recorded in a sidecar checkpoint (including
+    items without a lawsuit). A restarted run skips every UUID found in the
+    checkpoint or the output file.
 
-    # Load scraped press release data
-    logger.info("Loading scraped data from %s", scraped_data_file)
-    scraped_data = HyFI.load_jsonl(scraped_data_file)
+    If `extracted_data_file` ends with ".parquet", results are staged in
+    `<extracted_data_file>.jsonl` and appended to the Parquet file as a row
+    group when the run ends (or when the next run starts, after a crash).
 
-    # Assign UUIDs to press releases
-    data_with_uuids = assign_uuids(scraped_data)
-    HyFI.save_jsonl(data_with_uuids, scraped_data_file)
-    logger.info(
-        "Assigned UUIDs to %s press releases and saved to %s",
-        len(data_with_uuids),
-        scraped_data_file,
+    The scraped file is streamed and never rewritten: items without a `uuid`
+    get a deterministic one derived from `key_field` (see `make_uuid`).
+    Repeats of a UUID are skipped with the checkpoint and the set of items in
+    flight, so the memory held besides the checkpoint is bounded by
+    `max_concurrency` and `batch_size`. A repeat of an item whose extraction
+    failed is extracted again.
+
+    Args:
+        scraped_data_file (str): The scraped press releases (jsonl).
+        extracted_data_file (str): The output jsonl or Parquet file.
+        max_concurrency (int, optional): Maximum number of in-flight LLM calls.
+            Defaults to 1.
+        extractor (Optional[Extractor], optional): The extractor to use.
+            Defaults to the OpenAI backed LawsuitExtractor.
+        cache_file (Optional[str], optional): SQLite extraction cache. Disabled
+            if None. Defaults to None.
+        cache_max_entries (Optional[int], optional): Cache size limit.
+        cache_max_age_days (Optional[float], optional): Cache age limit.
+        checkpoint_file (Optional[str], optional): The checkpoint file.
+            Defaults to `<extracted_data_file>.ckpt`.
+        evaluated_file (Optional[str], optional): Sidecar recording the UUIDs
+            of the items the LLM judged, with or without a lawsuit, as opposed
+            to those stopped by the keyword gate or the relevance filter; the
+            training data of `RelevanceFilter` (see `load_training_data`).
+            Defaults to `<extracted_data_file>.evaluated`.
+        resume (bool, optional): Continue from the checkpoint and the existing
+            output. If False, both are truncated first. Defaults to True.
+        flush_every (int, optional): Flush the output and the checkpoint every
+            n completed items; 0 flushes only at the end. Defaults to 1.
+        fsync (bool, optional): Force every flush to disk. Defaults to False.
+        key_field (str, optional): The field UUIDs are derived from. Defaults
+            to "url", the fetcher's `key_field`.
+        stripper (Optional[BoilerplateStripper], optional): Strip boilerplate
+            from each press release before it is sent to the LLM. It is fitted
+            on `scraped_data_file` first unless it has already been fitted.
+            Defaults to None.
+        relevance_filter (Optional[RelevanceFilter], optional): Classifier
+            that decides which items are sent to the LLM, in place of the
+            "lawsuit" keyword check. Defaults to None.
+        deduplicator (Optional[NearDuplicateDetector], optional): Send only the
+            first of each cluster of near-duplicate press releases to the LLM
+            and record its result for the others with `duplicate_of`. Items
+            completed by earlier runs are not indexed. Defaults to None.
+        batch_size (int, optional): Press releases packed into one LLM request
+            (see `extract_batch`). Defaults to 1.
+    """
+
+    if extractor is None:
+        from sierra.models.lawsuit import LawsuitExtractor
+
+        extractor = LawsuitExtractor()
+    cache = (
+        ExtractionCache(
+            cache_file=cache_file,
+            max_entries=cache_max_entries,
+            max_age_days=cache_max_age_days,
+        )
+        if cache_file
+        else None
     )
+    checkpoint_file = checkpoint_file or f"{extracted_data_file}.ckpt"
+    evaluated_file = evaluated_file or f"{extracted_data_file}.evaluated"
+    parquet_file = None
+    if is_parquet(extracted_data_file):
+        parquet_file = extracted_data_file
+        extracted_data_file = f"{parquet_file}.jsonl"
+    if not resume:
+        for filename in (
+            extracted_data_file,
+            checkpoint_file,
+            evaluated_file,
+            parquet_file,
+        ):
+            if filename:
+                Path(filename).unlink(missing_ok=True)
+
+    checkpoint = Checkpoint(checkpoint_file, fsync=fsync)
+    evaluated = Checkpoint(evaluated_file, fsync=fsync)
+    if parquet_file:
+        _merge_into_parquet(extracted_data_file, parquet_file)
+        if Path(parquet_file).exists():
+            checkpoint.completed.update(read_columns(parquet_file, ["uuid"])["uuid"])
+    # The output is flushed before the checkpoint, so it may be ahead of it
+    if Path(extracted_data_file).exists():
+        checkpoint.completed.update(
+            record["uuid"] for record in iter_jsonl(extracted_data_file)
+        )
+    logger.info("Found %s completed press releases", len(checkpoint))
 
-    # Apply LawsuitExtractor to press releases
-    extracted_data = extract_lawsuit_details(data_with_uuids, extractor)
+    # Stream scraped press release data, skipping completed and repeated items
+    logger.info("Streaming scraped data from %s", scraped_data_file)
+    # UUIDs handed to the extraction but not completed yet, in input order;
+    # together with the checkpoint they catch every repeat of an item
+    in_flight: Dict[str, None] = {}
+    tokens_saved = 0
+
+    def _pending_items() -> Iterator[Dict]:
+        nonlocal tokens_saved
+        for item in iter_model_inputs(scraped_data_file, key_field, stripper):
+            if item["uuid"] in checkpoint or item["uuid"] in in_flight:
+                continue
+            in_flight[item["uuid"]] = None
+            tokens_saved += item.get("tokens_saved", 0)
+            yield item
+
+    def _landed(uuid: str) -> None:
+        # Results come in input order: the items ahead of this one are done,
+        # or failed and were not yielded
+        while in_flight:
+            first = next(iter(in_flight))
+            del in_flight[first]
+            if first == uuid:
+                break
+
+    # Apply LawsuitExtractor to press releases and append the results
+    num_extracted = 0
+    results = iter_lawsuit_details(
+        _pending_items(),
+        extractor,
+        max_concurrency=max_concurrency,
+        cache=cache,
+        relevance_filter=relevance_filter,
+        deduplicator=deduplicator,
+        batch_size=batch_size,
+    )
+    try:
+        with JsonlWriter(
+            extracted_data_file, fsync=fsync
+        ) as writer, evaluated, checkpoint:
+            for num_done, (item, extracted_item) in enumerate(tqdm(results), 1):
+                if extracted_item:
+                    writer.write(extracted_item)
+                    num_extracted += 1
+                # A near-duplicate carries the judgement of its representative
+                if item.get("duplicate_of"):
+                    judged = item["duplicate_of"] in evaluated
+                else:
+                    judged = passes_gate(item)
+                if judged:
+                    evaluated.add(item["uuid"])
+                checkpoint.add(item["uuid"])
+                _landed(item["uuid"])
+                if flush_every and num_done % flush_every == 0:
+                    writer.flush()
+                    evaluated.flush()
+                    checkpoint.flush()
+    finally:
+        if cache is not None:
+            cache.close()
+    if parquet_file:
+        _merge_into_parquet(extracted_data_file, parquet_file)
 
-    # Store extracted lawsuit information
-    HyFI.save_jsonl(extracted_data, extracted_data_file)
     logger.info(
         "Saved %s extracted lawsuit details to %s",
-        len(extracted_data),
-        extracted_data_file,
+        num_extracted,
+        parquet_file or extracted_data_file,
     )
+    if stripper is not None:
+        logger.info("Boilerplate stripping saved %s input tokens", tokens_saved)
+    if deduplicator is not None:
+        logger.info(
+            "Skipped %s near-duplicate press releases", deduplicator.num_duplicates
+        )
 
     logger.info("Lawsuit extraction completed.")
@@ -1,21 +1,81 @@
 # src/sierra/pipes/fuzzy.py
 
-from fuzzywuzzy import fuzz, process
-from hyfi import HyFI
+import logging
+import random
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+
+import joblib
+import numpy as np
+from fuzzywuzzy import fuzz, process, utils
+from rapidfuzz import process as rf_process
+from rapidfuzz.distance import Indel
+
+from sierra.pipes.jsonl import iter_jsonl
+from sierra.pipes.names import group_names, normalize_name, representative
+from sierra.pipes.parquet import is_parquet, iter_parquet, read_columns
+
+if TYPE_CHECKING:
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+logger = logging.getLogger(__name__)
+
+Match = Tuple[str, Optional[str], Optional[int]]
 
 
 def load_project_names(file_path: str, name_column: str = "project_name") -> list:
     """
-    Load selected project names from a CSV file.
+    Load selected project names from a CSV or Parquet file, reading only the
+    name column.
 
     Args:
-        file_path (str): Path to the CSV file containing project names.
+        file_path (str): Path to the CSV or Parquet file containing project names.
         name_column (str, optional): The column name in the CSV file that contains the project names. Defaults to "project_name".
 
     Returns:
         list: A list of project names.
     """
-    return HyFI.load_dataframe(file_path)[name_column].str.lower().tolist()
+    import pandas as pd
+
+    if is_parquet(file_path):
+        names = pd.Series(read_columns(file_path, [name_column])[name_column])
+    else:
+        names = pd.read_csv(file_path, usecols=[name_column])[name_column]
+    return names.str.lower().tolist()
+
+
+def iter_defendant_names(
+    lawsuit_data_file: str, target_claimant: str = "sierra"
+) -> Iterator[str]:
+    """
+    Stream the defendant names of lawsuits brought by `target_claimant`.
+
+    The file is parsed one line at a time, so memory use does not grow with
+    its size. When `target_claimant` only contains characters that JSON never
+    escapes, lines that do not contain it at all are skipped unparsed. From a
+    Parquet file only the claimant and defendant columns are read.
+
+    Args:
+        lawsuit_data_file (str): The extracted lawsuit data (jsonl or Parquet).
+        target_claimant (str, optional): Case-insensitive substring of a
+            claimant name. Defaults to "sierra".
+
+    Yields:
+        str: The lowercased defendant names.
+    """
+    target = target_claimant.lower()
+    if is_parquet(lawsuit_data_file):
+        records = iter_parquet(lawsuit_data_file, columns=["claimant", "defendant"])
+    else:
+        line_filter = None
+        if target and all(" " <= char <= "~" and char not in '"\\/' for char in target):
+            line_filter = lambda line: target in line.lower()  # noqa: E731
+        records = iter_jsonl(lawsuit_data_file, line_filter=line_filter)
+
+    for info in records:
+        if any(target in claimant.lower() for claimant in info["claimant"]):
+            for defendant in info["defendant"]:
+                yield defendant.lower()
 
 
 def load_defendant_names(lawsuit_data_file: str, target_claimant: str = "sierra"):
@@ -23,19 +83,14 @@ def load_defendant_names(lawsuit_data_file: str, target_claimant: str = "sierra"
     Load extracted defendant names from lawsuit data.
 
     Args:
-        lawsuit_data (dict): A dictionary containing lawsuit information, including defendant names.
+        lawsuit_data_file (str): The extracted lawsuit data (jsonl or Parquet).
+        target_claimant (str, optional): Case-insensitive substring of a
+            claimant name. Defaults to "sierra".
 
     Returns:
         list: A list of defendant names.
     """
-    lawsuit_data = HyFI.load_jsonl(lawsuit_data_file)
-
-    return [
-        defentant.lower()
-        for info in lawsuit_data
-        if target_claimant in ",".join(info["claimant"]).lower()
-        for defentant in info["defendant"]
-    ]
+    return list(iter_defendant_names(lawsuit_data_file, target_claimant))
 
 
 def fuzzy_match(project_name, defendant_names, threshold=80):
@@ -57,18 +112,513 @@ def fuzzy_match(project_name, defendant_names, threshold=80):
     return match if match and match[1] >= threshold else (None, None)
 
 
-def match_projects_defendants(project_names, defendant_names, threshold=80):
+def process_name(name: str) -> str:
+    """
+    Preprocess a name the way `token_sort_ratio` does: drop non-ASCII
+    characters, replace non-alphanumerics with spaces, lowercase, and sort the
+    tokens.
+    """
+    return " ".join(sorted(utils.full_process(name, force_ascii=True).split()))
+
+
+def _round_scores(distances: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """
+    Turn Indel distances into 0-100 similarity scores, rounded half to even
+    like fuzzywuzzy, using integer arithmetic so no score is off by one.
+    """
+    total = lengths.astype(np.int64)
+    same = total - distances.astype(np.int64)
+    quotient, remainder = np.divmod(100 * same, np.maximum(total, 1))
+    round_up = (2 * remainder > total) | (
+        (2 * remainder == total) & (quotient % 2 == 1)
+    )
+    return np.where(total == 0, 100, quotient + round_up)
+
+
+def _dedupe_choices(defendant_names: List[str]) -> Tuple[List[str], List[str]]:
+    """Keep the first defendant of each preprocessed name; the rest can't win."""
+    choices, processed_choices, seen = [], [], set()
+    for name in defendant_names:
+        processed = process_name(name)
+        if processed not in seen:
+            seen.add(processed)
+            choices.append(name)
+            processed_choices.append(processed)
+    return choices, processed_choices
+
+
+def _select_match(
+    query: str,
+    candidates: np.ndarray,
+    bounds: np.ndarray,
+    processed_choices: List[str],
+    threshold: int,
+    exact: bool,
+) -> Optional[Tuple[int, int]]:
+    """
+    Pick the best of the `candidates` (ascending defendant indices) given
+    their rapidfuzz scores, breaking ties by the earliest defendant as
+    `process.extractOne` does.
+
+    rapidfuzz scores with the optimal (LCS-based) alignment, while fuzzywuzzy's
+    pure-Python backend uses `difflib`, whose greedy alignment can score lower.
+    The rapidfuzz score is therefore an upper bound: with `exact`, candidates
+    are rescored with fuzzywuzzy, best bound first, until no remaining bound
+    can beat the best score.
+    """
+    keep = bounds >= threshold
+    candidates, bounds = candidates[keep], bounds[keep]
+    if not len(candidates):
+        return None
+    if not exact:
+        best = int(np.argmax(bounds))
+        return int(candidates[best]), int(bounds[best])
+    best, best_score = None, -1
+    order = np.argsort(-bounds, kind="stable")
+    for idx, bound in zip(candidates[order], bounds[order]):
+        if bound < best_score:
+            break
+        score = fuzz.ratio(query, processed_choices[idx])
+        if score > best_score or (score == best_score and idx < best):
+            best, best_score = int(idx), score
+    return (best, best_score) if best_score >= threshold else None
+
+
+def cdist_match(
+    project_names: List[str],
+    defendant_names: List[str],
+    threshold: int = 80,
+    exact: bool = True,
+    workers: int = -1,
+    chunk_size: int = 1024,
+) -> List[Match]:
+    """
+    Match project names with defendant names using a native score matrix.
+
+    Names are preprocessed once, duplicate defendants are scored once, and the
+    `token_sort_ratio` matrix is computed by `rapidfuzz.process.cdist` on all
+    cores, `chunk_size` projects at a time. With `exact`, the results are the
+    same as `fuzzy_match` on every project (see `_select_match`).
+
+    Args:
+        project_names (list): A list of project names.
+        defendant_names (list): A list of defendant names.
+        threshold (int, optional): The minimum similarity score threshold (0-100). Defaults to 80.
+        exact (bool, optional): Reproduce fuzzywuzzy's difflib scores. If False,
+            the rapidfuzz scores are returned, as with thefuzz or fuzzywuzzy
+            with python-Levenshtein installed. Defaults to True.
+        workers (int, optional): Threads used by cdist; -1 uses all cores.
+        chunk_size (int, optional): Number of projects scored per matrix.
+
+    Returns:
+        list: A list of tuples containing matched project-defendant pairs and their similarity scores.
+    """
+    choices, processed_choices = _dedupe_choices(defendant_names)
+    choice_lengths = np.array([len(choice) for choice in processed_choices])
+    all_choices = np.arange(len(choices))
+
+    matched_pairs: List[Match] = []
+    for start in range(0, len(project_names), chunk_size):
+        projects = project_names[start : start + chunk_size]
+        queries = [process_name(name) for name in projects]
+        if not choices:
+            matched_pairs.extend((name, None, None) for name in projects)
+            continue
+        distances = rf_process.cdist(
+            queries, processed_choices, scorer=Indel.distance, workers=workers
+        )
+        lengths = np.array([len(query) for query in queries])[:, None] + choice_lengths
+        scores = _round_scores(distances, lengths)
+        for row, (project_name, query) in enumerate(zip(projects, queries)):
+            match = _select_match(
+                query, all_choices, scores[row], processed_choices, threshold, exact
+            )
+            if match is None:
+                matched_pairs.append((project_name, None, None))
+            else:
+                matched_pairs.append((project_name, choices[match[0]], match[1]))
+    return matched_pairs
+
+
+class TfidfMatcher:
+    """
+    Nearest-neighbour matcher on character n-gram TF-IDF vectors.
+
+    Defendant names are preprocessed like `token_sort_ratio` inputs and
+    vectorized into an L2-normalized sparse matrix. Projects are matched by
+    cosine similarity, computed as a sparse matrix product `chunk_size`
+    projects at a time so memory stays bounded; scores are on a 0-100 scale.
+    A fitted matcher can be saved and loaded with joblib.
+
+    Args:
+        ngram_range (Tuple[int, int], optional): Character n-gram lengths.
+            Defaults to (2, 3).
+        max_df (float, optional): Ignore n-grams found in more than this
+            fraction of the names (and in more than 100 names). Defaults to 1.0.
+        chunk_size (int, optional): Projects per matrix product. Defaults to 4096.
+    """
+
+    def __init__(
+        self,
+        ngram_range: Tuple[int, int] = (2, 3),
+        max_df: float = 1.0,
+        chunk_size: int = 4096,
+    ):
+        self.ngram_range = tuple(ngram_range)
+        self.max_df = max_df
+        self.chunk_size = chunk_size
+        self.choices: List[str] = []
+        self.processed_choices: List[str] = []
+        self.vectorizer: Optional["TfidfVectorizer"] = None
+        self.matrix_t = None
+
+    def fit(self, defendant_names: List[str]) -> "TfidfMatcher":
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        self.choices, self.processed_choices = _dedupe_choices(defendant_names)
+        max_df = self.max_df
+        if max_df < 1.0:
+            max_df = max(int(max_df * len(self.choices)), 100)
+        self.vectorizer = TfidfVectorizer(
+            analyzer="char",
+            ngram_range=self.ngram_range,
+            lowercase=False,
+            max_df=max_df,
+            dtype=np.float32,
+        )
+        try:
+            matrix = self.vectorizer.fit_transform(
+                [f" {name} " for name in self.processed_choices]
+            )
+        except ValueError:
+            # No n-grams at all, e.g. only empty names
+            self.matrix_t = None
+        else:
+            self.matrix_t = matrix.T.tocsr()
+        logger.info("Indexed %s distinct defendant names", len(self.choices))
+        return self
+
+    def kneighbors_processed(
+        self, queries: List[str], k: int = 5
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Find the `k` most similar defendants of each preprocessed query.
+
+        Returns:
+            List[Tuple[np.ndarray, np.ndarray]]: For each query, the defendant
+                indices and cosine similarities, most similar first.
+                Defendants sharing no n-gram with the query are left out.
+        """
+        if self.vectorizer is None:
+            raise ValueError("The matcher has not been fitted.")
+        empty = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32))
+        if self.matrix_t is None:
+            return [empty for _ in queries]
+        results = []
+        for start in range(0, len(queries), self.chunk_size):
+            chunk = queries[start : start + self.chunk_size]
+            similarity = (
+                self.vectorizer.transform([f" {query} " for query in chunk])
+                @ self.matrix_t
+            ).tocsr()
+            for row in range(len(chunk)):
+                lo, hi = similarity.indptr[row], similarity.indptr[row + 1]
+                indices, values = similarity.indices[lo:hi], similarity.data[lo:hi]
+                if len(indices) > k:
+                    top = np.argpartition(-values, k)[:k]
+                    indices, values = indices[top], values[top]
+                # Most similar first, earliest defendant first among ties
+                order = np.lexsort((indices, -values))
+                results.append((indices[order], values[order]))
+        return results
+
+    def kneighbors(
+        self, project_names: List[str], k: int = 5
+    ) -> List[List[Tuple[str, int]]]:
+        """
+        Find the `k` most similar defendants of each project.
+
+        Returns:
+            List[List[Tuple[str, int]]]: For each project, the defendant names
+                and 0-100 similarity scores, most similar first.
+        """
+        neighbors = self.kneighbors_processed(
+            [process_name(name) for name in project_names], k
+        )
+        return [
+            [
+                (self.choices[idx], int(round(score * 100)))
+                for idx, score in zip(indices, scores)
+            ]
+            for indices, scores in neighbors
+        ]
+
+    def match(self, project_names: List[str], threshold: int = 80) -> List[Match]:
+        """
+        Match project names with their most similar defendant.
+
+        Args:
+            project_names (list): A list of project names.
+            threshold (int, optional): The minimum cosine similarity (0-100). Defaults to 80.
+
+        Returns:
+            list: A list of tuples containing matched project-defendant pairs and their similarity scores.
+        """
+        matched_pairs: List[Match] = []
+        for project_name, neighbors in zip(
+            project_names, self.kneighbors(project_names, k=1)
+        ):
+            if neighbors and neighbors[0][1] >= threshold:
+                matched_pairs.append((project_name, *neighbors[0]))
+            else:
+                matched_pairs.append((project_name, None, None))
+        return matched_pairs
+
+    def save(self, path: str) -> str:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        joblib.dump(self, path)
+        logger.info("Saved the TF-IDF matcher to %s", path)
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "TfidfMatcher":
+        matcher = joblib.load(path)
+        if not isinstance(matcher, cls):
+            raise TypeError(f"{path} does not contain a {cls.__name__}")
+        return matcher
+
+
+class BlockingIndex:
+    """
+    Candidate generation index over defendant names.
+
+    A project is scored only against the `top_n` defendants nearest to it by
+    character n-gram TF-IDF similarity (see `TfidfMatcher`) instead of against
+    every defendant. Names sharing no n-gram with a project are never
+    candidates.
+
+    Blocking can miss a match that exhaustive matching finds; measure the
+    recall for a given `top_n` with `blocking_recall`.
+
+    Args:
+        defendant_names (list): The defendant names to index.
+        top_n (int, optional): Candidates scored per project. Defaults to 20.
+        ngram_size (int, optional): Character n-gram length. Defaults to 3.
+        max_df (float, optional): Ignore n-grams found in more than this
+            fraction of the names (and in more than 100 names); they are poor
+            evidence and make the sparse product dense. Defaults to 0.1.
+    """
+
+    def __init__(
+        self,
+        defendant_names: List[str],
+        top_n: int = 20,
+        ngram_size: int = 3,
+        max_df: float = 0.1,
+    ):
+        self.top_n = top_n
+        self.matcher = TfidfMatcher(
+            ngram_range=(ngram_size, ngram_size), max_df=max_df
+        ).fit(defendant_names)
+        self.choices = self.matcher.choices
+        self.processed_choices = self.matcher.processed_choices
+        self.choice_lengths = np.array([len(c) for c in self.processed_choices])
+
+    def candidates(self, queries: List[str]) -> List[np.ndarray]:
+        """Return the indices of the candidate defendants of each query, ascending."""
+        return [
+            np.sort(indices)
+            for indices, _ in self.matcher.kneighbors_processed(queries, self.top_n)
+        ]
+
+    def match(
+        self,
+        project_names: List[str],
+        threshold: int = 80,
+        exact: bool = True,
+        workers: int = -1,
+        chunk_size: int = 4096,
+    ) -> List[Match]:
+        """
+        Match project names against the indexed defendants.
+
+        Args:
+            project_names (list): A list of project names.
+            threshold (int, optional): The minimum similarity score threshold (0-100). Defaults to 80.
+            exact (bool, optional): Reproduce fuzzywuzzy's difflib scores. Defaults to True.
+            workers (int, optional): Threads used by rapidfuzz; -1 uses all cores.
+            chunk_size (int, optional): Number of projects processed at a time.
+
+        Returns:
+            list: A list of tuples containing matched project-defendant pairs and their similarity scores.
+        """
+        matched_pairs: List[Match] = []
+        for start in range(0, len(project_names), chunk_size):
+            projects = project_names[start : start + chunk_size]
+            queries = [process_name(name) for name in projects]
+            candidates = self.candidates(queries)
+            # Score all (query, candidate) pairs of the chunk in one native call
+            rows = np.repeat(np.arange(len(queries)), [len(c) for c in candidates])
+            cols = np.concatenate(candidates) if candidates else np.zeros(0, int)
+            distances = rf_process.cpdist(
+                [queries[row] for row in rows],
+                [self.processed_choices[col] for col in cols],
+                scorer=Indel.distance,
+                workers=workers,
+            )
+            lengths = np.array([len(queries[row]) for row in rows], dtype=np.int64)
+            scores = _round_scores(distances, lengths + self.choice_lengths[cols])
+            offsets = np.cumsum([0] + [len(c) for c in candidates])
+            for row, (project_name, query) in enumerate(zip(projects, queries)):
+                lo, hi = offsets[row], offsets[row + 1]
+                match = _select_match(
+                    query,
+                    cols[lo:hi],
+                    scores[lo:hi],
+                    self.processed_choices,
+                    threshold,
+                    exact,
+                )
+                if match is None:
+                    matched_pairs.append((project_name, None, None))
+                else:
+                    matched_pairs.append(
+                        (project_name, self.choices[match[0]], match[1])
+                    )
+        return matched_pairs
+
+
+def blocking_recall(
+    project_names: List[str],
+    defendant_names: List[str],
+    threshold: int = 80,
+    sample_size: Optional[int] = 1000,
+    seed: int = 0,
+    **index_kwargs,
+) -> Dict[str, float]:
+    """
+    Measure how many exhaustive matches a `BlockingIndex` finds.
+
+    A match counts as found if blocking returns a defendant with the same
+    score as exhaustive matching (ties may resolve to another defendant).
+
+    Args:
+        project_names (list): A list of project names.
+        defendant_names (list): A list of defendant names.
+        threshold (int, optional): The minimum similarity score threshold (0-100). Defaults to 80.
+        sample_size (Optional[int], optional): Number of projects sampled for
+            the exhaustive comparison. All projects if None. Defaults to 1000.
+        seed (int, optional): Random seed of the sample. Defaults to 0.
+        **index_kwargs: Arguments of `BlockingIndex`.
+
+    Returns:
+        Dict[str, float]: The number of exhaustive `matches`, the number
+            `found` by blocking, and the `recall`.
+    """
+    if sample_size is not None and sample_size < len(project_names):
+        project_names = random.Random(seed).sample(list(project_names), sample_size)
+    exhaustive = cdist_match(project_names, defendant_names, threshold, exact=False)
+    blocked = BlockingIndex(defendant_names, **index_kwargs).match(
+        project_names, threshold, exact=False
+    )
+    matches = sum(score is not None for _, _, score in exhaustive)
+    found = sum(
+        expected[2] is not None and expected[2] == actual[2]
+        for expected, actual in zip(exhaustive, blocked)
+    )
+    recall = found / matches if matches else 1.0
+    logger.info("Blocking found %s of %s matches (recall %.4f)", found, matches, recall)
+    return {"matches": matches, "found": found, "recall": recall}
+
+
+def match_projects_defendants(
+    project_names,
+    defendant_names,
+    threshold=80,
+    method="cdist",
+    normalize=False,
+    **kwargs,
+):
     """
     Match project names with defendant names using fuzzy matching.
 
+    Duplicate names are collapsed into unique keys first, so the matching work
+    scales with the number of distinct names; the results are fanned back out
+    to every project name.
+
     Args:
         project_names (list): A list of project names.
         defendant_names (list): A list of defendant names.
         threshold (int, optional): The minimum similarity score threshold (0-100). Defaults to 80.
+        method (str, optional): "cdist" scores all pairs at once in native code
+            (see `cdist_match`, which takes the extra keyword arguments);
+            "blocking" scores each project against the candidates of a
+            `BlockingIndex` (its arguments and those of `BlockingIndex.match`
+            are accepted); "tfidf" matches by character n-gram TF-IDF cosine
+            similarity instead of `token_sort_ratio` (see `TfidfMatcher`, whose
+            arguments are accepted); "extractone" calls `fuzzy_match` once per
+            project. Defaults to "cdist".
+        normalize (bool, optional): Canonicalize names with `normalize_name`
+            (punctuation, legal suffixes, abbreviations) before matching. A
+            matched defendant is reported by its most frequent spelling.
+            Defaults to False.
 
     Returns:
         list: A list of tuples containing matched project-defendant pairs and their similarity scores.
     """
+    key = normalize_name if normalize else None
+    projects = group_names(project_names, key)
+    defendants = group_names(defendant_names, key)
+    logger.info(
+        "Matching %s unique project names (%s in total) with %s unique "
+        "defendant names (%s in total)",
+        len(projects),
+        len(project_names),
+        len(defendants),
+        len(defendant_names),
+    )
+    unique_matches = _match_unique(
+        list(projects), list(defendants), threshold, method, **kwargs
+    )
+    matches_by_key = {
+        project_key: (
+            (
+                representative(defendants[defendant_key])
+                if defendant_key is not None
+                else None
+            ),
+            score,
+        )
+        for project_key, defendant_key, score in unique_matches
+    }
+    return [
+        (name, *matches_by_key[key(name) if key else name]) for name in project_names
+    ]
+
+
+def _match_unique(
+    project_names: List[str],
+    defendant_names: List[str],
+    threshold: int,
+    method: str,
+    **kwargs,
+) -> List[Match]:
+    if method == "cdist":
+        return cdist_match(project_names, defendant_names, threshold, **kwargs)
+    if method == "blocking":
+        index_kwargs = {
+            key: kwargs.pop(key)
+            for key in ("top_n", "ngram_size", "max_df")
+            if key in kwargs
+        }
+        index = BlockingIndex(defendant_names, **index_kwargs)
+        return index.match(project_names, threshold, **kwargs)
+    if method == "tfidf":
+        matcher = TfidfMatcher(**kwargs).fit(defendant_names)
+        return matcher.match(project_names, threshold)
+    if method != "extractone":
+        raise ValueError(f"Unknown fuzzy matching method: {method}")
+
     matched_pairs = []
     for project_name in project_names:
         if match := fuzzy_match(project_name, defendant_names, threshold):
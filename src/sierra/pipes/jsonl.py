@@ -0,0 +1,175 @@
+"""
+Streaming JSONL helpers for the pipelines.
+"""
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Callable, Iterator, Optional, Set, Union
+
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+logger = logging.getLogger(__name__)
+
+PathLike = Union[str, Path]
+
+
+def iter_jsonl(
+    filename: PathLike,
+    encoding: str = "utf-8",
+    line_filter: Optional[Callable[[str], bool]] = None,
+) -> Iterator[dict]:
+    """
+    Yield the records of a jsonl file one line at a time.
+
+    Blank lines and a torn trailing line left by an interrupted writer are
+    skipped. Lines are decoded with `orjson` when it is installed.
+
+    Args:
+        filename (PathLike): The jsonl file to read.
+        encoding (str, optional): The file encoding. Defaults to "utf-8".
+        line_filter (Optional[Callable[[str], bool]], optional): A cheap test
+            on the raw line; lines it rejects are skipped without being parsed.
+
+    Yields:
+        dict: The parsed records.
+    """
+    with open(filename, "r", encoding=encoding) as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip() or (line_filter and not line_filter(line)):
+                continue
+            try:
+                yield _loads(line)
+            except json.JSONDecodeError:
+                if line.endswith("\n"):
+                    raise
+                logger.warning(
+                    "Skipping incomplete last line %s of %s", line_no, filename
+                )
+
+
+def _truncate_torn_line(filename: PathLike) -> None:
+    """Drop a partial last line so appended records start on a new line."""
+    path = Path(filename)
+    if not path.exists() or path.stat().st_size == 0:
+        return
+    with open(path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        pos = end
+        while pos > 0:
+            step = min(pos, 64 * 1024)
+            f.seek(pos - step)
+            chunk = f.read(step)
+            if pos == end and chunk.endswith(b"\n"):
+                return
+            if (idx := chunk.rfind(b"\n")) >= 0:
+                pos = pos - step + idx + 1
+                break
+            pos -= step
+        f.truncate(pos)
+        logger.warning("Truncated %s incomplete bytes from %s", end - pos, filename)
+
+
+class JsonlWriter:
+    """
+    Append records to a jsonl file as they are produced.
+
+    Records are buffered by the file object until `flush` is called; with
+    `fsync` enabled every flush is also forced to disk.
+
+    Args:
+        filename (PathLike): The jsonl file to append to.
+        fsync (bool, optional): Call `os.fsync` on every flush. Defaults to False.
+        encoding (str, optional): The file encoding. Defaults to "utf-8".
+    """
+
+    def __init__(
+        self,
+        filename: PathLike,
+        fsync: bool = False,
+        encoding: str = "utf-8",
+    ):
+        self.filename = filename
+        self.fsync = fsync
+        Path(filename).parent.mkdir(parents=True, exist_ok=True)
+        _truncate_torn_line(filename)
+        self._file = open(filename, "a", encoding=encoding)
+
+    def write(self, record: dict) -> None:
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def flush(self) -> None:
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+
+    def __enter__(self) -> "JsonlWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class Checkpoint:
+    """
+    Sidecar file recording the keys of completed work items.
+
+    Args:
+        filename (PathLike): The checkpoint file, one key per line.
+        fsync (bool, optional): Call `os.fsync` on every flush. Defaults to False.
+    """
+
+    def __init__(self, filename: PathLike, fsync: bool = False):
+        self.filename = filename
+        self.completed: Set[str] = set()
+        if Path(filename).exists():
+            with open(filename, "r", encoding="utf-8") as f:
+                self.completed.update(line.strip() for line in f if line.strip())
+        self.fsync = fsync
+        self._file: Optional[object] = None
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.completed
+
+    def __len__(self) -> int:
+        return len(self.completed)
+
+    def add(self, key: str) -> None:
+        if self._file is None:
+            Path(self.filename).parent.mkdir(parents=True, exist_ok=True)
+            _truncate_torn_line(self.filename)
+            self._file = open(self.filename, "a", encoding="utf-8")
+        self._file.write(key + "\n")
+        self.completed.add(key)
+
+    def flush(self) -> None:
+        if self._file is None:
+            return
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        if self._file is None:
+            return
+        self.flush()
+        self._file.close()
+        self._file = None
+
+    def __enter__(self) -> "Checkpoint":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
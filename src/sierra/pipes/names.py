@@ -0,0 +1,107 @@
+"""
+Canonicalization of organization names before matching.
+"""
+
+import re
+import unicodedata
+from collections import Counter
+from typing import Callable, Dict, Iterable, Optional
+
+# Periods inside abbreviations such as "u.s." or "l.l.c."
+_DOTTED_ABBREVIATION_RE = re.compile(r"\b(?:[a-z]\.){2,}")
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+
+ABBREVIATIONS: Dict[str, str] = {
+    "us": "united states",
+    "usa": "united states",
+    "dept": "department",
+    "natl": "national",
+    "intl": "international",
+    "assn": "association",
+    "assoc": "association",
+    "admin": "administration",
+    "auth": "authority",
+    "svc": "service",
+    "svcs": "services",
+    "mfg": "manufacturing",
+    "univ": "university",
+    "bros": "brothers",
+    "elec": "electric",
+    "pwr": "power",
+}
+
+LEGAL_SUFFIXES = {
+    "inc",
+    "incorporated",
+    "llc",
+    "llp",
+    "lp",
+    "ltd",
+    "limited",
+    "corp",
+    "corporation",
+    "co",
+    "company",
+    "plc",
+    "pllc",
+    "sa",
+    "ag",
+    "gmbh",
+    "nv",
+    "bv",
+}
+
+
+def normalize_name(name: str) -> str:
+    """
+    Canonicalize an organization name.
+
+    Accents are stripped, "&" becomes "and", punctuation is removed (dotted
+    abbreviations are joined first, so "U.S." becomes "us"), common
+    abbreviations are expanded, and a leading "the" and trailing legal
+    suffixes (inc, llc, corp, ...) are dropped.
+
+    Args:
+        name (str): The name.
+
+    Returns:
+        str: The canonical name, or "" if nothing is left.
+    """
+    name = unicodedata.normalize("NFKD", name or "")
+    name = "".join(char for char in name if not unicodedata.combining(char))
+    name = name.lower().replace("&", " and ")
+    name = _DOTTED_ABBREVIATION_RE.sub(lambda m: m.group(0).replace(".", ""), name)
+    tokens = []
+    for token in _NON_ALNUM_RE.sub(" ", name.replace("'", "")).split():
+        tokens.extend(ABBREVIATIONS.get(token, token).split())
+    if tokens and tokens[0] == "the":
+        tokens = tokens[1:]
+    while len(tokens) > 1 and tokens[-1] in LEGAL_SUFFIXES:
+        tokens.pop()
+    return " ".join(tokens)
+
+
+def group_names(
+    names: Iterable[str], key: Optional[Callable[[str], str]] = normalize_name
+) -> Dict[str, Counter]:
+    """
+    Collapse names into unique keys.
+
+    Args:
+        names (Iterable[str]): The names, duplicates included.
+        key (Optional[Callable[[str], str]], optional): Maps a name to its key.
+            Defaults to `normalize_name`; None groups identical strings only.
+
+    Returns:
+        Dict[str, Counter]: For each key, in first-seen order, the occurrence
+            count of each original spelling, in first-seen order.
+    """
+    groups: Dict[str, Counter] = {}
+    for name in names:
+        groups.setdefault(key(name) if key else name, Counter())[name] += 1
+    return groups
+
+
+def representative(spellings: Counter) -> str:
+    """The most frequent spelling, the first seen among equally frequent ones."""
+    return spellings.most_common(1)[0][0]
@@ -0,0 +1,334 @@
+"""
+Columnar Parquet storage for scraped articles and extraction results.
+
+`pyarrow` is optional; it is imported the first time a Parquet file is used.
+"""
+
+import logging
+import os
+import typing
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sierra.pipes.jsonl import PathLike, iter_jsonl
+
+logger = logging.getLogger(__name__)
+
+PARQUET_SUFFIX = ".parquet"
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as e:
+        raise ImportError(
+            "Parquet storage requires pyarrow: pip install 'sierraclub[parquet]'"
+        ) from e
+    return pyarrow
+
+
+def is_parquet(filename: PathLike) -> bool:
+    """Whether `filename` names a Parquet file."""
+    return Path(filename).suffix.lower() == PARQUET_SUFFIX
+
+
+def arrow_type(python_type):
+    """The Arrow type of a scalar type or a `List` of one."""
+    pa = _pyarrow()
+    scalars = {
+        bool: pa.bool_(),
+        int: pa.int64(),
+        float: pa.float64(),
+        str: pa.string(),
+    }
+    if typing.get_origin(python_type) is list:
+        (item_type,) = typing.get_args(python_type)
+        return pa.list_(arrow_type(item_type))
+    return scalars[python_type]
+
+
+def make_schema(fields: Sequence[Tuple[str, type]]):
+    """
+    Build a Parquet schema from field names and Python types.
+
+    Every column is nullable, so records may omit any field.
+
+    Args:
+        fields (Sequence[Tuple[str, type]]): The names and types, in order.
+
+    Returns:
+        pyarrow.Schema: The schema.
+    """
+    pa = _pyarrow()
+    return pa.schema([(name, arrow_type(python_type)) for name, python_type in fields])
+
+
+def _fill_null_types(schema):
+    """Type all-null columns as strings so that later row groups can fill them."""
+    pa = _pyarrow()
+    fields = []
+    for field in schema:
+        if pa.types.is_null(field.type):
+            field = field.with_type(pa.string())
+        elif pa.types.is_list(field.type) and pa.types.is_null(field.type.value_type):
+            field = field.with_type(pa.list_(pa.string()))
+        fields.append(field)
+    return pa.schema(fields)
+
+
+class ParquetAppender:
+    """
+    Append records to a Parquet file one row group at a time.
+
+    Records are buffered and written as a row group every `row_group_size`
+    records. A Parquet file cannot be reopened for writing, so with `append`
+    the row groups of an existing file are first copied, one at a time, into
+    the new one. Everything is written to `<filename>.tmp`, which replaces
+    `filename` on `close`; an interrupted writer leaves the old file intact.
+
+    Without a `schema`, the schema of the existing file, or else that of the
+    first row group, is used. All-null columns are typed as strings, and keys
+    missing from the schema are dropped with a warning; pass a `schema` (see
+    `make_schema`) when later records may add keys or fill such columns with
+    lists. With `append`, the existing row groups are cast to it, and columns
+    they lack are filled with nulls.
+
+    Args:
+        filename (PathLike): The Parquet file.
+        schema (Optional[pyarrow.Schema], optional): The schema. Defaults to None.
+        row_group_size (int, optional): Records per row group. Defaults to 1024.
+        append (bool, optional): Keep the records of an existing file.
+            Defaults to False.
+    """
+
+    def __init__(
+        self,
+        filename: PathLike,
+        schema=None,
+        row_group_size: int = 1024,
+        append: bool = False,
+    ):
+        self.pa = _pyarrow()
+        self.filename = Path(filename)
+        self.tmp_filename = self.filename.with_name(f"{self.filename.name}.tmp")
+        self.filename.parent.mkdir(parents=True, exist_ok=True)
+        self.schema = schema
+        self.row_group_size = row_group_size
+        self.num_rows = 0
+        self._buffer: List[Dict] = []
+        self._dropped_fields = set()
+        self._writer = None
+        self._previous = None
+        if append and self.filename.exists():
+            self._previous = self.pa.parquet.ParquetFile(self.filename)
+            if self.schema is None:
+                self.schema = self._previous.schema_arrow
+
+    def _open(self) -> None:
+        self._writer = self.pa.parquet.ParquetWriter(self.tmp_filename, self.schema)
+        if self._previous is None:
+            return
+        for i in range(self._previous.num_row_groups):
+            self._writer.write_table(self._conform(self._previous.read_row_group(i)))
+
+    def _conform(self, table):
+        """Cast a table to the schema, with null columns for missing fields."""
+        pa = self.pa
+        columns = [
+            (
+                table.column(field.name).cast(field.type)
+                if field.name in table.column_names
+                else pa.nulls(table.num_rows, field.type)
+            )
+            for field in self.schema
+        ]
+        return pa.Table.from_arrays(columns, schema=self.schema)
+
+    def write(self, record: Dict) -> None:
+        self._buffer.append(record)
+        if len(self._buffer) >= self.row_group_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered records as a row group."""
+        if not self._buffer:
+            return
+        pa = self.pa
+        if self.schema is None:
+            self.schema = _fill_null_types(pa.Table.from_pylist(self._buffer).schema)
+        dropped = {key for record in self._buffer for key in record}
+        dropped -= set(self.schema.names) | self._dropped_fields
+        if dropped:
+            logger.warning(
+                "Dropping fields missing from the schema of %s: %s",
+                self.filename,
+                sorted(dropped),
+            )
+            self._dropped_fields |= dropped
+        table = pa.Table.from_pylist(self._buffer, schema=self.schema)
+        if self._writer is None:
+            self._open()
+        self._writer.write_table(table, row_group_size=self.row_group_size)
+        self.num_rows += table.num_rows
+        self._buffer = []
+
+    def _close_files(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._previous is not None:
+            self._previous.close()
+            self._previous = None
+
+    def close(self) -> None:
+        """Write the remaining records and move the file into place."""
+        self.flush()
+        if self._writer is None and self._previous is None and self.schema is not None:
+            # Nothing was written, but the schema is known: leave an empty file
+            self._open()
+        if self._writer is None:
+            self._close_files()
+            return
+        self._close_files()
+        os.replace(self.tmp_filename, self.filename)
+
+    def abort(self) -> None:
+        """Discard everything written since the file was opened."""
+        self._buffer = []
+        self._close_files()
+        self.tmp_filename.unlink(missing_ok=True)
+
+    def __enter__(self) -> "ParquetAppender":
+        return self
+
+    def __exit__(self, exc_type, *exc) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_parquet(
+    records: Iterable[Dict],
+    filename: PathLike,
+    row_group_size: int = 1024,
+    append: bool = False,
+    schema=None,
+) -> int:
+    """
+    Write records to a Parquet file, streaming them in row groups.
+
+    Args:
+        records (Iterable[Dict]): The records.
+        filename (PathLike): The Parquet file.
+        row_group_size (int, optional): Records per row group. Defaults to 1024.
+        append (bool, optional): Keep the records of an existing file.
+            Defaults to False.
+        schema (Optional[pyarrow.Schema], optional): The schema. Defaults to None.
+
+    Returns:
+        int: The number of records written.
+    """
+    with ParquetAppender(
+        filename, schema=schema, row_group_size=row_group_size, append=append
+    ) as appender:
+        for record in records:
+            appender.write(record)
+    return appender.num_rows
+
+
+def iter_parquet(
+    filename: PathLike,
+    columns: Optional[Sequence[str]] = None,
+    batch_size: int = 1024,
+) -> Iterator[Dict]:
+    """
+    Yield the records of a Parquet file one batch at a time.
+
+    Args:
+        filename (PathLike): The Parquet file.
+        columns (Optional[Sequence[str]], optional): Read only these columns.
+            Defaults to all.
+        batch_size (int, optional): Records decoded at a time. Defaults to 1024.
+
+    Yields:
+        dict: The records, holding only the requested columns.
+    """
+    parquet_file = _pyarrow().parquet.ParquetFile(filename)
+    try:
+        for batch in parquet_file.iter_batches(
+            batch_size=batch_size, columns=list(columns) if columns else None
+        ):
+            yield from batch.to_pylist()
+    finally:
+        parquet_file.close()
+
+
+def read_columns(filename: PathLike, columns: Sequence[str]) -> Dict[str, list]:
+    """
+    Read only the given columns of a Parquet file.
+
+    Args:
+        filename (PathLike): The Parquet file.
+        columns (Sequence[str]): The columns to read.
+
+    Returns:
+        Dict[str, list]: The values of each column.
+    """
+    return _pyarrow().parquet.read_table(filename, columns=list(columns)).to_pydict()
+
+
+def iter_records(
+    filename: PathLike, columns: Optional[Sequence[str]] = None
+) -> Iterator[Dict]:
+    """
+    Yield the records of a jsonl or Parquet file, by its suffix.
+
+    Args:
+        filename (PathLike): The file.
+        columns (Optional[Sequence[str]], optional): The columns a Parquet file
+            is projected to; jsonl records are parsed whole. Defaults to all.
+
+    Yields:
+        dict: The records.
+    """
+    if is_parquet(filename):
+        yield from iter_parquet(filename, columns=columns)
+    else:
+        yield from iter_jsonl(filename)
+
+
+def jsonl_to_parquet(
+    jsonl_file: PathLike,
+    parquet_file: Optional[PathLike] = None,
+    row_group_size: int = 1024,
+    append: bool = False,
+) -> str:
+    """
+    Convert a jsonl file to Parquet without loading it into memory.
+
+    The schema is inferred from the first `row_group_size` records.
+
+    Args:
+        jsonl_file (PathLike): The jsonl file.
+        parquet_file (Optional[PathLike], optional): The Parquet file. Defaults
+            to `jsonl_file` with a ".parquet" suffix.
+        row_group_size (int, optional): Records per row group. Defaults to 1024.
+        append (bool, optional): Keep the records of an existing Parquet file.
+            Defaults to False.
+
+    Returns:
+        str: The Parquet file.
+    """
+    parquet_file = str(parquet_file or Path(jsonl_file).with_suffix(PARQUET_SUFFIX))
+    num_rows = write_parquet(
+        iter_jsonl(jsonl_file),
+        parquet_file,
+        row_group_size=row_group_size,
+        append=append,
+    )
+    logger.info(
+        "Converted %s records from %s to %s", num_rows, jsonl_file, parquet_file
+    )
+    return parquet_file
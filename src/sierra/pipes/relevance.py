@@ -0,0 +1,302 @@
+"""
+Local relevance classifier that decides which press releases reach the LLM.
+"""
+
+import itertools
+import logging
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+import joblib
+import numpy as np
+from hyfi.composer import BaseModel
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import StratifiedKFold, cross_val_predict
+from sklearn.pipeline import Pipeline
+
+from sierra.pipes.parquet import iter_records
+
+if TYPE_CHECKING:
+    from sierra.pipes.boilerplate import BoilerplateStripper
+
+logger = logging.getLogger(__name__)
+
+
+def load_training_data(
+    scraped_data_file: str,
+    extracted_data_file: str,
+    evaluated_file: Optional[str] = None,
+    text_field: str = "content",
+    key_field: str = "url",
+    stripper: Optional["BoilerplateStripper"] = None,
+) -> Tuple[List[str], List[int]]:
+    """
+    Label press releases with the LLM's judgements from past extraction runs.
+
+    Items written to `extracted_data_file` had `has_lawsuit` true and are
+    positives. Items the LLM judged without finding a lawsuit, recorded by
+    `extract` in the evaluated sidecar, are negatives. Items stopped by the
+    keyword gate or by a relevance filter never reached the LLM and are left
+    out, so the classifier learns the LLM's judgement rather than the gate's.
+
+    Pass the `key_field` and `stripper` of the extraction runs: the UUIDs
+    must match theirs, and the classifier must learn from the text it will
+    score, without the boilerplate.
+
+    Args:
+        scraped_data_file (str): The scraped press releases (jsonl) with `uuid`s.
+        extracted_data_file (str): The extracted lawsuit details (jsonl or
+            Parquet).
+        evaluated_file (Optional[str], optional): The UUIDs judged by the LLM.
+            Defaults to `<extracted_data_file>.evaluated`.
+        text_field (str, optional): The field holding the text. Defaults to "content".
+        key_field (str, optional): The field the UUIDs are derived from.
+            Defaults to "url".
+        stripper (Optional[BoilerplateStripper], optional): The boilerplate
+            stripper of the extraction runs. Defaults to None.
+
+    Returns:
+        Tuple[List[str], List[int]]: The texts and their labels.
+    """
+    from sierra.pipes.extract_lawsuits import iter_model_inputs
+
+    positives = {
+        record["uuid"]
+        for record in iter_records(extracted_data_file, ["uuid", "has_lawsuit"])
+        if record.get("has_lawsuit", True)
+    }
+    evaluated_file = evaluated_file or f"{extracted_data_file}.evaluated"
+    processed = set(positives)
+    if Path(evaluated_file).exists():
+        with open(evaluated_file, "r", encoding="utf-8") as f:
+            processed.update(line.strip() for line in f if line.strip())
+
+    texts, labels = [], []
+    seen = set()
+    for item in iter_model_inputs(scraped_data_file, key_field, stripper):
+        if item["uuid"] not in processed or item["uuid"] in seen:
+            continue
+        seen.add(item["uuid"])
+        texts.append(item.get(text_field) or "")
+        labels.append(int(item["uuid"] in positives))
+    logger.info(
+        "Loaded %s labelled press releases (%s with lawsuits)",
+        len(labels),
+        sum(labels),
+    )
+    return texts, labels
+
+
+class RelevanceFilter(BaseModel):
+    """
+    TF-IDF and logistic regression classifier of lawsuit-related press releases.
+
+    Trained on the outcome of past LLM extractions (see `load_training_data`),
+    it replaces the `"lawsuit" in text` keyword gate: only items scoring at or
+    above `threshold` are sent to the LLM. Keep the threshold low; a missed
+    lawsuit costs more than an extra LLM call. Use `report` to pick it.
+
+    Attributes:
+        threshold (float): Minimum probability for an item to reach the LLM.
+        batch_size (int): Number of items scored per vectorized call.
+        max_features (int): Vocabulary size of the TF-IDF vectorizer.
+        ngram_max (int): Longest word n-gram, so phrases like "petition for
+            review" are features.
+        C (float): Inverse regularization strength of the logistic regression.
+        model_file (Optional[str]): Where `save` and `load` keep the model.
+        text_field (str): The field holding the text.
+    """
+
+    _config_name_: str = "relevance"
+    _config_group_: str = "/pipe"
+
+    threshold: float = 0.2
+    batch_size: int = 256
+    max_features: int = 50_000
+    ngram_max: int = 3
+    C: float = 4.0
+    model_file: Optional[str] = None
+    text_field: str = "content"
+
+    _model_: Optional[Any] = None
+
+    @property
+    def model(self) -> Pipeline:
+        if self._model_ is None:
+            if self.model_file and Path(self.model_file).exists():
+                self.load()
+            else:
+                raise ValueError("The relevance filter has not been fitted.")
+        return self._model_
+
+    def _new_model(self) -> Pipeline:
+        return Pipeline(
+            [
+                (
+                    "tfidf",
+                    TfidfVectorizer(
+                        lowercase=True,
+                        ngram_range=(1, self.ngram_max),
+                        max_features=self.max_features,
+                        sublinear_tf=True,
+                        min_df=1,
+                    ),
+                ),
+                (
+                    "clf",
+                    LogisticRegression(
+                        C=self.C, class_weight="balanced", max_iter=1000
+                    ),
+                ),
+            ]
+        )
+
+    def fit(self, texts: Sequence[str], labels: Sequence[int]) -> "RelevanceFilter":
+        self._model_ = self._new_model().fit(list(texts), list(labels))
+        logger.info("Fitted the relevance filter on %s press releases", len(texts))
+        return self
+
+    def score(self, texts: Sequence[str]) -> np.ndarray:
+        """Return the probability that each text reports a lawsuit."""
+        if not len(texts):
+            return np.zeros(0)
+        return self.model.predict_proba(list(texts))[:, 1]
+
+    def annotate(self, data: Iterable[Dict]) -> Iterator[Dict]:
+        """
+        Score items in batches of `batch_size` and yield copies of them, in
+        order, with `relevance_score` and `relevant` set.
+        """
+        items = iter(data)
+        while batch := list(itertools.islice(items, self.batch_size)):
+            scores = self.score([item.get(self.text_field) or "" for item in batch])
+            for item, score in zip(batch, scores):
+                item = dict(item)
+                item["relevance_score"] = float(score)
+                item["relevant"] = bool(score >= self.threshold)
+                yield item
+
+    def report(
+        self,
+        texts: Sequence[str],
+        labels: Sequence[int],
+        thresholds: Optional[Sequence[float]] = None,
+        cv: int = 5,
+    ) -> Dict[str, Any]:
+        """
+        Estimate precision and recall with cross-validated predictions.
+
+        Args:
+            texts (Sequence[str]): The texts.
+            labels (Sequence[int]): Their labels.
+            thresholds (Optional[Sequence[float]], optional): Thresholds to
+                tabulate in addition to `threshold`.
+            cv (int, optional): Number of folds. Defaults to 5.
+
+        Returns:
+            Dict[str, Any]: `precision`, `recall` and `forwarded` (the fraction
+                of items sent to the LLM) at `threshold`, and the same metrics
+                for every threshold under `curve`.
+        """
+        y = np.asarray(labels)
+        folds = min(cv, int(np.bincount(y, minlength=2).min()))
+        if folds < 2:
+            raise ValueError("Need at least two examples of each class.")
+        scores = cross_val_predict(
+            self._new_model(),
+            list(texts),
+            y,
+            cv=StratifiedKFold(n_splits=folds, shuffle=True, random_state=0),
+            method="predict_proba",
+        )[:, 1]
+
+        def _metrics(threshold: float) -> Dict[str, float]:
+            forwarded = scores >= threshold
+            true_positives = int((forwarded & (y == 1)).sum())
+            return {
+                "threshold": threshold,
+                "precision": true_positives / max(int(forwarded.sum()), 1),
+                "recall": true_positives / max(int((y == 1).sum()), 1),
+                "forwarded": float(forwarded.mean()),
+            }
+
+        thresholds = thresholds or [0.05, 0.1, 0.2, 0.3, 0.5, 0.7, 0.9]
+        report = _metrics(self.threshold)
+        report["curve"] = [_metrics(t) for t in sorted(set(thresholds))]
+        logger.info(
+            "At threshold %.2f: precision %.3f, recall %.3f, %.1f%% forwarded",
+            self.threshold,
+            report["precision"],
+            report["recall"],
+            report["forwarded"] * 100,
+        )
+        return report
+
+    def save(self, model_file: Optional[str] = None) -> str:
+        model_file = model_file or self.model_file
+        if not model_file:
+            raise ValueError("model_file is required.")
+        Path(model_file).parent.mkdir(parents=True, exist_ok=True)
+        joblib.dump(self.model, model_file)
+        logger.info("Saved the relevance filter to %s", model_file)
+        return model_file
+
+    def load(self, model_file: Optional[str] = None) -> "RelevanceFilter":
+        model_file = model_file or self.model_file
+        if not model_file:
+            raise ValueError("model_file is required.")
+        self._model_ = joblib.load(model_file)
+        logger.info("Loaded the relevance filter from %s", model_file)
+        return self
+
+
+def train_relevance_filter(
+    scraped_data_file: str,
+    extracted_data_file: str,
+    model_file: str,
+    threshold: float = 0.2,
+    evaluated_file: Optional[str] = None,
+    key_field: str = "url",
+    stripper: Optional["BoilerplateStripper"] = None,
+) -> Tuple[RelevanceFilter, Dict[str, Any]]:
+    """
+    Fit a relevance filter on past extractions and save it.
+
+    Args:
+        scraped_data_file (str): The scraped press releases (jsonl).
+        extracted_data_file (str): The extracted lawsuit details (jsonl).
+        model_file (str): Where to save the model.
+        threshold (float, optional): The score threshold. Defaults to 0.2.
+        evaluated_file (Optional[str], optional): The UUIDs judged by the LLM
+            (see `load_training_data`).
+        key_field (str, optional): The field the UUIDs are derived from.
+            Defaults to "url".
+        stripper (Optional[BoilerplateStripper], optional): The boilerplate
+            stripper of the extraction runs. Defaults to None.
+
+    Returns:
+        Tuple[RelevanceFilter, Dict[str, Any]]: The fitted filter and its
+            cross-validated precision/recall report.
+    """
+    texts, labels = load_training_data(
+        scraped_data_file,
+        extracted_data_file,
+        evaluated_file,
+        key_field=key_field,
+        stripper=stripper,
+    )
+    relevance_filter = RelevanceFilter(threshold=threshold, model_file=model_file)
+    report = relevance_filter.report(texts, labels)
+    relevance_filter.fit(texts, labels).save()
+    return relevance_filter, report
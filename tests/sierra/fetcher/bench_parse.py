@@ -0,0 +1,89 @@
+"""
+Per-page parse time of the saved fixture pages, full tree vs. strained.
+
+Both sides build the tree with the same tree builder and only the parsing
+is timed: the strainers and the lookups are those of `SierraClubFetcher`.
+One column is printed per installed tree builder.
+
+Usage:
+    python tests/sierra/fetcher/bench_parse.py [repeat]
+"""
+
+import sys
+import timeit
+from typing import Optional
+
+from bs4 import BeautifulSoup, FeatureNotFound, SoupStrainer
+from fixture_site import OfflineFetcher, load_fixture
+
+TREE_BUILDERS = ["html.parser", "lxml"]
+
+
+def installed_tree_builders():
+    builders = []
+    for builder in TREE_BUILDERS:
+        try:
+            BeautifulSoup("", builder)
+        except FeatureNotFound:
+            continue
+        builders.append(builder)
+    return builders
+
+
+def parse_listing(
+    fetcher, html: str, builder: str, parse_only: Optional[SoupStrainer] = None
+):
+    soup = BeautifulSoup(html, builder, parse_only=parse_only)
+    return [
+        post.find(fetcher.lint_article_name, attrs=fetcher.lint_article_attrs)
+        for post in soup.find_all(
+            fetcher.link_find_all_name, attrs=fetcher.link_find_all_attrs
+        )
+    ]
+
+
+def parse_article(
+    fetcher, html: str, builder: str, parse_only: Optional[SoupStrainer] = None
+):
+    soup = BeautifulSoup(html, builder, parse_only=parse_only)
+    title = soup.find(fetcher.article_title_name, attrs=fetcher.article_title_attrs)
+    content = soup.find(
+        fetcher.article_content_name, attrs=fetcher.article_content_attrs
+    )
+    return title.text.strip(), content.text.strip()
+
+
+def main(repeat: int = 200):
+    fetcher = OfflineFetcher()
+    listing = load_fixture("press_releases.html")
+    article = load_fixture("press_release.html")
+    listing_strainer = SoupStrainer(
+        fetcher.link_find_all_name, attrs=fetcher.link_find_all_attrs
+    )
+    article_strainer = SoupStrainer(
+        [fetcher.article_title_name, fetcher.article_content_name]
+    )
+    cases = [
+        ("listing, full tree", parse_listing, listing, None),
+        ("listing, strained", parse_listing, listing, listing_strainer),
+        ("article, full tree", parse_article, article, None),
+        ("article, strained", parse_article, article, article_strainer),
+    ]
+    builders = installed_tree_builders()
+    print(f"{'ms/page':<20}" + "".join(f"{builder:>14}" for builder in builders))
+    for name, parse, html, strainer in cases:
+        row = f"{name:<20}"
+        for builder in builders:
+            seconds = min(
+                timeit.repeat(
+                    lambda: parse(fetcher, html, builder, strainer),
+                    number=repeat,
+                    repeat=3,
+                )
+            )
+            row += f"{seconds / repeat * 1000:14.3f}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
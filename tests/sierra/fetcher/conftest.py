@@ -0,0 +1,31 @@
+import pytest
+from fixture_site import FixtureSite
+
+from sierra.fetcher import SierraClubFetcher
+
+
+@pytest.fixture
+def fixture_site():
+    with FixtureSite() as site:
+        yield site
+
+
+@pytest.fixture
+def make_fetcher(tmp_path):
+    """Factory of fetchers crawling a fixture site into `tmp_path`."""
+
+    def _make_fetcher(site, **kwargs):
+        config = dict(
+            base_url=site.base_url,
+            search_url=site.search_url,
+            max_num_pages=None,
+            max_num_articles=None,
+            num_workers=4,
+            requests_per_second=0,
+            output_dir=str(tmp_path),
+            verbose=False,
+        )
+        config.update(kwargs)
+        return SierraClubFetcher(**config)
+
+    return _make_fetcher
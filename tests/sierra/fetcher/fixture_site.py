@@ -0,0 +1,113 @@
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from sierra.fetcher import SierraClubFetcher
+from sierra.fetcher.sierra import FetchResponse
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+EMPTY_LISTING = "<html><body><div class='view-content'></div></body></html>"
+
+
+def load_fixture(name: str) -> str:
+    return (FIXTURES_DIR / name).read_text(encoding="utf-8")
+
+
+class OfflineFetcher(SierraClubFetcher):
+    """Fetcher that serves every URL from the saved fixture pages."""
+
+    def get_page(self, url: str):
+        name = "press_releases.html" if "page=" in url else "press_release.html"
+        return FetchResponse(text=load_fixture(name), status_code=200)
+
+
+class FixtureSite:
+    """Local stand-in for sierraclub.org serving the saved fixture pages."""
+
+    def __init__(self, num_pages: int = 3, delay: float = 0.0):
+        self.num_pages = num_pages
+        self.delay = delay
+        # Shifts the listing by whole pages, as if new releases were published
+        self.offset = 0
+        self.listing = load_fixture("press_releases.html")
+        self.article = load_fixture("press_release.html")
+        self.paths = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        # Send an ETag and honour If-None-Match, like a real CDN would
+        self.etags = False
+        self.bytes_sent = 0
+        self.not_modified = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.search_url = (
+            self.base_url + "/press-releases?_wrapper_format=html&page={page}"
+        )
+
+    def listing_page(self, page: int) -> str:
+        if page > self.num_pages + self.offset:
+            return EMPTY_LISTING
+        return self.listing.replace(
+            'href="/press-releases/2024/',
+            f'href="/press-releases/p{page - self.offset}/2024/',
+        )
+
+    def respond(self, handler: BaseHTTPRequestHandler):
+        url = urlsplit(handler.path)
+        if url.path == "/press-releases":
+            page = int(parse_qs(url.query)["page"][0])
+            return 200, {}, self.listing_page(page)
+        if url.path.startswith("/press-releases/"):
+            return 200, {}, self.article
+        return 404, {}, "not found"
+
+    def _handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with site._lock:
+                    site.paths.append(self.path)
+                    site.in_flight += 1
+                    site.max_in_flight = max(site.max_in_flight, site.in_flight)
+                try:
+                    time.sleep(site.delay)
+                    status, headers, body = site.respond(self)
+                finally:
+                    with site._lock:
+                        site.in_flight -= 1
+                data = body.encode("utf-8")
+                if site.etags and status == 200:
+                    etag = '"%s"' % hashlib.md5(data).hexdigest()
+                    headers = {**headers, "ETag": etag}
+                    if self.headers.get("If-None-Match") == etag:
+                        status, data = 304, b""
+                with site._lock:
+                    site.bytes_sent += len(data)
+                    site.not_modified += status == 304
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
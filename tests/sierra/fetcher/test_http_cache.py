@@ -0,0 +1,50 @@
+import bs4
+
+from sierra.fetcher import sierra as sierra_module
+from sierra.fetcher.cache import HttpCache
+
+
+def test_recrawl_is_served_by_conditional_requests(
+    fixture_site, make_fetcher, monkeypatch
+):
+    fixture_site.etags = True
+    first = make_fetcher(fixture_site, use_http_cache=True)
+    first.fetch()
+    articles = {article["url"]: article["content"] for article in first.articles}
+    assert len(articles) == 30
+    bytes_first = fixture_site.bytes_sent
+
+    parses = []
+
+    def counting_soup(*args, **kwargs):
+        parses.append(1)
+        return bs4.BeautifulSoup(*args, **kwargs)
+
+    monkeypatch.setattr(sierra_module, "BeautifulSoup", counting_soup)
+    fixture_site.bytes_sent = 0
+    second = make_fetcher(fixture_site, use_http_cache=True, overwrite_existing=True)
+    second.fetch()
+
+    # 4 listing pages (the last one empty) and 30 articles, all revalidated
+    assert fixture_site.not_modified == 34
+    assert fixture_site.bytes_sent == 0
+    assert second.http_cache.hits == 34
+    assert second.http_cache.bytes_saved == bytes_first
+    # Only the listing pages are parsed again
+    assert len(parses) == 4
+    assert {a["url"]: a["content"] for a in second.articles} == articles
+
+
+def test_http_cache_evicts_least_recently_used(tmp_path):
+    cache = HttpCache(str(tmp_path), max_bytes=250)
+    for i in range(5):
+        cache.store(f"https://example.org/{i}", "x" * 100, {"ETag": f'"{i}"'})
+    assert cache.conditional_headers("https://example.org/4") == {
+        "If-None-Match": '"4"'
+    }
+    assert cache.conditional_headers("https://example.org/0") == {}
+    assert cache._total_bytes <= 250
+    assert cache.misses == 5
+
+    cache.store("https://example.org/plain", "no validators", {})
+    assert cache.conditional_headers("https://example.org/plain") == {}
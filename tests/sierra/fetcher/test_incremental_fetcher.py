@@ -0,0 +1,21 @@
+def test_incremental_crawl_fetches_only_new_releases(fixture_site, make_fetcher):
+    make_fetcher(fixture_site).fetch()
+    assert len(fixture_site.paths) == 4 + 30
+
+    # Nothing new: a single listing request
+    fixture_site.paths.clear()
+    fetcher = make_fetcher(fixture_site, incremental=True)
+    fetcher.fetch()
+    first_page = fixture_site.search_url.format(page=1)
+    assert fixture_site.paths == [first_page[len(fixture_site.base_url) :]]
+
+    # One page of new releases: two listing requests and the new articles
+    fixture_site.offset = 1
+    fixture_site.paths.clear()
+    fetcher = make_fetcher(fixture_site, incremental=True)
+    fetcher.fetch()
+    listing_requests = [path for path in fixture_site.paths if "page=" in path]
+    assert len(listing_requests) == 2
+    assert len(fixture_site.paths) == 2 + 10
+    assert len(fetcher.links) == 40
+    assert len(fetcher.articles) == 40
@@ -0,0 +1,50 @@
+import time
+
+from fixture_site import FixtureSite
+
+from sierra.fetcher.http import HostRateLimiter, TokenBucket
+
+
+def test_fetch_against_local_site(fixture_site, make_fetcher):
+    fetcher = make_fetcher(fixture_site)
+    fetcher.fetch_links()
+    assert len(fetcher.links) == 30
+    assert {link["page"] for link in fetcher.links} == {1, 2, 3}
+    assert fetcher.links[0]["timestamp"] == "April 18, 2024"
+
+    fetcher.fetch_articles()
+    assert len(fetcher.articles) == 30
+    assert fetcher.articles[0]["title"].startswith("Fish and Wildlife Service")
+    assert "BOZEMAN" in fetcher.articles[0]["content"]
+
+
+def test_limits_are_honored(fixture_site, make_fetcher):
+    fetcher = make_fetcher(fixture_site, max_num_pages=2, max_num_articles=5)
+    fetcher.fetch()
+    listing_requests = [p for p in fixture_site.paths if "page=" in p]
+    assert len(listing_requests) == 2
+    assert len(fetcher.links) == 20
+    assert len(fetcher.articles) == 5
+
+
+def test_requests_run_concurrently(make_fetcher):
+    with FixtureSite(delay=0.1) as site:
+        fetcher = make_fetcher(site, num_workers=8, max_num_articles=16)
+        fetcher.fetch_links()
+        start = time.perf_counter()
+        fetcher.fetch_articles()
+        elapsed = time.perf_counter() - start
+    assert site.max_in_flight == 8
+    # Sequential fetching would take 1.6s
+    assert elapsed < 16 * 0.1 / 2
+
+
+def test_token_bucket_rate():
+    bucket = TokenBucket(rate=50, burst=1)
+    start = time.perf_counter()
+    for _ in range(11):
+        bucket.acquire()
+    assert time.perf_counter() - start >= 0.18
+
+    limiter = HostRateLimiter(rate=None)
+    assert limiter.acquire("http://example.org/a") == 0.0
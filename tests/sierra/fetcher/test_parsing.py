@@ -0,0 +1,24 @@
+from bs4 import BeautifulSoup
+from fixture_site import OfflineFetcher, load_fixture
+
+LISTING_URL = "https://www.sierraclub.org/press-releases?page=1"
+ARTICLE_URL = "https://www.sierraclub.org/press-releases/2024/04/wolves"
+
+
+def test_listing_without_date():
+    links = OfflineFetcher().parse_page_links(LISTING_URL)
+    assert len(links) == 10
+    assert links[0]["timestamp"] == "April 18, 2024"
+    assert links[-1]["timestamp"] == ""
+    assert links[-1]["url"].endswith("/groups-petition-review-methane-rule")
+
+
+def test_strained_article_matches_full_parse():
+    soup = BeautifulSoup(load_fixture("press_release.html"), "html.parser")
+    expected = {
+        "title": soup.find("h1", class_="page-header").text.strip(),
+        "content": soup.find("article", class_="press-release").text.strip(),
+    }
+    assert OfflineFetcher().parse_article_text(ARTICLE_URL) == expected
+    fetcher = OfflineFetcher(html_parser="html.parser")
+    assert fetcher.parse_article_text(ARTICLE_URL) == expected
@@ -0,0 +1,12 @@
+import pytest
+
+
+def test_parquet_storage(fixture_site, make_fetcher):
+    pq = pytest.importorskip("pyarrow.parquet")
+    make_fetcher(fixture_site, storage_format="parquet").fetch()
+    fetcher = make_fetcher(fixture_site, storage_format="parquet")
+    assert fetcher.link_filepath.endswith("links.parquet")
+    assert pq.ParquetFile(fetcher.article_filepath).metadata.num_rows == 30
+    assert len(fetcher.links) == 30
+    assert len(fetcher.known_urls) == 30
+    assert fetcher.articles[0]["content"]
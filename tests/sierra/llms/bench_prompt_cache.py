@@ -0,0 +1,122 @@
+"""
+Time to first token and evaluated prompt tokens of the prompt layouts.
+
+A fixed corpus is extracted against the Ollama stand-in, whose simulated KV
+cache skips the prompt prefix shared with the previous request. The run
+mixes batch prompts with single-text prompts, as `extract_batch` does for
+its fallbacks and for texts too long to share a prompt.
+
+"before" is the former layout, one user message with the instructions,
+the indented format instructions and the text; "after" is the static
+system message followed by the text. The single and batch prompts give
+different schemas, so they share a cached prefix only when the server keeps
+a KV cache slot for each (`OLLAMA_NUM_PARALLEL` > 1); with one slot they
+evict each other.
+
+Usage:
+    python tests/sierra/llms/bench_prompt_cache.py [num_articles] [ms_per_token]
+"""
+
+import itertools
+import random
+import sys
+import time
+
+from fake_ollama import FakeOllama
+from langchain.output_parsers import PydanticOutputParser
+from langchain.prompts import ChatPromptTemplate
+
+from sierra.llms.registry import chat_ollama
+from sierra.models.base import LawsuitDetails, LawsuitDetailsBatch
+from sierra.models.lawsuit_ollama import LawsuitExtractor
+
+LEGACY_TEMPLATE = """
+        Your goal is to extract the details of a lawsuit from the given text.
+
+        {format_instructions}
+
+        text: {text}
+        """
+LEGACY_BATCH_TEMPLATE = """
+        Your goal is to extract the details of a lawsuit from each of the texts
+        below. Give exactly one result per text, with the id of its text.
+
+        {format_instructions}
+
+        {texts}
+        """
+
+
+def legacy_prompts():
+    def _prompt(template, schema):
+        instructions = PydanticOutputParser(pydantic_object=schema)
+        return ChatPromptTemplate.from_template(
+            template=template,
+            partial_variables={
+                "format_instructions": instructions.get_format_instructions()
+            },
+        )
+
+    return (
+        _prompt(LEGACY_TEMPLATE, LawsuitDetails),
+        _prompt(LEGACY_BATCH_TEMPLATE, LawsuitDetailsBatch),
+    )
+
+
+def make_corpus(num_articles: int, seed: int = 0):
+    rng = random.Random(seed)
+    words = "the groups sued agency permit court federal river coal plant".split()
+    return [
+        " ".join(rng.choices(words, k=rng.randint(150, 600)))
+        for _ in range(num_articles)
+    ]
+
+
+def requests(corpus, prompt, batch_prompt, batch_size: int = 3):
+    """The prompts of the run: a batch, then a text on its own, and so on."""
+    step = batch_size + 1
+    for start in range(0, len(corpus), step):
+        keys = list(range(start, min(start + batch_size, len(corpus))))
+        _, inputs = LawsuitExtractor._batch_inputs(dict(enumerate(corpus)), keys)
+        yield batch_prompt.format_messages(**inputs)
+        if start + batch_size < len(corpus):
+            yield prompt.format_messages(text=corpus[start + batch_size])
+
+
+def run(corpus, prompt, batch_prompt, prefill_seconds: float, num_slots: int):
+    with FakeOllama(prefill_seconds=prefill_seconds, num_slots=num_slots) as fake:
+        engine = chat_ollama(model="llama3", base_url=fake.base_url)
+        first_tokens = []
+        for messages in requests(corpus, prompt, batch_prompt):
+            start = time.perf_counter()
+            for i, _ in enumerate(engine.stream(messages)):
+                if i == 0:
+                    first_tokens.append(time.perf_counter() - start)
+        return first_tokens, fake.prompt_tokens, fake.evaluated_tokens
+
+
+def main(num_articles: int = 24, ms_per_token: float = 0.5):
+    corpus = make_corpus(num_articles)
+    extractor = LawsuitExtractor()
+    layouts = {
+        "before": legacy_prompts(),
+        "after": (extractor.prompt, extractor.batch_prompt),
+    }
+    print(f"{num_articles} articles, {ms_per_token} ms per evaluated prompt token")
+    for num_slots, (name, (prompt, batch_prompt)) in itertools.product(
+        (1, 4), layouts.items()
+    ):
+        first_tokens, prompt_tokens, evaluated = run(
+            corpus, prompt, batch_prompt, ms_per_token / 1e3, num_slots
+        )
+        mean = sum(first_tokens) / len(first_tokens)
+        print(
+            f"  {num_slots} slot(s), {name:<7} TTFT {mean * 1e3:6.1f} ms mean, "
+            f"{max(first_tokens) * 1e3:6.1f} ms max; "
+            f"{evaluated}/{prompt_tokens} prompt tokens evaluated "
+            f"({1 - evaluated / prompt_tokens:.0%} cached)"
+        )
+
+
+if __name__ == "__main__":
+    main(*(float(arg) if i else int(arg) for i, arg in enumerate(sys.argv[1:3])))
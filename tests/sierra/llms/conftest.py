@@ -0,0 +1,21 @@
+import pytest
+from fake_ollama import FakeOllama
+from fake_openai import FakeOpenAI
+
+from sierra.llms.ratelimit import _limiters
+from sierra.llms.registry import close_all
+
+
+@pytest.fixture
+def fake_openai():
+    with FakeOpenAI() as fake:
+        yield fake
+    _limiters.clear()
+    close_all()
+
+
+@pytest.fixture
+def fake_ollama():
+    with FakeOllama() as fake:
+        yield fake
+    close_all()
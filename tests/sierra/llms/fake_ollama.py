@@ -0,0 +1,120 @@
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sierra.llms import ChatOllamaModel
+from sierra.llms.ollama import ChatEnv
+from sierra.llms.ratelimit import RateLimitConfig
+from sierra.llms.tokens import count_tokens
+
+
+def render(messages) -> str:
+    """Render chat messages the way a llama3-style chat template does."""
+    return "".join(
+        f"<|start_header_id|>{message['role']}<|end_header_id|>\n\n"
+        f"{message['content']}<|eot_id|>"
+        for message in messages
+    )
+
+
+class FakeOllama:
+    """
+    Local stand-in for Ollama's chat endpoint with a simulated KV cache.
+
+    Like Ollama's runner, every slot keeps the KV cache of its last prompt
+    and only the tokens after the longest prefix shared with a slot are
+    evaluated, at `prefill_seconds` each, before the first chunk. A request
+    extending that slot's whole prompt takes it over; otherwise the shared
+    prefix is copied into the least recently used slot, so the longer cached
+    prompt survives.
+    """
+
+    def __init__(
+        self,
+        reply: str = "{}",
+        num_slots: int = 1,
+        prefill_seconds: float = 0.0,
+    ):
+        self.reply = reply
+        self.prefill_seconds = prefill_seconds
+        # The cached prompt of each slot, least recently used first
+        self.slots = [""] * num_slots
+        self.requests = 0
+        # (prompt tokens, evaluated tokens) of each request
+        self.log = []
+        self.prompt_tokens = 0
+        self.evaluated_tokens = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def evaluate(self, prompt: str) -> int:
+        """Take the best slot for a prompt and return the tokens to evaluate."""
+        with self._lock:
+            shared = [len(os.path.commonprefix([slot, prompt])) for slot in self.slots]
+            best = max(range(len(self.slots)), key=lambda i: (shared[i], -i))
+            cached = count_tokens(prompt[: shared[best]]) if shared[best] else 0
+            total = count_tokens(prompt)
+            self.slots.pop(best if shared[best] == len(self.slots[best]) else 0)
+            self.slots.append(prompt)
+            self.requests += 1
+            self.prompt_tokens += total
+            self.evaluated_tokens += total - cached
+            self.log.append((total, total - cached))
+            return total - cached
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                request = json.loads(self.rfile.read(length) or b"{}")
+                evaluated = fake.evaluate(render(request.get("messages", [])))
+                time.sleep(evaluated * fake.prefill_seconds)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.end_headers()
+                model = request.get("model", "llama3")
+                chunks = [
+                    {
+                        "model": model,
+                        "message": {"role": "assistant", "content": fake.reply},
+                        "done": False,
+                    },
+                    {
+                        "model": model,
+                        "message": {"role": "assistant", "content": ""},
+                        "done": True,
+                        "prompt_eval_count": evaluated,
+                        "prompt_eval_duration": int(
+                            evaluated * fake.prefill_seconds * 1e9
+                        ),
+                        "eval_count": count_tokens(fake.reply),
+                    },
+                ]
+                for chunk in chunks:
+                    self.wfile.write(json.dumps(chunk).encode("utf-8") + b"\n")
+                    self.wfile.flush()
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def chat_model(self) -> ChatOllamaModel:
+        """A chat model calling this endpoint."""
+        return ChatOllamaModel(
+            rate_limit=RateLimitConfig(enabled=False),
+            env=ChatEnv(OLLAMA_BASE_URL=self.base_url),
+        )
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
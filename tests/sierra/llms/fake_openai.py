@@ -0,0 +1,122 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sierra.llms import ChatOpenAIModel
+from sierra.llms.openai import ChatEnv
+from sierra.llms.ratelimit import RateLimitConfig
+
+
+class FakeOpenAI:
+    """Local stand-in for the OpenAI chat completions endpoint."""
+
+    def __init__(self, reply: str = "{}", delay: float = 0.0):
+        self.reply = reply
+        self.delay = delay
+        # (status, headers) of the next responses, before the successful ones
+        self.failures = []
+        self.requests = 0
+        self.statuses = []
+        # The JSON bodies of the requests
+        self.payloads = []
+        # Client ports, one per TCP connection
+        self.connections = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def throttle(self, times: int, retry_after_ms: int = 50) -> None:
+        self.failures.extend([(429, {"retry-after-ms": str(retry_after_ms)})] * times)
+
+    def respond(self, request: dict):
+        with self._lock:
+            failure = self.failures.pop(0) if self.failures else None
+        if failure is not None:
+            status, headers = failure
+            error = {"message": "Rate limit reached", "type": "requests"}
+            return status, headers, {"error": error}
+        message = {"role": "assistant", "content": self.reply}
+        tool_choice = request.get("tool_choice")
+        if isinstance(tool_choice, dict):
+            # A forced tool call replies with the arguments instead
+            function = {
+                "name": tool_choice["function"]["name"],
+                "arguments": self.reply,
+            }
+            message = {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [
+                    {"id": "call_fake", "type": "function", "function": function}
+                ],
+            }
+        completion = {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "gpt-4-turbo"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": message,
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+        }
+        return 200, {}, completion
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                request = json.loads(self.rfile.read(length) or b"{}")
+                with fake._lock:
+                    fake.requests += 1
+                    fake.payloads.append(request)
+                    fake.connections.add(self.client_address[1])
+                    fake.in_flight += 1
+                    fake.max_in_flight = max(fake.max_in_flight, fake.in_flight)
+                try:
+                    time.sleep(fake.delay)
+                    status, headers, body = fake.respond(request)
+                finally:
+                    with fake._lock:
+                        fake.in_flight -= 1
+                        fake.statuses.append(status)
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def chat_model(self, **rate_limit) -> ChatOpenAIModel:
+        """A chat model calling this endpoint through a rate limiter."""
+        return ChatOpenAIModel(
+            api_key="sk-test",
+            rate_limit=RateLimitConfig(**{"initial_backoff": 0.05, **rate_limit}),
+            env=ChatEnv(OPENAI_BASE_URL=self.base_url),
+        )
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,75 @@
+import json
+
+from sierra.llms.tokens import count_tokens
+from sierra.models import lawsuit, lawsuit_ollama, lawsuit_v2
+from sierra.models.base import SYSTEM_PROMPT
+
+LAWSUIT = {
+    "has_lawsuit": True,
+    "claimant": ["Sierra Club"],
+    "defendant": ["EPA"],
+    "case_summary": "Groups sued over a permit.",
+    "case_date": "April 8, 2024",
+    "other_details": None,
+}
+ARTICLES = [
+    f"Press release {i}: the Sierra Club sued agency {i} over permit {i}. " * 20
+    for i in range(4)
+]
+
+
+def test_static_prefix_is_byte_stable():
+    extractors = [
+        lawsuit.LawsuitExtractor(),
+        lawsuit_ollama.LawsuitExtractor(),
+    ]
+    prompts = [
+        extractor.prompt.format_messages(text=article)
+        for extractor in extractors
+        for article in ARTICLES[:2]
+    ]
+    # Everything but the last message is identical, and the text is only there
+    assert len({str(prompt[:-1]) for prompt in prompts}) == 1
+    assert all(prompt[-1].content in ARTICLES for prompt in prompts)
+
+    for extractor in extractors + [lawsuit_v2.LawsuitExtractor()]:
+        system = extractor.prompt.format_messages(text="")[0].content
+        batch_system = extractor.batch_prompt.format_messages(texts="")[0].content
+        assert system.startswith(SYSTEM_PROMPT)
+        assert batch_system.startswith(SYSTEM_PROMPT)
+
+
+def test_batch_prompt_gives_the_batch_schema_only():
+    ollama = lawsuit_ollama.LawsuitExtractor(structured_output=True)
+    for extractor in [lawsuit.LawsuitExtractor(), ollama]:
+        single = extractor.output_parser.get_format_instructions()
+        batch_system = extractor.system_prompt(batch=True)
+        assert "results" in batch_system
+        assert '"id"' in batch_system
+        assert single not in batch_system
+        assert extractor.batch_output_parser.get_format_instructions() in batch_system
+
+
+def test_consecutive_prompts_reuse_the_cached_prefix(fake_ollama):
+    fake_ollama.reply = json.dumps(LAWSUIT)
+    extractor = lawsuit_ollama.LawsuitExtractor(llm_model=fake_ollama.chat_model())
+    system_tokens = count_tokens(extractor.system_prompt())
+    for article in ARTICLES:
+        assert extractor.extract(article).has_lawsuit
+    # Only the first request evaluates the system prompt
+    assert fake_ollama.log[0][1] == fake_ollama.log[0][0]
+    for total, evaluated in fake_ollama.log[1:]:
+        assert total - evaluated >= system_tokens
+
+
+def test_batch_and_single_prompts_share_the_prefix(fake_ollama):
+    extractor = lawsuit_ollama.LawsuitExtractor(llm_model=fake_ollama.chat_model())
+    fake_ollama.reply = json.dumps(LAWSUIT)
+    extractor.extract(ARTICLES[0])
+    fake_ollama.reply = json.dumps(
+        {"results": [{**LAWSUIT, "id": "1"}, {**LAWSUIT, "id": "2"}]}
+    )
+    results = extractor.extract_batch({"a": ARTICLES[1], "b": ARTICLES[2]})
+    assert set(results) == {"a", "b"}
+    total, evaluated = fake_ollama.log[1]
+    assert total - evaluated >= count_tokens(SYSTEM_PROMPT)
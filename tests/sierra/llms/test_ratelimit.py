@@ -0,0 +1,188 @@
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+
+from sierra.fetcher.http import TokenBucket
+from sierra.llms.ratelimit import (
+    RateLimitConfig,
+    RateLimiter,
+    is_transient,
+    retry_after,
+    status_code,
+)
+from sierra.models.lawsuit import LawsuitExtractor
+from sierra.pipes.extract_lawsuits import extract_lawsuit_details
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def http_error(status: int, headers=None) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "http://llm.test/v1/chat/completions")
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    return httpx.HTTPStatusError("failed", request=request, response=response)
+
+
+def test_token_bucket_paces_requests_and_tokens():
+    clock = FakeClock()
+    bucket = TokenBucket(10, burst=5, clock=clock)
+    assert [bucket.reserve(1) for _ in range(5)] == [0, 0, 0, 0, 0]
+    assert bucket.reserve(1) == pytest.approx(0.1)
+    # A request larger than the bucket goes into debt instead of blocking
+    assert bucket.reserve(20) == pytest.approx(2.1)
+    clock.now = 2.1
+    bucket.refund(10)
+    assert bucket.reserve(1) == 0
+
+
+def test_errors_are_classified():
+    assert status_code(http_error(429)) == 429
+    ollama_error = ValueError("Ollama call failed with status code 503. Details: busy")
+    assert status_code(ollama_error) == 503
+    assert is_transient(ollama_error)
+    assert is_transient(httpx.ConnectError("refused"))
+    assert not is_transient(http_error(400))
+    assert not is_transient(ValueError("Failed to parse LawsuitDetails"))
+
+    assert retry_after(http_error(429, {"retry-after-ms": "250"})) == 0.25
+    assert retry_after(http_error(429, {"retry-after": "2"})) == 2.0
+    assert retry_after(http_error(429, {"retry-after": "soon"})) is None
+    assert retry_after(http_error(429)) is None
+
+
+def test_concurrency_is_additive_increase_multiplicative_decrease():
+    clock = FakeClock()
+    limiter = RateLimiter(
+        RateLimitConfig(initial_concurrency=8, max_concurrency=10), clock=clock
+    )
+    # A burst of throttled calls started together halves the limit once
+    started = [limiter._acquire() for _ in range(4)]
+    clock.now = 1.0
+    for start in started:
+        limiter._release(start, throttled=True, succeeded=False)
+    assert limiter.concurrency == 4
+
+    # One more slot for every `concurrency` successful calls
+    for _ in range(5):
+        limiter._release(limiter._acquire(), throttled=False, succeeded=True)
+    assert limiter.concurrency == 5
+    for _ in range(100):
+        limiter._release(limiter._acquire(), throttled=False, succeeded=True)
+    assert limiter.concurrency == 10
+
+
+def test_retried_calls_refund_their_tokens():
+    clock = FakeClock()
+    limiter = RateLimiter(
+        RateLimitConfig(tokens_per_minute=6000, initial_backoff=0.001),
+        clock=clock,
+    )
+    errors = [http_error(429), http_error(429), http_error(503)]
+
+    def fn():
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    assert limiter.call(fn, tokens=40) == "ok"
+    # Only the call that went through holds its tokens
+    assert limiter._tokens._tokens == pytest.approx(100 - 40)
+
+    # A throttled call that is given up on does not keep them either
+    limiter.config.max_retries = 0
+    errors.append(http_error(429))
+    with pytest.raises(httpx.HTTPStatusError):
+        limiter.call(fn, tokens=40)
+    assert limiter._tokens._tokens == pytest.approx(100 - 40)
+
+
+def test_retries_honor_retry_after(fake_openai):
+    fake_openai.reply = "hello"
+    fake_openai.throttle(2, retry_after_ms=200)
+    start = time.monotonic()
+    reply = fake_openai.chat_model().engine.invoke("hi")
+    assert reply.content == "hello"
+    assert fake_openai.statuses == [429, 429, 200]
+    assert time.monotonic() - start >= 0.4
+
+
+def test_non_transient_errors_are_not_retried(fake_openai):
+    fake_openai.failures = [(400, {})]
+    with pytest.raises(Exception):
+        fake_openai.chat_model().engine.invoke("hi")
+    assert fake_openai.requests == 1
+
+
+def test_requests_per_minute(fake_openai):
+    engine = fake_openai.chat_model(requests_per_minute=600, burst_seconds=0.1).engine
+    start = time.monotonic()
+
+    async def _run():
+        await asyncio.gather(*(engine.ainvoke("hi") for _ in range(5)))
+
+    asyncio.run(_run())
+    assert time.monotonic() - start >= 0.35
+    assert fake_openai.requests == 5
+
+
+@pytest.mark.parametrize("max_concurrency", [1, 8])
+def test_no_items_are_lost_under_throttling(fake_openai, max_concurrency):
+    fake_openai.reply = (
+        '{"has_lawsuit": true, "claimant": ["Sierra Club"], "defendant": ["EPA"],'
+        ' "case_summary": "", "case_date": "", "other_details": null}'
+    )
+    fake_openai.delay = 0.02
+    fake_openai.throttle(5, retry_after_ms=20)
+    extractor = LawsuitExtractor(llm_model=fake_openai.chat_model())
+    data = [{"uuid": str(i), "content": f"lawsuit {i}"} for i in range(12)]
+
+    results = extract_lawsuit_details(data, extractor, max_concurrency=max_concurrency)
+    assert [result["uuid"] for result in results] == [item["uuid"] for item in data]
+    assert fake_openai.statuses.count(429) == 5
+    assert fake_openai.max_in_flight <= 4
+    assert extractor.engine.limiter.in_flight == 0
+
+
+def test_async_callers_wait_for_a_released_slot():
+    limiter = RateLimiter(RateLimitConfig(initial_concurrency=1, max_concurrency=1))
+    started = limiter._acquire()
+
+    async def _reply():
+        return "hello"
+
+    async def _run():
+        call = asyncio.ensure_future(limiter.acall(_reply))
+        await asyncio.sleep(0.05)
+        # The caller waits on an event instead of polling
+        assert not call.done()
+        assert len(limiter._async_waiters) == 1
+        threading.Timer(0.05, limiter._release, (started, False, True)).start()
+        return await asyncio.wait_for(call, timeout=1)
+
+    assert asyncio.run(_run()) == "hello"
+    assert limiter.in_flight == 0
+    assert not limiter._async_waiters
+
+
+def test_limiters_are_shared_per_endpoint_and_key(fake_openai, caplog):
+    engine = fake_openai.chat_model().engine
+    assert fake_openai.chat_model().engine.limiter is engine.limiter
+
+    other_key = fake_openai.chat_model()
+    other_key.api_key = "sk-other"
+    assert other_key.engine.limiter is not engine.limiter
+    other_url = fake_openai.chat_model()
+    other_url.env.OPENAI_BASE_URL = f"{fake_openai.base_url}/v2"
+    assert other_url.engine.limiter is not engine.limiter
+
+    # The first settings of a quota win, with a warning
+    assert fake_openai.chat_model(max_retries=1).engine.limiter is engine.limiter
+    assert "already exists" in caplog.text
@@ -0,0 +1,112 @@
+import asyncio
+import importlib
+import threading
+
+from sierra.llms import ChatOllamaModel, ChatOpenAIModel
+from sierra.llms.registry import (
+    _engines,
+    chat_ollama,
+    chat_openai,
+    close_all,
+    http_clients,
+)
+from sierra.models import lawsuit, ner
+
+REPLY = (
+    '{"has_lawsuit": true, "claimant": ["Sierra Club"], "defendant": ["EPA"],'
+    ' "case_summary": "", "case_date": "", "other_details": null}'
+)
+
+
+def test_engines_are_shared_by_settings(fake_openai):
+    first = chat_openai("gpt-4-turbo", base_url=fake_openai.base_url, api_key="sk-a")
+    assert (
+        chat_openai("gpt-4-turbo", base_url=fake_openai.base_url, api_key="sk-a")
+        is first
+    )
+    other_key = chat_openai(
+        "gpt-4-turbo", base_url=fake_openai.base_url, api_key="sk-b"
+    )
+    warmer = chat_openai(
+        "gpt-4-turbo", temperature=0.7, base_url=fake_openai.base_url, api_key="sk-a"
+    )
+    assert other_key is not first and warmer is not first
+    # Different engines of a server still share its connection pool
+    assert (
+        warmer.http_client is first.http_client is http_clients(fake_openai.base_url)[0]
+    )
+    assert not any("sk-a" in map(str, key) for key in _engines)
+
+    ollama = chat_ollama("llama3", base_url="http://ollama.test:11434")
+    assert chat_ollama("llama3", base_url="http://ollama.test:11434") is ollama
+    assert ChatOllamaModel().engine.bound is chat_ollama("llama3", num_ctx=8192)
+
+
+def test_extractors_reuse_warm_connections(fake_openai):
+    fake_openai.reply = REPLY
+    extractors = [
+        lawsuit.LawsuitExtractor(llm_model=fake_openai.chat_model()),
+        lawsuit.LawsuitExtractor(llm_model=fake_openai.chat_model()),
+    ]
+    assert extractors[0].engine.bound is extractors[1].engine.bound
+    for _ in range(3):
+        for extractor in extractors:
+            assert extractor.extract("A lawsuit against the EPA.").has_lawsuit
+    assert fake_openai.requests == 6
+    assert len(fake_openai.connections) == 1
+
+
+def test_async_pool_survives_new_event_loops(fake_openai):
+    fake_openai.reply = REPLY
+    extractor = lawsuit.LawsuitExtractor(llm_model=fake_openai.chat_model())
+    # The pipeline runs every call on a private loop
+    for _ in range(3):
+        details = asyncio.run(extractor.aextract("A lawsuit against the EPA."))
+        assert details.defendant == ["EPA"]
+    assert fake_openai.requests == 3
+
+
+def test_close_all_closes_the_async_pools(fake_openai):
+    _, async_client = http_clients(fake_openai.base_url)
+    transport = async_client._transport
+
+    async def _request():
+        await async_client.post(f"{fake_openai.base_url}/chat/completions", json={})
+
+    def _pools():
+        return {loop: t._pool.connections for loop, t in transport._transports.items()}
+
+    # A closed loop, an idle loop and a loop running on another thread
+    asyncio.run(_request())
+    idle = asyncio.new_event_loop()
+    idle.run_until_complete(_request())
+    running = asyncio.new_event_loop()
+    thread = threading.Thread(target=running.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(_request(), running).result()
+    pools = _pools()
+    # The pool of the closed loop was dropped when the next loop got one
+    assert list(pools) == [idle, running]
+    assert [len(pool) for pool in pools.values()] == [1, 1]
+
+    close_all()
+    assert not transport._transports
+    assert pools[idle][0].is_closed()
+    running.call_soon_threadsafe(running.stop)
+    thread.join()
+    assert pools[running][0].is_closed()
+    idle.close()
+    running.close()
+
+
+def test_models_share_the_registry(fake_openai):
+    chat_model = fake_openai.chat_model()
+    engine = ner.EventEntityExtractor(llm_model=chat_model).engine
+    assert engine.bound is fake_openai.chat_model().engine.bound
+    assert isinstance(chat_model, ChatOpenAIModel)
+
+
+def test_extraction_chain_builds_no_engine_at_import(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    extraction = importlib.reload(importlib.import_module("sierra.chains.extraction"))
+    assert "llm" not in vars(extraction)
@@ -0,0 +1,48 @@
+import json
+
+from sierra.models.lawsuit_v2 import LawsuitExtractor
+from sierra.models.multitask import MultiTaskExtractor
+
+LAWSUIT = {
+    "has_lawsuit": True,
+    "claimant": ["Sierra Club"],
+    "defendant": ["EPA"],
+    "case_summary": "Groups sued over a permit.",
+    "case_date": "April 8, 2024",
+}
+
+
+def test_schema_is_sent_as_a_forced_tool(fake_openai):
+    fake_openai.reply = json.dumps(LAWSUIT)
+    extractor = LawsuitExtractor(llm_model=fake_openai.chat_model())
+    details = extractor.extract("The Sierra Club sued the EPA.")
+    assert details.defendant == ["EPA"]
+    assert details.other_details is None
+
+    (request,) = fake_openai.payloads
+    (tool,) = request["tools"]
+    assert tool["function"]["name"] == "LawsuitDetails"
+    assert request["tool_choice"]["function"]["name"] == "LawsuitDetails"
+    assert "JSON" not in request["messages"][0]["content"]
+
+
+def test_rate_limiter_sees_native_calls(fake_openai):
+    fake_openai.reply = json.dumps(LAWSUIT)
+    fake_openai.throttle(2)
+    extractor = LawsuitExtractor(llm_model=fake_openai.chat_model())
+    assert extractor.extract("The Sierra Club sued the EPA.").has_lawsuit
+    assert fake_openai.statuses == [429, 429, 200]
+
+
+def test_multitask_extractor_uses_native_output(fake_openai):
+    fake_openai.reply = json.dumps(
+        {"lawsuit": LAWSUIT, "events_entities": {"events": [], "entities": ["EPA"]}}
+    )
+    extractor = MultiTaskExtractor(
+        llm_model=fake_openai.chat_model(), structured_output=True
+    )
+    result = extractor.extract("The Sierra Club sued the EPA.")
+    assert result.lawsuit.defendant == ["EPA"]
+    assert result.events_entities.entities == ["EPA"]
+    (request,) = fake_openai.payloads
+    assert request["tool_choice"]["function"]["name"] == "MultiTaskResponse"
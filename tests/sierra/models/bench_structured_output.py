@@ -0,0 +1,110 @@
+"""
+Prompt tokens and parse failures of the prompt and native output modes.
+
+The prompt mode puts `PydanticOutputParser` format instructions in every
+prompt. The native mode sends the schema as a tool definition (OpenAI,
+counted here as its JSON) or a one-line shape hint (Ollama JSON mode).
+
+Failures are measured on synthetic replies with the defects language models
+commonly produce; the prompt mode drops such items, the native mode repairs
+them locally or with one short repair call.
+
+Usage:
+    python tests/sierra/models/bench_structured_output.py [num_replies]
+"""
+
+import json
+import random
+import sys
+
+from langchain_core.exceptions import OutputParserException
+
+from sierra.llms import ChatOllamaModel
+from sierra.llms.tokens import count_tokens
+from sierra.models import lawsuit, lawsuit_ollama, lawsuit_v2
+from sierra.models.base import LawsuitDetails
+from sierra.models.structured import StructuredOutputParser
+
+# A press release of typical length
+ARTICLE = "\n\n".join(
+    " ".join(
+        f"Paragraph {p}: the groups sued the agency over permit {s} in federal court."
+        for s in range(8)
+    )
+    for p in range(8)
+)
+LAWSUIT = {
+    "has_lawsuit": True,
+    "claimant": ["Sierra Club", "Earthjustice"],
+    "defendant": ["U.S. Environmental Protection Agency"],
+    "case_summary": "Groups sued over a permit for a coal plant.",
+    "case_date": "April 8, 2024",
+    "other_details": None,
+}
+DEFECTS = {
+    "valid": lambda reply: reply,
+    "fenced": lambda reply: f"```json\n{reply}\n```",
+    "prose": lambda reply: f"Here are the details:\n{reply}\nLet me know!",
+    "trailing comma": lambda reply: reply.replace("]", ",]").replace(
+        " null}", " null,}"
+    ),
+    "python literals": lambda reply: str(json.loads(reply)),
+    "truncated": lambda reply: reply[: -len(' "other_details": null}')],
+    "no json": lambda reply: "The text does not describe a lawsuit.",
+}
+
+
+def prompt_tokens():
+    prompt_mode = lawsuit.LawsuitExtractor()
+    native = lawsuit_v2.LawsuitExtractor()
+    tool = native.llm_model.structured_output(LawsuitDetails)["tools"]
+    ollama = lawsuit_ollama.LawsuitExtractor(
+        llm_model=ChatOllamaModel(), structured_output=True
+    )
+    rows = {
+        "prompt mode": count_tokens(prompt_mode.prompt.format(text=ARTICLE)),
+        "native, OpenAI tool": count_tokens(native.prompt.format(text=ARTICLE))
+        + count_tokens(json.dumps(tool)),
+        "native, Ollama JSON": count_tokens(ollama.prompt.format(text=ARTICLE)),
+    }
+    baseline = rows["prompt mode"]
+    print(f"Prompt tokens for a {count_tokens(ARTICLE)}-token article:")
+    for name, tokens in rows.items():
+        print(f"  {name:<20} {tokens:>6} ({tokens / baseline:.0%})")
+
+
+def failures(num_replies: int, seed: int = 0):
+    rng = random.Random(seed)
+    # Most replies are valid; the rest have one defect each
+    weights = [0.85] + [0.15 / (len(DEFECTS) - 1)] * (len(DEFECTS) - 1)
+    prompt_parser = lawsuit.LawsuitExtractor().output_parser
+    native_parser = StructuredOutputParser(pydantic_object=LawsuitDetails)
+    reply = json.dumps(LAWSUIT)
+    dropped = repaired = repair_calls = 0
+    for _ in range(num_replies):
+        defect = rng.choices(list(DEFECTS), weights)[0]
+        text = DEFECTS[defect](reply)
+        try:
+            prompt_parser.parse(text)
+        except OutputParserException:
+            dropped += 1
+        try:
+            native_parser.parse(text)
+            repaired += defect != "valid"
+        except OutputParserException:
+            repair_calls += 1
+    print(f"Parse failures over {num_replies} replies:")
+    print(f"  prompt mode          {dropped / num_replies:6.1%} dropped")
+    print(
+        f"  native               {repaired / num_replies:6.1%} repaired locally, "
+        f"{repair_calls / num_replies:.1%} sent to a repair call"
+    )
+
+
+def main(num_replies: int = 10_000):
+    prompt_tokens()
+    failures(num_replies)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
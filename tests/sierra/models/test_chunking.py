@@ -0,0 +1,110 @@
+import asyncio
+import json
+
+import pytest
+from langchain_community.chat_models.fake import FakeListChatModel
+
+from sierra.llms.tokens import count_tokens
+from sierra.models.base import LawsuitDetails
+from sierra.models.chunking import merge_details, split_text
+from sierra.models.lawsuit import LawsuitExtractor
+
+PARAGRAPHS = [
+    " ".join(f"Paragraph {p} sentence {s} mentions the lawsuit." for s in range(8))
+    for p in range(6)
+]
+TEXT = "\n\n".join(PARAGRAPHS)
+
+
+def details(defendant, has_lawsuit=True, **kwargs):
+    return LawsuitDetails(
+        has_lawsuit=has_lawsuit,
+        claimant=kwargs.get("claimant", ["Sierra Club"]),
+        defendant=defendant,
+        case_summary=kwargs.get("case_summary", ""),
+        case_date=kwargs.get("case_date", ""),
+        other_details=kwargs.get("other_details"),
+    )
+
+
+def test_short_text_is_one_chunk():
+    assert split_text(TEXT, max_tokens=10_000) == [TEXT]
+    assert split_text(TEXT, max_tokens=0) == [TEXT]
+
+
+@pytest.mark.parametrize("max_tokens", [40, 100, 150])
+def test_chunks_fit_the_budget_and_overlap(max_tokens):
+    chunks = split_text(TEXT, max_tokens=max_tokens, overlap_tokens=20)
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk) <= max_tokens for chunk in chunks)
+    # Every sentence is kept and consecutive chunks share their boundary
+    for p in range(6):
+        for s in range(8):
+            sentence = f"Paragraph {p} sentence {s} "
+            assert any(sentence in chunk for chunk in chunks)
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk.split(".")[0] in previous
+
+
+def test_merge_details():
+    merged = merge_details(
+        [
+            details(["U.S. EPA"], case_summary="First.", other_details="a"),
+            details([], has_lawsuit=False, claimant=["Nobody"]),
+            details(
+                ["US EPA", "Duke Energy, Inc."],
+                claimant=["Sierra Club", "Earthjustice"],
+                case_date="2024",
+                other_details="b",
+            ),
+        ]
+    )
+    assert merged == details(
+        ["U.S. EPA", "Duke Energy, Inc."],
+        claimant=["Sierra Club", "Earthjustice"],
+        case_summary="First.",
+        case_date="2024",
+        other_details="a\nb",
+    )
+    no_lawsuit = details([], has_lawsuit=False)
+    assert merge_details([no_lawsuit, no_lawsuit]) == no_lawsuit
+
+
+def reply(defendant):
+    return json.dumps(
+        {
+            "has_lawsuit": True,
+            "claimant": ["Sierra Club"],
+            "defendant": [defendant],
+            "case_summary": "",
+            "case_date": "",
+            "other_details": None,
+        }
+    )
+
+
+@pytest.fixture
+def extractor(monkeypatch):
+    extractor = LawsuitExtractor()
+    responses = [reply("EPA"), reply("TVA")] + [reply("epa")] * 10
+    extractor._engine_ = FakeListChatModel(responses=responses)
+    config = extractor.llm_model.model_config
+    monkeypatch.setitem(config, "max_input_tokens", 150)
+    monkeypatch.setitem(config, "max_chunk_concurrency", 1)
+    return extractor
+
+
+def test_long_text_is_extracted_in_chunks(extractor):
+    num_chunks = len(extractor.split_input(TEXT))
+    assert num_chunks > 2
+    assert extractor.extract(TEXT).defendant == ["EPA", "TVA"]
+    assert extractor.engine.i == num_chunks
+
+    extractor.engine.i = 0
+    assert extractor.extract("A short lawsuit.").defendant == ["EPA"]
+    assert extractor.engine.i == 1
+
+
+def test_long_text_is_extracted_in_chunks_async(extractor):
+    result = asyncio.run(extractor.aextract(TEXT))
+    assert sorted(result.defendant) == ["EPA", "TVA"]
@@ -0,0 +1,122 @@
+import json
+
+import pytest
+from langchain_community.chat_models.fake import FakeListChatModel
+
+from sierra.llms import ChatOpenAIModel
+from sierra.llms.tokens import count_tokens
+from sierra.models.base import SYSTEM_PROMPT
+from sierra.models.lawsuit import LawsuitExtractor
+from sierra.models.multitask import MultiTaskExtractor
+from sierra.models.ner import EventEntityExtractor
+from sierra.pipes.cache import ExtractionCache
+
+LAWSUIT = {
+    "has_lawsuit": True,
+    "claimant": ["Sierra Club"],
+    "defendant": ["EPA"],
+    "case_summary": "Groups sued over a permit.",
+    "case_date": "April 8, 2024",
+    "other_details": None,
+}
+# A press release of typical length
+ARTICLE = "\n\n".join(
+    " ".join(
+        f"Paragraph {p}: the groups sued the agency over permit {s} in federal court."
+        for s in range(8)
+    )
+    for p in range(8)
+)
+
+
+def reply(lawsuit=LAWSUIT, events=("lawsuit filed",), entities=("EPA",)) -> str:
+    response = {}
+    if lawsuit is not None:
+        response["lawsuit"] = lawsuit
+    if events is not None:
+        response["events_entities"] = {
+            "events": list(events),
+            "entities": list(entities),
+        }
+    return json.dumps(response)
+
+
+def fake_extractor(responses, **kwargs) -> MultiTaskExtractor:
+    extractor = MultiTaskExtractor(**kwargs)
+    extractor._engine_ = FakeListChatModel(responses=responses + ["{}"] * 10)
+    return extractor
+
+
+def test_one_call_fills_both_models():
+    extractor = fake_extractor([reply()])
+    result = extractor.extract("The Sierra Club sued the EPA.")
+    assert extractor.engine.i == 1
+    assert result.lawsuit.defendant == ["EPA"]
+    assert result.events_entities.entities == ["EPA"]
+
+
+def test_tasks_can_be_turned_off():
+    extractor = fake_extractor([reply(events=None)], events_entities=False)
+    assert "EventEntity" not in extractor.prompt_template
+    result = extractor.extract("The Sierra Club sued the EPA.")
+    assert result.lawsuit.has_lawsuit
+    assert result.events_entities is None
+
+    extractor = fake_extractor([reply(lawsuit=None)], lawsuit=False)
+    assert extractor.extract("The EPA issued a permit.").lawsuit is None
+
+    with pytest.raises(ValueError):
+        MultiTaskExtractor(lawsuit=False, events_entities=False).tasks
+
+
+def test_chunk_results_are_merged(monkeypatch):
+    responses = [
+        reply(entities=["EPA", "Sierra Club"]),
+        reply(lawsuit={**LAWSUIT, "defendant": ["TVA"]}, entities=["sierra club"]),
+    ]
+    extractor = fake_extractor(responses * 10)
+    config = extractor.llm_model.model_config
+    monkeypatch.setitem(config, "max_input_tokens", 600)
+    monkeypatch.setitem(config, "max_chunk_concurrency", 1)
+    assert len(extractor.split_input(ARTICLE)) > 1
+    result = extractor.extract(ARTICLE)
+    assert result.lawsuit.defendant == ["EPA", "TVA"]
+    assert result.events_entities.entities == ["EPA", "Sierra Club"]
+
+
+def test_the_article_is_sent_once():
+    separate = count_tokens(
+        LawsuitExtractor().prompt.format(text=ARTICLE)
+    ) + count_tokens(
+        EventEntityExtractor(
+            llm_model=ChatOpenAIModel(api_key="sk-test")
+        ).prompt.format(text=ARTICLE)
+    )
+    combined = count_tokens(MultiTaskExtractor().prompt.format(text=ARTICLE))
+    # The article, the bulk of both prompts, is sent once
+    assert combined < separate - count_tokens(ARTICLE)
+
+
+def test_shares_the_lawsuit_extractors_machinery(tmp_path):
+    extractor = fake_extractor([reply()])
+    assert extractor.system_prompt().startswith(SYSTEM_PROMPT)
+    assert extractor.llm_params["model"] == LawsuitExtractor().llm_params["model"]
+
+    cache = ExtractionCache(cache_file=str(tmp_path / "cache.sqlite"))
+    result = extractor.extract("The Sierra Club sued the EPA.")
+    cache.set("The Sierra Club sued the EPA.", extractor, result)
+    assert cache.get("The Sierra Club sued the EPA.", extractor) == result
+    # Other tasks, another prompt: another key
+    assert (
+        cache.get("The Sierra Club sued the EPA.", MultiTaskExtractor(lawsuit=False))
+        is None
+    )
+    cache.close()
+
+    native = MultiTaskExtractor(structured_output=True)
+    assert "JSON" not in native.system_prompt()
+    tool = native.llm_model.structured_output(native.output_schema)["tools"][0]
+    assert set(tool["function"]["parameters"]["properties"]) == {
+        "lawsuit",
+        "events_entities",
+    }
@@ -0,0 +1,130 @@
+import asyncio
+import json
+
+import pytest
+from langchain_community.chat_models.fake import FakeListChatModel
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import get_buffer_string
+
+from sierra.llms import ChatOllamaModel
+from sierra.llms.tokens import count_tokens
+from sierra.models import lawsuit, lawsuit_ollama, lawsuit_v2
+from sierra.models.base import LawsuitDetails
+from sierra.models.structured import (
+    StructuredOutputParser,
+    repair_json,
+    schema_hint,
+)
+
+LAWSUIT = {
+    "has_lawsuit": True,
+    "claimant": ["Sierra Club"],
+    "defendant": ["EPA"],
+    "case_summary": "Groups sued over a permit.",
+    "case_date": "April 8, 2024",
+    "other_details": None,
+}
+TEXT = "The Sierra Club sued the EPA over a permit on April 8, 2024."
+
+
+def fake_extractor(responses, module=lawsuit_v2, **kwargs):
+    extractor = module.LawsuitExtractor(**kwargs)
+    extractor._engine_ = FakeListChatModel(
+        responses=responses + [json.dumps(LAWSUIT)] * 10
+    )
+    return extractor
+
+
+@pytest.mark.parametrize(
+    "reply",
+    [
+        "```json\n" + json.dumps(LAWSUIT, indent=2) + "\n```",
+        "Here are the details: " + json.dumps(LAWSUIT) + " Let me know!",
+        json.dumps(LAWSUIT).replace('"claimant"', '"claimant" ').replace("]", ",]"),
+        str(LAWSUIT),
+        json.dumps(LAWSUIT)[:-30],
+    ],
+    ids=["fenced", "prose", "trailing-comma", "python", "truncated"],
+)
+def test_malformed_replies_are_repaired_locally(reply):
+    details = StructuredOutputParser(pydantic_object=LawsuitDetails).parse(reply)
+    assert details.claimant == ["Sierra Club"]
+    assert details.defendant == ["EPA"]
+
+
+def test_valid_json_is_unchanged():
+    text = json.dumps({"a": 'it\'s "quoted"\n', "b": [1, 2.5, None, True]})
+    assert json.loads(repair_json(text)) == json.loads(text)
+
+
+def test_schema_hint_is_compact():
+    hint = schema_hint(LawsuitDetails)
+    assert hint.startswith('{"has_lawsuit": bool, "claimant": [str]')
+    assert '"other_details": str|null' in hint
+    # The format instructions of the prompt mode are several times longer
+    prompt_mode = lawsuit.LawsuitExtractor().output_parser
+    assert count_tokens(hint) * 3 < count_tokens(prompt_mode.get_format_instructions())
+
+
+def test_native_prompts_drop_the_format_instructions():
+    prompt_mode = lawsuit.LawsuitExtractor().prompt_template
+    native = lawsuit_v2.LawsuitExtractor().prompt_template
+    assert "JSON schema" in prompt_mode
+    assert "JSON" not in native
+    assert count_tokens(native) < count_tokens(prompt_mode) / 4
+
+    # JSON mode constrains the syntax only, so Ollama gets the shape hint
+    ollama = lawsuit_ollama.LawsuitExtractor(
+        llm_model=ChatOllamaModel(), structured_output=True
+    )
+    assert schema_hint(LawsuitDetails) in ollama.prompt_template
+    assert ollama.llm_model.structured_output(LawsuitDetails) == {"format": "json"}
+
+
+class PromptRecorder(BaseCallbackHandler):
+    def __init__(self):
+        self.prompts = []
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.prompts.append(get_buffer_string(messages[0]))
+
+
+def test_unparsable_reply_gets_one_repair_call():
+    extractor = fake_extractor(["I could not find a lawsuit.", json.dumps(LAWSUIT)])
+    recorder = PromptRecorder()
+    extractor.engine.callbacks = [recorder]
+    details = extractor.extract(TEXT)
+    assert details.defendant == ["EPA"]
+    assert extractor.engine.i == 2
+    # The repair call sends the reply and the error, not the text
+    assert TEXT in recorder.prompts[0]
+    assert "I could not find a lawsuit." in recorder.prompts[1]
+    assert TEXT not in recorder.prompts[1]
+
+
+def test_locally_repaired_reply_costs_no_extra_call():
+    extractor = fake_extractor([str(LAWSUIT)])
+    assert extractor.extract(TEXT).claimant == ["Sierra Club"]
+    assert extractor.engine.i == 1
+
+
+def test_async_repair():
+    extractor = fake_extractor(["no json here", json.dumps(LAWSUIT)])
+    details = asyncio.run(extractor.aextract(TEXT))
+    assert details.has_lawsuit
+    assert extractor.engine.i == 2
+
+
+def test_batches_use_native_output():
+    reply = {
+        "results": [
+            {**LAWSUIT, "id": "1", "defendant": ["EPA"]},
+            {**LAWSUIT, "id": "2", "defendant": ["TVA"]},
+        ]
+    }
+    extractor = fake_extractor([str(reply)])
+    assert "JSON schema" not in extractor.batch_prompt.format(texts="")
+    results = extractor.extract_batch({"a": TEXT, "b": TEXT.replace("EPA", "TVA")})
+    assert results["a"].defendant == ["EPA"]
+    assert results["b"].defendant == ["TVA"]
+    assert extractor.engine.i == 1
@@ -0,0 +1,51 @@
+"""
+Scaling of the near-duplicate detector on synthetic press releases.
+
+A fifth of the documents are edited copies of earlier ones. The time per
+document should stay flat as the corpus grows.
+
+Usage:
+    python tests/sierra/pipes/bench_dedup.py [max_docs]
+"""
+
+import random
+import sys
+import time
+
+from sierra.pipes.dedup import NearDuplicateDetector
+
+
+def make_corpus(num_docs: int, num_words: int = 400, seed: int = 0):
+    rng = random.Random(seed)
+    vocab = [f"w{i}" for i in range(20_000)]
+    docs = []
+    for i in range(num_docs):
+        if docs and rng.random() < 0.2:
+            words = rng.choice(docs).split()
+            for _ in range(5):
+                words[rng.randrange(len(words))] = rng.choice(vocab)
+        else:
+            words = rng.choices(vocab, k=num_words)
+        docs.append(" ".join(words))
+    return docs
+
+
+def main(max_docs: int = 20_000):
+    num_docs = max(max_docs // 4, 1)
+    while num_docs <= max_docs:
+        docs = make_corpus(num_docs)
+        detector = NearDuplicateDetector()
+        start = time.perf_counter()
+        for i, doc in enumerate(docs):
+            detector.add(str(i), doc)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{num_docs:>7} docs: {elapsed:7.2f}s, "
+            f"{elapsed / num_docs * 1e3:.3f} ms/doc, "
+            f"{sum(len(keys) - 1 for keys in detector.clusters().values())} duplicates"
+        )
+        num_docs *= 2
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
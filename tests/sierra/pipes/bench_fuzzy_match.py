@@ -0,0 +1,85 @@
+"""
+Speed and agreement of the fuzzy matching backends on synthetic names.
+
+Agreement is the share of projects for which a backend picks the same
+defendant (or no defendant) as the exhaustive `token_sort_ratio` match.
+
+Usage:
+    python tests/sierra/pipes/bench_fuzzy_match.py [num_names] [threshold]
+"""
+
+import random
+import string
+import sys
+import time
+import warnings
+
+from sierra.pipes.fuzzy_match import match_projects_defendants
+
+SUFFIXES = ["inc", "llc", "corp", "co", "company", "energy", "power", "holdings"]
+
+
+def make_names(num_names: int, seed: int = 0):
+    rng = random.Random(seed)
+    vocab = [
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9)))
+        for _ in range(max(num_names // 2, 100))
+    ]
+
+    def name():
+        words = rng.sample(vocab, rng.randint(1, 3))
+        return " ".join(words + [rng.choice(SUFFIXES)])
+
+    def perturb(text: str):
+        for _ in range(rng.randint(0, 3)):
+            i = rng.randrange(len(text))
+            text = text[:i] + rng.choice(string.ascii_lowercase) + text[i + 1 :]
+        return text.upper() if rng.random() < 0.2 else text
+
+    defendants = [name() for _ in range(num_names)]
+    projects = [
+        perturb(rng.choice(defendants)) if rng.random() < 0.3 else name()
+        for _ in range(num_names)
+    ]
+    return projects, defendants
+
+
+def agreement(matches, reference):
+    return sum(m[1] == r[1] for m, r in zip(matches, reference)) / len(reference)
+
+
+def main(num_names: int = 5000, threshold: int = 80):
+    warnings.simplefilter("ignore")
+    projects, defendants = make_names(num_names)
+    print(f"{num_names} projects x {num_names} defendants, threshold {threshold}")
+
+    timings = {}
+    results = {}
+    for method in ["cdist", "blocking", "tfidf"]:
+        start = time.perf_counter()
+        results[method] = match_projects_defendants(
+            projects, defendants, threshold, method=method
+        )
+        timings[method] = time.perf_counter() - start
+
+    # The original per-project loop is too slow for the full set; time a sample
+    sample = projects[:100]
+    start = time.perf_counter()
+    extractone = match_projects_defendants(
+        sample, defendants, threshold, method="extractone"
+    )
+    timings["extractone"] = (time.perf_counter() - start) * len(projects) / 100
+    assert extractone == results["cdist"][:100]
+
+    reference = results["cdist"]
+    print(f"{'method':<12} {'seconds':>10} {'agreement':>10}")
+    print(f"{'extractone':<12} {timings['extractone']:>10.2f} {'(est.)':>10}")
+    for method in ["cdist", "blocking", "tfidf"]:
+        print(
+            f"{method:<12} {timings[method]:>10.2f} "
+            f"{agreement(results[method], reference):>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
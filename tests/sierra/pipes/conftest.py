@@ -0,0 +1,7 @@
+import pytest
+from fake_llm import make_fake_extractor
+
+
+@pytest.fixture
+def fake_extractor():
+    return make_fake_extractor()
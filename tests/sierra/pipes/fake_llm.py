@@ -0,0 +1,56 @@
+import json
+from typing import List
+
+from langchain_community.chat_models.fake import FakeListChatModel
+
+from sierra.models import lawsuit
+
+LAWSUIT_REPLY = json.dumps(
+    {
+        "has_lawsuit": True,
+        "claimant": ["Sierra Club"],
+        "defendant": ["U.S. Fish and Wildlife Service"],
+        "case_summary": "Groups sued over wolf protections.",
+        "case_date": "April 8, 2024",
+        "other_details": None,
+    }
+)
+
+
+def batch_reply(num_texts: int, skip=()) -> str:
+    """A reply to a batch prompt of `num_texts` texts, leaving out `skip` ids."""
+    details = json.loads(LAWSUIT_REPLY)
+    return json.dumps(
+        {
+            "results": [
+                {"id": str(i), **details, "defendant": [f"Defendant {i}"]}
+                for i in range(1, num_texts + 1)
+                if i not in skip
+            ]
+        }
+    )
+
+
+class FakeChatModel(FakeListChatModel):
+    """Replays canned replies, and fails on prompts containing `fail_on` texts."""
+
+    fail_on: List[str] = []
+
+    def _call(self, messages, *args, **kwargs) -> str:
+        prompt = "\n".join(str(message.content) for message in messages)
+        if any(text in prompt for text in self.fail_on):
+            raise ValueError("The fake LLM failed")
+        return super()._call(messages, *args, **kwargs)
+
+
+def make_fake_extractor(module=lawsuit, responses=None, fail_on=()):
+    """
+    Build a real extractor whose engine replays canned replies, and fails on
+    the texts in `fail_on` without consuming a reply.
+    """
+    extractor = module.LawsuitExtractor()
+    # The fake model wraps around after its last reply; the padding keeps
+    # `engine.i` counting the calls
+    responses = (responses or []) + [LAWSUIT_REPLY] * 100
+    extractor._engine_ = FakeChatModel(responses=responses, fail_on=list(fail_on))
+    return extractor
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+from fake_llm import LAWSUIT_REPLY, batch_reply, make_fake_extractor
+
+from sierra.llms.tokens import count_tokens
+from sierra.pipes.extract_lawsuits import iter_lawsuit_details
+
+TEXTS = {
+    f"uuid-{i}": f"Groups filed a lawsuit against company {i} over its permit."
+    for i in range(4)
+}
+
+
+def test_extract_batch_makes_one_request():
+    extractor = make_fake_extractor(responses=[batch_reply(4)])
+    results = extractor.extract_batch(TEXTS)
+    assert extractor.engine.i == 1
+    assert list(results) == list(TEXTS)
+    assert results["uuid-2"].defendant == ["Defendant 3"]
+
+
+def test_extract_batch_falls_back_to_single_calls():
+    extractor = make_fake_extractor(responses=["not json"])
+    results = extractor.extract_batch(TEXTS)
+    assert extractor.engine.i == 5
+    assert len(results) == 4
+
+    # Only the texts missing from the reply are extracted again
+    extractor = make_fake_extractor(responses=[batch_reply(4, skip=[2]), LAWSUIT_REPLY])
+    results = asyncio.run(extractor.aextract_batch(TEXTS))
+    assert extractor.engine.i == 2
+    assert results["uuid-0"].defendant == ["Defendant 1"]
+    assert results["uuid-1"].defendant == ["U.S. Fish and Wildlife Service"]
+
+
+def test_batches_fit_the_token_budget(monkeypatch):
+    extractor = make_fake_extractor()
+    monkeypatch.setitem(extractor.llm_model.model_config, "max_input_tokens", 30)
+    assert extractor.pack_batches(TEXTS) == [["uuid-0", "uuid-1"], ["uuid-2", "uuid-3"]]
+
+
+def test_batches_fit_the_reply_budget(monkeypatch):
+    extractor = make_fake_extractor()
+    config = extractor.llm_model.model_config
+    monkeypatch.setitem(config, "max_output_tokens", 700)
+    monkeypatch.setitem(config, "output_tokens_per_text", 250)
+    assert extractor.max_batch_size == 2
+    assert extractor.pack_batches(TEXTS) == [["uuid-0", "uuid-1"], ["uuid-2", "uuid-3"]]
+
+    # Both budgets apply
+    monkeypatch.setitem(config, "max_input_tokens", 15)
+    assert len(extractor.pack_batches(TEXTS)) == 4
+    monkeypatch.setitem(config, "max_output_tokens", None)
+    assert extractor.max_batch_size is None
+
+
+def test_batching_amortizes_the_instructions():
+    extractor = make_fake_extractor()
+    texts = {f"uuid-{i}": f"Groups sued company {i}." for i in range(8)}
+    single = sum(count_tokens(extractor.prompt.format(text=t)) for t in texts.values())
+    _, inputs = extractor._batch_inputs(texts, list(texts))
+    batched = count_tokens(extractor.batch_prompt.format(**inputs))
+    # Short texts are where the repeated instructions cost the most
+    assert batched * 3 < single
+
+
+@pytest.mark.parametrize("max_concurrency", [1, 3])
+def test_pipeline_sends_one_request_per_batch(max_concurrency):
+    data = [{"uuid": str(i), "content": f"lawsuit {i}"} for i in range(10)]
+    data[5]["content"] = "nothing to see"
+    extractor = make_fake_extractor(
+        responses=[batch_reply(4), batch_reply(3), batch_reply(2)]
+    )
+    results = list(
+        iter_lawsuit_details(
+            data, extractor, max_concurrency=max_concurrency, batch_size=4
+        )
+    )
+    # Groups of 4, less the irrelevant item, and the last 2
+    assert extractor.engine.i == 3
+    assert [item["uuid"] for item, _ in results] == [item["uuid"] for item in data]
+    assert results[5][1] is None
+    assert results[4][1]["defendant"] == ["Defendant 1"]
@@ -0,0 +1,70 @@
+import json
+
+from sierra.pipes.boilerplate import BoilerplateStripper, strip_boilerplate
+from sierra.pipes.extract_lawsuits import extract
+
+ABOUT = (
+    "About the Sierra Club\n"
+    "The Sierra Club is America's largest and most influential grassroots "
+    "environmental organization, with millions of members and supporters."
+)
+
+
+def make_release(i: int) -> str:
+    return (
+        f"April {i}, 2024\n\nContact\nPress Office {i % 3}, (202) 555-01{i:02d}\n\n\n"
+        f"CITY {i} — Groups filed lawsuit number {i} against Agency {i}.\n"
+        f"  “Quote {i},” said someone.\n\n\n{ABOUT}"
+    )
+
+
+def test_strips_repeated_lines_only():
+    texts = [make_release(i) for i in range(10)]
+    stripper = BoilerplateStripper().fit(texts)
+
+    stripped = stripper.strip(texts[0])
+    assert "Sierra Club" not in stripped
+    assert "Contact" not in stripped
+    assert "lawsuit number 0" in stripped and "Quote 0" in stripped
+    # The contact line differs between releases
+    assert "Press Office 0" in stripped
+
+    item = stripper.strip_item({"uuid": "0", "content": texts[0]})
+    assert item["content"] == stripped
+    assert item["tokens_saved"] > 0
+
+    # Too few documents to tell boilerplate from content
+    assert BoilerplateStripper().fit(texts[:3]).strip(texts[0]) == texts[0]
+
+
+def test_strip_boilerplate_file_and_extract(tmp_path, fake_extractor):
+    scraped = tmp_path / "articles.jsonl"
+    scraped.write_text(
+        "".join(
+            json.dumps({"url": f"https://example.org/{i}", "content": make_release(i)})
+            + "\n"
+            for i in range(10)
+        )
+    )
+
+    stripped_file = tmp_path / "stripped.jsonl"
+    stats = strip_boilerplate(str(scraped), str(stripped_file))
+    assert stats["documents"] == 10
+    assert stats["tokens_after"] < stats["tokens_before"]
+
+    prompts = []
+    original_extract = fake_extractor.extract
+
+    def recording_extract(text):
+        prompts.append(text)
+        return original_extract(text)
+
+    object.__setattr__(fake_extractor, "extract", recording_extract)
+    extract(
+        str(scraped),
+        str(tmp_path / "extracted.jsonl"),
+        extractor=fake_extractor,
+        stripper=BoilerplateStripper(),
+    )
+    assert len(prompts) == 10
+    assert not any("About the Sierra Club" in prompt for prompt in prompts)
@@ -0,0 +1,72 @@
+import time
+
+from fake_llm import batch_reply, make_fake_extractor
+
+from sierra.pipes.cache import ExtractionCache
+from sierra.pipes.extract_lawsuits import extract_lawsuit_details
+
+
+def make_data(n: int):
+    return [{"uuid": str(i), "content": f"lawsuit number {i}"} for i in range(n)]
+
+
+def test_rerun_only_pays_for_new_items(tmp_path):
+    cache = ExtractionCache(cache_file=str(tmp_path / "cache.sqlite"))
+    extractor = make_fake_extractor()
+
+    first = extract_lawsuit_details(make_data(5), extractor, cache=cache)
+    assert extractor.engine.i == 5
+
+    second = extract_lawsuit_details(make_data(7), extractor, cache=cache)
+    assert extractor.engine.i == 7
+    assert (cache.hits, cache.misses) == (5, 7)
+    assert second[:5] == first
+    cache.close()
+
+    # The cache survives reopening and ignores whitespace-only edits
+    cache = ExtractionCache(cache_file=str(tmp_path / "cache.sqlite"))
+    data = [{"uuid": "0", "content": "  lawsuit   number 0\n"}]
+    extract_lawsuit_details(data, extractor, cache=cache)
+    assert extractor.engine.i == 7
+    assert cache.hits == 1
+
+
+def test_key_depends_on_prompt_and_model(fake_extractor):
+    key = ExtractionCache.make_key("lawsuit", fake_extractor)
+    other = make_fake_extractor()
+    other.llm_model.seed = 42
+    assert ExtractionCache.make_key("lawsuit", other) != key
+    assert ExtractionCache.make_key("lawsuit!", fake_extractor) != key
+
+
+def test_batch_results_are_kept_apart(tmp_path):
+    cache = ExtractionCache(cache_file=str(tmp_path / "cache.sqlite"))
+    extractor = make_fake_extractor(responses=[batch_reply(4)])
+    data = make_data(4)
+    first = extract_lawsuit_details(data, extractor, cache=cache, batch_size=4)
+    assert extractor.engine.i == 1
+    assert ExtractionCache.make_key("lawsuit", extractor, batch=True) != (
+        ExtractionCache.make_key("lawsuit", extractor)
+    )
+
+    # Batch results serve batches, not single prompts
+    assert extract_lawsuit_details(data, extractor, cache=cache, batch_size=4) == first
+    assert extractor.engine.i == 1
+    extract_lawsuit_details(data[:2], extractor, cache=cache)
+    assert extractor.engine.i == 3
+    cache.close()
+
+
+def test_eviction(tmp_path, fake_extractor):
+    cache = ExtractionCache(cache_file=str(tmp_path / "cache.sqlite"), max_entries=3)
+    details = fake_extractor.extract("lawsuit")
+    for i in range(5):
+        cache.set(f"text {i}", fake_extractor, details)
+        time.sleep(0.01)
+    assert cache.get("text 0", fake_extractor) is not None
+    assert cache.evict() == 2
+    assert cache.get("text 0", fake_extractor) is not None
+    assert cache.get("text 1", fake_extractor) is None
+
+    cache.max_age_days = 0
+    assert cache.evict() == 3
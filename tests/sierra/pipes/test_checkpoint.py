@@ -0,0 +1,67 @@
+import json
+
+import pytest
+from fake_llm import LAWSUIT_REPLY, make_fake_extractor
+
+from sierra.pipes.extract_lawsuits import extract
+from sierra.pipes.jsonl import Checkpoint, JsonlWriter, iter_jsonl
+
+
+def write_scraped(path, n):
+    with open(path, "w") as f:
+        for i in range(n):
+            content = f"lawsuit {i}" if i % 3 else f"press release {i}"
+            f.write(json.dumps({"uuid": str(i), "content": content}) + "\n")
+
+
+class CrashingExtractor:
+    """Delegates to a fake extractor and dies hard on the n-th call."""
+
+    def __init__(self, crash_at: int):
+        self.extractor = make_fake_extractor()
+        self.crash_at = crash_at
+        self.calls = 0
+
+    def extract(self, text):
+        self.calls += 1
+        if self.calls == self.crash_at:
+            raise KeyboardInterrupt
+        return self.extractor.extract(text)
+
+
+def test_resume_after_crash(tmp_path):
+    scraped = tmp_path / "articles.jsonl"
+    output = tmp_path / "extracted.jsonl"
+    write_scraped(scraped, 10)
+
+    with pytest.raises(KeyboardInterrupt):
+        extract(str(scraped), str(output), extractor=CrashingExtractor(crash_at=4))
+
+    done = [record["uuid"] for record in iter_jsonl(output)]
+    assert done == ["1", "2", "4"]
+    assert set(Checkpoint(f"{output}.ckpt").completed) == {"0", "1", "2", "3", "4"}
+
+    resumed = make_fake_extractor()
+    extract(str(scraped), str(output), extractor=resumed)
+    assert resumed.engine.i == 3
+    assert [record["uuid"] for record in iter_jsonl(output)] == [
+        "1",
+        "2",
+        "4",
+        "5",
+        "7",
+        "8",
+    ]
+
+    extract(str(scraped), str(output), extractor=resumed, resume=False)
+    assert len(list(iter_jsonl(output))) == 6
+
+
+def test_torn_line_is_repaired(tmp_path):
+    output = tmp_path / "out.jsonl"
+    output.write_text(LAWSUIT_REPLY + "\n" + LAWSUIT_REPLY[:20])
+    assert len(list(iter_jsonl(output))) == 1
+
+    with JsonlWriter(output, fsync=True) as writer:
+        writer.write({"uuid": "x"})
+    assert [record.get("uuid") for record in iter_jsonl(output)] == [None, "x"]
@@ -0,0 +1,168 @@
+import json
+import random
+
+import pytest
+from fake_llm import make_fake_extractor
+
+from sierra.pipes.dedup import NearDuplicateDetector, optimal_bands, shingles
+from sierra.pipes.extract_lawsuits import (
+    aextract_lawsuit_details,
+    extract,
+    iter_lawsuit_details,
+)
+from sierra.pipes.jsonl import iter_jsonl
+
+VOCABULARY = [f"word{i}" for i in range(2000)]
+
+
+def make_text(rng: random.Random, num_words: int = 300) -> str:
+    return "lawsuit " + " ".join(rng.choice(VOCABULARY) for _ in range(num_words))
+
+
+def edit(rng: random.Random, text: str, num_edits: int) -> str:
+    words = text.split()
+    for _ in range(num_edits):
+        words[rng.randrange(1, len(words))] = rng.choice(VOCABULARY)
+    return " ".join(words)
+
+
+def jaccard(a: str, b: str) -> float:
+    a, b = shingles(a), shingles(b)
+    return len(a & b) / len(a | b)
+
+
+def make_corpus():
+    rng = random.Random(0)
+    originals = [make_text(rng) for _ in range(4)]
+    return [
+        {"uuid": "a", "content": originals[0]},
+        {"uuid": "b", "content": originals[1]},
+        {"uuid": "a2", "content": edit(rng, originals[0], 3)},
+        {"uuid": "c", "content": originals[2]},
+        {"uuid": "b2", "content": edit(rng, originals[1], 2)},
+        {"uuid": "a3", "content": edit(rng, originals[0], 4)},
+        {"uuid": "d", "content": edit(rng, originals[3], 60)},
+    ]
+
+
+def test_optimal_bands():
+    bands, rows = optimal_bands(0.8, 128)
+    assert bands * rows <= 128
+    # Pairs at the threshold are likely candidates, dissimilar ones are not
+    assert 1 - (1 - 0.8**rows) ** bands > 0.8
+    assert 1 - (1 - 0.3**rows) ** bands < 0.01
+
+
+def test_signature_estimates_jaccard():
+    rng = random.Random(1)
+    detector = NearDuplicateDetector(num_perm=256)
+    text = make_text(rng)
+    for num_edits in (2, 10, 40):
+        other = edit(rng, text, num_edits)
+        estimate = (detector.signature(text) == detector.signature(other)).mean()
+        assert estimate == pytest.approx(jaccard(text, other), abs=0.1)
+    assert detector.signature("") is None
+
+
+def test_clusters_keep_the_first_item():
+    detector = NearDuplicateDetector(threshold=0.7)
+    annotated = list(detector.annotate(make_corpus()))
+    assert [item["duplicate_of"] for item in annotated] == [
+        None,
+        None,
+        "a",
+        None,
+        "b",
+        "a",
+        None,
+    ]
+    assert detector.clusters() == {"a": ["a", "a2", "a3"], "b": ["b", "b2"]}
+
+
+@pytest.mark.parametrize("max_concurrency", [1, 4])
+def test_duplicates_reuse_the_representative_result(max_concurrency):
+    corpus = make_corpus()
+    extractor = make_fake_extractor()
+    deduplicator = NearDuplicateDetector(threshold=0.7)
+    results = list(
+        iter_lawsuit_details(
+            corpus,
+            extractor,
+            max_concurrency=max_concurrency,
+            deduplicator=deduplicator,
+        )
+    )
+    assert extractor.engine.i == 4
+    assert deduplicator.num_duplicates == 3
+    assert [item["uuid"] for item, _ in results] == [item["uuid"] for item in corpus]
+    by_uuid = {item["uuid"]: extracted for item, extracted in results}
+    assert by_uuid["a2"] == {**by_uuid["a"], "uuid": "a2", "duplicate_of": "a"}
+    assert by_uuid["b2"]["duplicate_of"] == "b"
+    assert by_uuid["c"]["duplicate_of"] is None
+
+
+@pytest.mark.parametrize("max_concurrency", [1, 4])
+def test_duplicates_of_a_failed_item_are_extracted(max_concurrency):
+    corpus = make_corpus()
+    extractor = make_fake_extractor(fail_on=[corpus[0]["content"]])
+    deduplicator = NearDuplicateDetector(threshold=0.7)
+    results = list(
+        iter_lawsuit_details(
+            corpus,
+            extractor,
+            max_concurrency=max_concurrency,
+            deduplicator=deduplicator,
+        )
+    )
+    # Only b2 reused a result; a2 and a3 were sent to the LLM themselves
+    assert deduplicator.num_duplicates == 1
+    assert [item["uuid"] for item, _ in results] == [
+        "b",
+        "a2",
+        "c",
+        "b2",
+        "a3",
+        "d",
+    ]
+    assert {extracted["duplicate_of"] for _, extracted in results[:2]} == {None}
+
+
+def test_aextract_with_deduplicator():
+    import asyncio
+
+    extractor = make_fake_extractor()
+    extracted = asyncio.run(
+        aextract_lawsuit_details(
+            make_corpus(),
+            extractor,
+            deduplicator=NearDuplicateDetector(threshold=0.7),
+        )
+    )
+    assert extractor.engine.i == 4
+    assert [item["duplicate_of"] for item in extracted] == [
+        None,
+        None,
+        "a",
+        None,
+        "b",
+        "a",
+        None,
+    ]
+
+
+def test_extract_with_deduplicator(tmp_path):
+    scraped = tmp_path / "articles.jsonl"
+    scraped.write_text("".join(json.dumps(item) + "\n" for item in make_corpus()))
+    output = tmp_path / "extracted.jsonl"
+    extractor = make_fake_extractor()
+    extract(
+        str(scraped),
+        str(output),
+        extractor=extractor,
+        deduplicator=NearDuplicateDetector(threshold=0.7),
+    )
+    assert extractor.engine.i == 4
+    records = {record["uuid"]: record for record in iter_jsonl(output)}
+    assert len(records) == 7
+    assert records["a3"]["duplicate_of"] == "a"
+    assert records["a3"]["defendant"] == records["a"]["defendant"]
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import time
+
+import pytest
+from fake_llm import make_fake_extractor
+
+from sierra.models import lawsuit, lawsuit_ollama
+from sierra.pipes.extract_lawsuits import (
+    aextract_lawsuit_details,
+    extract,
+    extract_lawsuit_details,
+    make_uuid,
+)
+from sierra.pipes.jsonl import iter_jsonl
+
+
+class SlowExtractor:
+    """Fake extractor that records how many calls are in flight."""
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def _details(self, text: str):
+        return lawsuit.LawsuitDetails(
+            has_lawsuit="no-lawsuit" not in text,
+            claimant=["Sierra Club"],
+            defendant=[text],
+            case_summary="",
+            case_date="",
+            other_details=None,
+        )
+
+    def extract(self, text: str):
+        if "boom" in text:
+            raise ValueError("boom")
+        time.sleep(self.delay)
+        return self._details(text)
+
+    async def aextract(self, text: str):
+        if "boom" in text:
+            raise ValueError("boom")
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        return self._details(text)
+
+
+def make_data(n: int):
+    return [{"uuid": str(i), "content": f"lawsuit {i}"} for i in range(n)]
+
+
+def test_concurrent_extraction_preserves_order():
+    data = make_data(16)
+    data[3]["content"] = "nothing to see"
+    data[5]["content"] = "lawsuit boom"
+    data[7]["content"] = "lawsuit no-lawsuit"
+    extractor = SlowExtractor()
+
+    results = extract_lawsuit_details(data, extractor, max_concurrency=4)
+
+    expected = [item["uuid"] for item in data if item["uuid"] not in {"3", "5", "7"}]
+    assert [item["uuid"] for item in results] == expected
+    assert [item["defendant"] for item in results] == [
+        [f"lawsuit {uuid}"] for uuid in expected
+    ]
+    assert extractor.max_in_flight == 4
+    assert results == extract_lawsuit_details(data, SlowExtractor(delay=0))
+
+
+def test_concurrent_extraction_inside_a_running_loop():
+    # As in Jupyter, where the cell already runs in an event loop
+    data = make_data(8)
+    data[5]["content"] = "lawsuit boom"
+
+    async def _cell():
+        extractor = SlowExtractor()
+        results = extract_lawsuit_details(data, extractor, max_concurrency=4)
+        return results, extractor.max_in_flight
+
+    results, max_in_flight = asyncio.run(_cell())
+    assert [item["uuid"] for item in results] == ["0", "1", "2", "3", "4", "6", "7"]
+    assert max_in_flight == 4
+
+
+def test_concurrency_scales_throughput():
+    data = make_data(16)
+
+    start = time.perf_counter()
+    asyncio.run(aextract_lawsuit_details(data, SlowExtractor(), max_concurrency=1))
+    sequential = time.perf_counter() - start
+
+    start = time.perf_counter()
+    asyncio.run(aextract_lawsuit_details(data, SlowExtractor(), max_concurrency=8))
+    concurrent = time.perf_counter() - start
+
+    assert concurrent < sequential / 4
+
+
+@pytest.mark.parametrize("module", [lawsuit, lawsuit_ollama])
+def test_aextract_with_both_extractors(module):
+    extractor = make_fake_extractor(module)
+
+    results = extract_lawsuit_details(make_data(3), extractor, max_concurrency=2)
+
+    assert [item["uuid"] for item in results] == ["0", "1", "2"]
+    assert results[0]["defendant"] == ["U.S. Fish and Wildlife Service"]
+
+
+def test_uuids_are_deterministic():
+    item = {"url": "https://www.sierraclub.org/press-releases/2024/04/wolves"}
+    assert make_uuid(item) == make_uuid(dict(item))
+    assert make_uuid(item) != make_uuid({"url": item["url"] + "-2"})
+    assert make_uuid({"content": "a  lawsuit"}) == make_uuid({"content": "a lawsuit"})
+
+
+@pytest.mark.parametrize("max_concurrency", [1, 2])
+def test_extract_streams_without_rewriting_input(tmp_path, max_concurrency):
+    scraped = tmp_path / "articles.jsonl"
+    articles = [
+        {"url": f"https://example.org/{i % 4}", "content": f"lawsuit {i % 4}"}
+        for i in range(6)
+    ]
+    scraped.write_text("".join(json.dumps(article) + "\n" for article in articles))
+    before = scraped.read_bytes()
+    output = tmp_path / "extracted.jsonl"
+
+    extractor = make_fake_extractor()
+    extract(
+        str(scraped),
+        str(output),
+        extractor=extractor,
+        max_concurrency=max_concurrency,
+    )
+
+    assert scraped.read_bytes() == before
+    assert extractor.engine.i == 4
+    assert [record["uuid"] for record in iter_jsonl(output)] == [
+        make_uuid(article) for article in articles[:4]
+    ]
@@ -0,0 +1,206 @@
+import json
+import random
+
+import pytest
+
+from sierra.pipes.fuzzy_match import (
+    BlockingIndex,
+    TfidfMatcher,
+    blocking_recall,
+    iter_defendant_names,
+    load_defendant_names,
+    load_project_names,
+    match_projects_defendants,
+)
+
+DEFENDANTS = [
+    "u.s. fish and wildlife service",
+    "tennessee valley authority",
+    "duke energy carolinas, llc",
+    "dominion energy, inc.",
+    "enbridge energy",
+    "peabody energy corporation",
+    "u.s. army corps of engineers",
+    "u.s. forest service",
+    "environmental protection agency",
+    "energy transfer partners",
+    "dakota access, llc",
+    "Énergie du Québec",
+    "",
+]
+PROJECTS = [
+    "Duke Energy Carolinas LLC",
+    "Carolinas Duke Energy",
+    "Tennessee Valley Auth.",
+    "Dominion Energy Inc",
+    "Enbridge Energy Partners",
+    "Energy Transfer",
+    "Dakota Access Pipeline",
+    "US Army Corps of Engineers",
+    "Forest Service (USDA)",
+    "Energie du Quebec",
+    "World Bank",
+    "!!",
+]
+
+WORDS = (
+    "energy power coal gas pipeline corp inc llc company mining national forest "
+    "service valley authority duke dominion southern electric transmission "
+    "holdings partners resources oil petroleum water river dam development"
+).split()
+
+
+def perturb(name: str, rng: random.Random) -> str:
+    for _ in range(rng.randint(0, 4)):
+        i = rng.randrange(len(name))
+        name = name[:i] + rng.choice("abcdefg ,.é") + name[i + rng.randint(0, 2) :]
+    return name
+
+
+def test_golden_matches():
+    matches = match_projects_defendants(PROJECTS, DEFENDANTS, 80)
+    assert matches == match_projects_defendants(
+        PROJECTS, DEFENDANTS, 80, method="extractone"
+    )
+    assert matches == [
+        ("Duke Energy Carolinas LLC", "duke energy carolinas, llc", 100),
+        ("Carolinas Duke Energy", "duke energy carolinas, llc", 91),
+        ("Tennessee Valley Auth.", "tennessee valley authority", 89),
+        ("Dominion Energy Inc", "dominion energy, inc.", 100),
+        ("Enbridge Energy Partners", None, None),
+        ("Energy Transfer", None, None),
+        ("Dakota Access Pipeline", None, None),
+        ("US Army Corps of Engineers", "u.s. army corps of engineers", 94),
+        ("Forest Service (USDA)", "u.s. forest service", 86),
+        ("Energie du Quebec", "Énergie du Québec", 94),
+        ("World Bank", None, None),
+        # Both sides preprocess to an empty string
+        ("!!", "", 100),
+    ]
+
+
+@pytest.mark.parametrize("threshold", [0, 60, 80, 95])
+def test_cdist_reproduces_extractone(threshold):
+    rng = random.Random(threshold)
+    defendants = [
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 5)))
+        for _ in range(150)
+    ]
+    projects = [perturb(rng.choice(defendants), rng) for _ in range(60)]
+
+    expected = match_projects_defendants(
+        projects, defendants, threshold, method="extractone"
+    )
+    assert (
+        match_projects_defendants(projects, defendants, threshold, chunk_size=16)
+        == expected
+    )
+
+
+def test_blocking_index():
+    matches = match_projects_defendants(PROJECTS, DEFENDANTS, 80, method="blocking")
+    # Blocking finds no candidates for a name without any n-gram
+    assert matches[:-1] == match_projects_defendants(PROJECTS, DEFENDANTS, 80)[:-1]
+    assert matches[-1] == ("!!", None, None)
+
+    index = BlockingIndex(DEFENDANTS, top_n=2)
+    candidates = index.candidates(["carolinas duke energy"])[0]
+    assert len(candidates) == 2
+    assert index.choices.index("duke energy carolinas, llc") in candidates
+
+
+def test_blocking_recall():
+    rng = random.Random(0)
+    defendants = [
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 5)))
+        for _ in range(300)
+    ]
+    projects = [perturb(rng.choice(defendants), rng) for _ in range(100)]
+
+    report = blocking_recall(projects, defendants, 80, top_n=len(defendants))
+    assert report["matches"] > 50
+    assert report["recall"] == 1.0
+    assert blocking_recall(projects, defendants, 80, top_n=1)["recall"] < 1.0
+
+
+def test_tfidf_matcher(tmp_path):
+    matcher = TfidfMatcher().fit(DEFENDANTS)
+    neighbors = matcher.kneighbors(["Carolinas Duke Energy LLC"], k=3)[0]
+    assert neighbors[0] == ("duke energy carolinas, llc", 100)
+    assert len(neighbors) == 3
+    assert [score for _, score in neighbors] == sorted(
+        (score for _, score in neighbors), reverse=True
+    )
+
+    path = str(tmp_path / "matcher.joblib")
+    matcher.save(path)
+    loaded = TfidfMatcher.load(path)
+    assert loaded.kneighbors(PROJECTS, k=3) == matcher.kneighbors(PROJECTS, k=3)
+
+    matches = match_projects_defendants(PROJECTS, DEFENDANTS, 80, method="tfidf")
+    assert matches == loaded.match(PROJECTS, 80)
+    assert matches[0] == (
+        "Duke Energy Carolinas LLC",
+        "duke energy carolinas, llc",
+        100,
+    )
+    assert matches[-2] == ("World Bank", None, None)
+
+
+def _write_lawsuits(path):
+    records = [
+        {"claimant": ["Sierra Club"], "defendant": ["Duke Energy"]},
+        {"claimant": ["Earthjustice"], "defendant": ["TVA"]},
+        {"claimant": ["Earthjustice", "SIERRA CLUB"], "defendant": ["EPA", "DOE"]},
+        {"claimant": ["Amigos de Peñasco"], "defendant": ["Peñasco Mining"]},
+        {"claimant": ["Friends"], "defendant": ["Sierra Pacific Power"]},
+    ]
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+def test_iter_defendant_names(tmp_path):
+    path = tmp_path / "lawsuits.jsonl"
+    _write_lawsuits(path)
+
+    names = iter_defendant_names(str(path))
+    assert not isinstance(names, list)
+    assert list(names) == ["duke energy", "epa", "doe"]
+    assert load_defendant_names(str(path), "sierra club") == [
+        "duke energy",
+        "epa",
+        "doe",
+    ]
+    # Non-ASCII targets are escaped by json.dumps and skip the raw-line check
+    assert load_defendant_names(str(path), "Amigos de Peñasco") == ["peñasco mining"]
+    assert load_defendant_names(str(path), "nobody") == []
+
+
+def test_iter_defendant_names_without_orjson(tmp_path, monkeypatch):
+    import sierra.pipes.jsonl
+
+    monkeypatch.setattr(sierra.pipes.jsonl, "_loads", json.loads)
+    path = tmp_path / "lawsuits.jsonl"
+    _write_lawsuits(path)
+    assert load_defendant_names(str(path)) == ["duke energy", "epa", "doe"]
+
+
+def test_load_project_names_reads_only_the_name_column(tmp_path, monkeypatch):
+    import pandas as pd
+
+    path = tmp_path / "projects.csv"
+    path.write_text("Borrower,Amount,Notes\nDuke Energy,10,a\nEnbridge Energy,20,b\n")
+    calls = []
+    read_csv = pd.read_csv
+
+    def spy(*args, **kwargs):
+        calls.append(kwargs.get("usecols"))
+        return read_csv(*args, **kwargs)
+
+    monkeypatch.setattr(pd, "read_csv", spy)
+    assert load_project_names(str(path), "Borrower") == [
+        "duke energy",
+        "enbridge energy",
+    ]
+    assert calls == [["Borrower"]]
@@ -0,0 +1,64 @@
+from sierra.pipes import fuzzy_match
+from sierra.pipes.fuzzy_match import match_projects_defendants
+from sierra.pipes.names import group_names, normalize_name
+
+
+def test_normalize_name():
+    assert normalize_name("U.S. Fish & Wildlife Service") == (
+        "united states fish and wildlife service"
+    )
+    assert normalize_name("US Fish and Wildlife Svc.") == (
+        "united states fish and wildlife service"
+    )
+    assert normalize_name("The Duke Energy Co.") == "duke energy"
+    assert normalize_name("Dominion Energy, Inc.") == "dominion energy"
+    assert normalize_name("Énergie du Québec S.A.") == "energie du quebec"
+    # A suffix alone is kept rather than reduced to nothing
+    assert normalize_name("Company") == "company"
+
+
+def test_group_names():
+    groups = group_names(
+        ["Duke Energy Inc.", "duke energy", "Duke Energy Inc.", "Dominion"]
+    )
+    assert list(groups) == ["duke energy", "dominion"]
+    assert groups["duke energy"] == {"Duke Energy Inc.": 2, "duke energy": 1}
+    assert group_names(["a", "A", "a"], key=None) == {"a": {"a": 2}, "A": {"A": 1}}
+
+
+def test_matching_scales_with_unique_names(monkeypatch):
+    calls = []
+    match_unique = fuzzy_match._match_unique
+
+    def recording_match_unique(projects, defendants, *args, **kwargs):
+        calls.append((len(projects), len(defendants)))
+        return match_unique(projects, defendants, *args, **kwargs)
+
+    monkeypatch.setattr(fuzzy_match, "_match_unique", recording_match_unique)
+    defendants = ["u.s. fish and wildlife service"] * 300 + [
+        "US Fish & Wildlife Service",
+        "US Fish & Wildlife Service",
+        "Duke Energy Corp.",
+    ]
+    projects = ["Duke Energy"] * 50 + ["U.S. Fish and Wildlife Svc", "World Bank"]
+
+    matches = match_projects_defendants(projects, defendants, normalize=True)
+
+    assert calls == [(3, 2)]
+    assert len(matches) == len(projects)
+    assert matches[0] == ("Duke Energy", "Duke Energy Corp.", 100)
+    assert matches[-2] == (
+        "U.S. Fish and Wildlife Svc",
+        "u.s. fish and wildlife service",
+        100,
+    )
+    assert matches[-1] == ("World Bank", None, None)
+
+    # Without normalization only identical strings are collapsed
+    calls.clear()
+    assert match_projects_defendants(projects, defendants)[0] == (
+        "Duke Energy",
+        "Duke Energy Corp.",
+        81,
+    )
+    assert calls == [(3, 3)]
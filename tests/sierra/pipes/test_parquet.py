@@ -0,0 +1,127 @@
+import json
+
+import pytest
+
+from sierra.pipes.extract_lawsuits import extract, extracted_schema, make_uuid
+from sierra.pipes.fuzzy_match import load_defendant_names, load_project_names
+from sierra.pipes.parquet import (
+    ParquetAppender,
+    iter_parquet,
+    jsonl_to_parquet,
+    read_columns,
+    write_parquet,
+)
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+def make_records(start: int, stop: int):
+    return [
+        {
+            "uuid": str(i),
+            "claimant": ["Sierra Club"],
+            "defendant": [f"Company {i}"],
+            "other_details": None if i % 2 else f"detail {i}",
+        }
+        for i in range(start, stop)
+    ]
+
+
+def test_appender_writes_row_groups(tmp_path):
+    path = tmp_path / "records.parquet"
+    assert write_parquet(make_records(1, 8), path, row_group_size=3) == 7
+    assert pq.ParquetFile(path).num_row_groups == 3
+    # The first row group has no other_details; they are typed as strings
+    assert pq.read_schema(path).field("other_details").type == "string"
+
+    assert write_parquet(make_records(8, 10), path, row_group_size=3, append=True) == 2
+    assert pq.ParquetFile(path).num_row_groups == 4
+    assert list(iter_parquet(path)) == make_records(1, 10)
+    assert read_columns(path, ["uuid"]) == {"uuid": [str(i) for i in range(1, 10)]}
+    assert list(iter_parquet(path, columns=["defendant"]))[0] == {
+        "defendant": ["Company 1"]
+    }
+
+
+def test_interrupted_append_keeps_the_old_file(tmp_path):
+    path = tmp_path / "records.parquet"
+    write_parquet(make_records(0, 3), path)
+    with pytest.raises(RuntimeError):
+        with ParquetAppender(path, row_group_size=1, append=True) as appender:
+            appender.write(make_records(3, 4)[0])
+            raise RuntimeError
+    assert list(iter_parquet(path)) == make_records(0, 3)
+    assert not appender.tmp_filename.exists()
+
+
+def test_jsonl_to_parquet(tmp_path):
+    jsonl_file = tmp_path / "lawsuits.jsonl"
+    records = make_records(0, 5)
+    records[3]["claimant"] = ["Earthjustice"]
+    jsonl_file.write_text("".join(json.dumps(record) + "\n" for record in records))
+
+    parquet_file = jsonl_to_parquet(jsonl_file, row_group_size=2)
+    assert parquet_file == str(tmp_path / "lawsuits.parquet")
+    assert list(iter_parquet(parquet_file)) == records
+    assert load_defendant_names(parquet_file) == load_defendant_names(str(jsonl_file))
+
+
+def test_extract_to_parquet(tmp_path, fake_extractor):
+    scraped = tmp_path / "articles.jsonl"
+    articles = [
+        {"url": f"https://example.org/{i}", "content": f"lawsuit {i}"} for i in range(3)
+    ]
+    scraped.write_text("".join(json.dumps(article) + "\n" for article in articles))
+    output = tmp_path / "extracted.parquet"
+
+    extract(str(scraped), str(output), extractor=fake_extractor)
+    assert read_columns(output, ["uuid"])["uuid"] == [
+        make_uuid(article) for article in articles
+    ]
+    assert not (tmp_path / "extracted.parquet.jsonl").exists()
+
+    # New press releases are appended; done ones are not extracted again
+    articles.append({"url": "https://example.org/3", "content": "lawsuit 3"})
+    scraped.write_text("".join(json.dumps(article) + "\n" for article in articles))
+    extract(str(scraped), str(output), extractor=fake_extractor)
+    assert fake_extractor.engine.i == 4
+    assert read_columns(output, ["uuid"])["uuid"] == [
+        make_uuid(article) for article in articles
+    ]
+    assert load_defendant_names(str(output)) == ["u.s. fish and wildlife service"] * 4
+
+
+def test_extracted_schema_keeps_later_fields(tmp_path):
+    path = tmp_path / "extracted.parquet"
+    # Written without a schema: no duplicate_of, other_details typed as strings
+    write_parquet(make_records(1, 3), path)
+    later = {**make_records(3, 4)[0], "duplicate_of": "1", "case_date": "2024"}
+    write_parquet([later], path, append=True, schema=extracted_schema())
+
+    schema = pq.read_schema(path)
+    assert schema.field("claimant").type.value_type == "string"
+    assert schema.field("has_lawsuit").type == "bool"
+    records = list(iter_parquet(path, columns=["uuid", "duplicate_of", "case_date"]))
+    assert records == [
+        {"uuid": "1", "duplicate_of": None, "case_date": None},
+        {"uuid": "2", "duplicate_of": None, "case_date": None},
+        {"uuid": "3", "duplicate_of": "1", "case_date": "2024"},
+    ]
+
+
+def test_load_project_names_from_parquet(tmp_path, monkeypatch):
+    path = tmp_path / "projects.parquet"
+    write_parquet(
+        [{"Borrower": "Duke Energy", "Amount": 10}, {"Borrower": "EPA", "Amount": 2}],
+        path,
+    )
+    read_table = pq.read_table
+    columns = []
+
+    def spy(*args, **kwargs):
+        columns.append(kwargs.get("columns"))
+        return read_table(*args, **kwargs)
+
+    monkeypatch.setattr(pq, "read_table", spy)
+    assert load_project_names(str(path), "Borrower") == ["duke energy", "epa"]
+    assert columns == [["Borrower"]]
@@ -0,0 +1,148 @@
+import json
+
+import pytest
+from fake_llm import LAWSUIT_REPLY, make_fake_extractor
+
+from sierra.pipes.boilerplate import BoilerplateStripper
+from sierra.pipes.extract_lawsuits import extract, make_uuid
+from sierra.pipes.relevance import RelevanceFilter, load_training_data
+
+POSITIVE = [
+    "The Sierra Club sued the Agency {i} in federal court today.",
+    "Groups filed a petition for review of rule {i} in the court of appeals.",
+    "Conservation groups filed a lawsuit challenging permit {i}.",
+    "A federal judge ruled in the case against utility {i} brought by the Club.",
+]
+NEGATIVE = [
+    "Volunteers gathered for the trail cleanup event number {i} this weekend.",
+    "The Sierra Club welcomed the new climate plan {i} announced by the mayor.",
+    "Statement on the report {i} about clean energy jobs in the region.",
+    "Join our outing {i} to the national park and learn about wildflowers.",
+]
+
+
+def make_corpus(n: int = 12):
+    texts, labels = [], []
+    for i in range(n):
+        for template in POSITIVE:
+            texts.append(template.format(i=i))
+            labels.append(1)
+        for template in NEGATIVE:
+            texts.append(template.format(i=i))
+            labels.append(0)
+    return texts, labels
+
+
+@pytest.fixture
+def relevance_filter():
+    return RelevanceFilter(threshold=0.5).fit(*make_corpus())
+
+
+def test_scores_and_report(relevance_filter):
+    scores = relevance_filter.score(
+        [
+            "Groups sued the Forest Service in court over logging.",
+            "Join our volunteers at the park cleanup this weekend.",
+        ]
+    )
+    assert scores[0] > 0.5 > scores[1]
+
+    report = relevance_filter.report(*make_corpus(), thresholds=[0.1, 0.9])
+    assert report["recall"] == 1.0
+    assert report["precision"] == 1.0
+    assert report["forwarded"] == 0.5
+    assert [row["threshold"] for row in report["curve"]] == [0.1, 0.9]
+
+
+def test_save_and_load(relevance_filter, tmp_path):
+    model_file = str(tmp_path / "relevance.joblib")
+    relevance_filter.save(model_file)
+    loaded = RelevanceFilter(model_file=model_file)
+    texts, _ = make_corpus(1)
+    assert list(loaded.score(texts)) == list(relevance_filter.score(texts))
+
+
+def test_filter_replaces_keyword_gate(relevance_filter, tmp_path, fake_extractor):
+    articles = [
+        {"url": "https://example.org/sued", "content": POSITIVE[0].format(i=99)},
+        {"url": "https://example.org/outing", "content": NEGATIVE[3].format(i=99)},
+        {"url": "https://example.org/report", "content": NEGATIVE[2].format(i=99)},
+    ]
+    scraped = tmp_path / "articles.jsonl"
+    scraped.write_text("".join(json.dumps(article) + "\n" for article in articles))
+    output = tmp_path / "extracted.jsonl"
+
+    extract(
+        str(scraped),
+        str(output),
+        extractor=fake_extractor,
+        relevance_filter=relevance_filter,
+    )
+    # "sued" reaches the LLM without the keyword, the other two are skipped
+    assert fake_extractor.engine.i == 1
+
+    # Only the item the LLM judged is training data
+    texts, labels = load_training_data(str(scraped), str(output))
+    assert labels == [1]
+    assert texts[0] == articles[0]["content"]
+    assert make_uuid(articles[0]) in output.read_text()
+
+
+def test_gated_items_are_not_negatives(tmp_path):
+    articles = [
+        {"url": "https://example.org/sued", "content": POSITIVE[0].format(i=1)},
+        {"url": "https://example.org/filed", "content": POSITIVE[2].format(i=1)},
+        {"url": "https://example.org/no", "content": "A lawsuit was only rumored."},
+    ]
+    scraped = tmp_path / "articles.jsonl"
+    scraped.write_text("".join(json.dumps(article) + "\n" for article in articles))
+    output = tmp_path / "extracted.jsonl"
+    no_lawsuit = json.dumps({**json.loads(LAWSUIT_REPLY), "has_lawsuit": False})
+    extractor = make_fake_extractor(responses=[LAWSUIT_REPLY, no_lawsuit])
+
+    extract(str(scraped), str(output), extractor=extractor)
+    # "sued" lacks the keyword, so it never reached the LLM
+    assert extractor.engine.i == 2
+
+    texts, labels = load_training_data(str(scraped), str(output))
+    assert texts == [articles[1]["content"], articles[2]["content"]]
+    assert labels == [1, 0]
+
+
+def test_training_data_matches_what_extract_scores(tmp_path):
+    footer = "About the Sierra Club: read about our lawsuit work at sierraclub.org"
+    bodies = [
+        "Conservation groups filed a lawsuit challenging the permit.",
+        "A lawsuit was only rumored.",
+        "Volunteers gathered for the trail cleanup.",
+    ]
+    articles = [
+        {"title": f"Release {i}", "content": f"{body}\n{footer}"}
+        for i, body in enumerate(bodies)
+    ]
+    scraped = tmp_path / "articles.jsonl"
+    scraped.write_text("".join(json.dumps(article) + "\n" for article in articles))
+    output = tmp_path / "extracted.jsonl"
+    no_lawsuit = json.dumps({**json.loads(LAWSUIT_REPLY), "has_lawsuit": False})
+    extractor = make_fake_extractor(responses=[LAWSUIT_REPLY, no_lawsuit])
+
+    extract(
+        str(scraped),
+        str(output),
+        extractor=extractor,
+        key_field="title",
+        stripper=BoilerplateStripper(min_docs=2),
+    )
+    # The footer's "lawsuit" is stripped before the keyword gate
+    assert extractor.engine.i == 2
+
+    texts, labels = load_training_data(
+        str(scraped),
+        str(output),
+        key_field="title",
+        stripper=BoilerplateStripper(min_docs=2),
+    )
+    assert texts == bodies[:2]
+    assert labels == [1, 0]
+    # The default key field derives other UUIDs
+    assert load_training_data(str(scraped), str(output)) == ([], [])
@@ -0,0 +1,67 @@
+"""
+Startup budgets of `import sierra` and `sierra --help`, from `python -X importtime`.
+"""
+
+import subprocess
+import sys
+from typing import Dict
+
+# Microseconds of import time allowed beyond HyFI's own
+IMPORT_SIERRA_BUDGET = 100_000
+CLI_HELP_BUDGET = 500_000
+HEAVY_MODULES = ["langchain", "langchain_openai", "sklearn", "torch"]
+
+
+def import_times(code: str) -> Dict[str, int]:
+    """Cumulative import time of every module imported by `code`, in µs."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+    )
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Nested imports are indented; keep the top-level ones apart
+        key = name.strip() if name.startswith("  ") else f"<top>{name.strip()}"
+        times[key] = int(cumulative)
+    return times
+
+
+def top_level(times: Dict[str, int]) -> Dict[str, int]:
+    return {k[5:]: v for k, v in times.items() if k.startswith("<top>")}
+
+
+def imported(times: Dict[str, int], module: str) -> bool:
+    return any(k.split(">")[-1] == module for k in times)
+
+
+def test_import_sierra_is_light():
+    times = import_times("import sierra; sierra.get_version()")
+    assert not imported(times, "hyfi")
+    for module in HEAVY_MODULES:
+        assert not imported(times, module)
+    assert top_level(times)["sierra"] < IMPORT_SIERRA_BUDGET
+
+
+def test_light_modules_skip_hyfi():
+    times = import_times(
+        "import sierra.pipes.fuzzy_match, sierra.models.chunking, sierra.llms.tokens"
+    )
+    for module in ["hyfi", *HEAVY_MODULES]:
+        assert not imported(times, module)
+
+
+def test_cli_help_budget():
+    times = top_level(
+        import_times(
+            "import sys; sys.argv = ['sierra', '--help']\n"
+            "from sierra.__cli__ import main; main()"
+        )
+    )
+    for module in HEAVY_MODULES:
+        assert module not in times
+    assert sum(times.values()) - times["hyfi"] < CLI_HELP_BUDGET